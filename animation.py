@@ -0,0 +1,104 @@
+# Animates simulated orbits, drawing only the artists that move and streaming frames to video files
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib import animation as mpl_animation
+
+
+def _frame_positions(positions, center):
+    """Returns the names and (objects x steps x 3) positions to draw, relative to center when it is given."""
+    names = list(positions)
+    trajectories = np.stack([np.asarray(positions[name]) for name in names])
+    if center is not None:
+        if center not in positions:
+            raise ValueError(f"Object {center} not found in simulation.")
+        trajectories = trajectories - np.asarray(positions[center])[None]
+    return names, trajectories
+
+
+def animate_system(positions, time, path = None, dimensions = 2, trail_length = 50, frame_skip = 1, fps = 30,
+                   center = None, figsize = (8, 8), dpi = 100):
+    """
+    Animates the orbits of a simulation. Axes are fixed from the whole run, so each frame only redraws the
+    moving points, their trails and the time label (blitting). Saved frames are piped to the encoder one
+    at a time, so memory does not grow with the length of the run.
+
+    Args:
+        positions: Dictionary holding x, y, z positions (steps x 3) of each object, as returned by run_simulation.
+        time: Numpy array (vector) holding the times of the positions in years.
+        path: String representing a video file to write. Extensions such as .mp4 stream to ffmpeg; .gif uses Pillow,
+            which keeps every frame until the end (short clips only). The figure is closed once saved. None returns
+            the animation for interactive display with plt.show(): its figure stays open in pyplot and belongs to
+            the caller (close it with plt.close() once done, ex: after saving it to several files).
+        dimensions: Int, 2 draws the x-y plane, 3 draws 3D axes.
+        trail_length: Int representing the number of past timesteps drawn behind each object (0 for none).
+        frame_skip: Int representing the number of timesteps between frames (ex: 10 draws every 10th timestep).
+        fps: Int representing the frames per second of the video.
+        center: String representing an object to follow (ex: "Mars" to watch Phobos and Deimos), None for the
+            simulation frame.
+        figsize: Tuple representing the figure size in inches.
+        dpi: Int representing the resolution of saved frames.
+
+    Returns:
+        anim: The matplotlib FuncAnimation.
+    """
+    if not positions:
+        raise ValueError("No positions to animate, the simulation holds no objects.")
+    if dimensions not in (2, 3):
+        raise ValueError("Animations have 2 or 3 dimensions.")
+    names, trajectories = _frame_positions(positions, center)
+    time = np.asarray(time)
+    frames = range(0, len(time), max(int(frame_skip), 1))
+
+    fig = plt.figure(figsize=figsize)
+    axis_names = ["x", "y", "z"][:dimensions]
+    low, high = trajectories.min(axis=(0, 1)), trajectories.max(axis=(0, 1))
+    margin = 0.05*np.max(high - low) if np.max(high - low) > 0 else 1.0
+    if dimensions == 3:
+        ax = fig.add_subplot(projection="3d")
+        ax.set_zlim(low[2] - margin, high[2] + margin)
+    else:
+        ax = fig.add_subplot()
+        ax.set_aspect("equal", adjustable="datalim")
+    ax.set_xlim(low[0] - margin, high[0] + margin)
+    ax.set_ylim(low[1] - margin, high[1] + margin)
+    for axis, label in zip(axis_names, ["X Position (AU)", "Y Position (AU)", "Z Position (AU)"]):
+        getattr(ax, f"set_{axis}label")(label)
+    ax.set_title("Orbits" if center is None else f"Orbits around {center}")
+
+    points, trails = [], []
+    for name in names:
+        empty = [[]]*dimensions
+        trail, = ax.plot(*empty, linewidth=0.8, alpha=0.6, animated=True)
+        point, = ax.plot(*empty, "o", color=trail.get_color(), markersize=4, label=name, animated=True)
+        trails.append(trail)
+        points.append(point)
+    ax.legend(loc="upper right")
+    label = ax.text2D(0.02, 0.95, "", transform=ax.transAxes, animated=True) if dimensions == 3 else \
+        ax.text(0.02, 0.95, "", transform=ax.transAxes, animated=True)
+
+    def update(step):
+        first = max(step - trail_length, 0)
+        for i in range(len(names)):
+            trail_points = trajectories[i, first:step + 1]
+            point = trajectories[i, step:step + 1]
+            if dimensions == 3:
+                trails[i].set_data_3d(trail_points[:, 0], trail_points[:, 1], trail_points[:, 2])
+                points[i].set_data_3d(point[:, 0], point[:, 1], point[:, 2])
+            else:
+                trails[i].set_data(trail_points[:, 0], trail_points[:, 1])
+                points[i].set_data(point[:, 0], point[:, 1])
+        label.set_text(f"t = {time[step]:.3f} years")
+        return trails + points + [label]
+
+    anim = mpl_animation.FuncAnimation(fig, update, frames=frames, interval=1000/fps, blit=True,
+                                       cache_frame_data=False) # frames are not kept once drawn
+    if path is not None:
+        if str(path).lower().endswith(".gif"):
+            writer = mpl_animation.PillowWriter(fps=fps)
+        else:
+            writer = mpl_animation.FFMpegWriter(fps=fps)
+        try:
+            anim.save(path, writer=writer, dpi=dpi)
+        finally:
+            plt.close(fig)
+    return anim
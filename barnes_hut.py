@@ -0,0 +1,205 @@
+# Barnes-Hut octree approximation of N-body gravity for large numbers of bodies
+import time as timer
+import numpy as np
+from nbody import GRAVITATIONAL_CONSTANT_YEARS, direct_accelerations
+
+TREE_LEVELS = 16 # octree depth, bodies closer than (system size)/2^16 share a leaf
+
+
+class Octree:
+    """
+    Octree over a set of bodies, built level by level from sorted Morton (Z-order) keys.
+
+    Attributes:
+        order: Numpy int array, body indices sorted by Morton key. Every node covers a contiguous slice of order.
+        body_keys: Numpy int array holding the Morton key of each body (unsorted, indexed like positions).
+        mass: Numpy array holding the total mass of each node in kg.
+        center_of_mass: Numpy array (nodes x 3) holding each node's center of mass in AU.
+        size: Numpy array holding the side length of each node's cube in AU.
+        prefix: Numpy int array holding each node's Morton key prefix.
+        shift: Numpy int array, a body is inside a node when body_key >> shift == prefix.
+        start: Numpy int array, first position in order covered by each node.
+        count: Numpy int array, number of bodies in each node.
+        child_start: Numpy int array, node index of the first child of each node.
+        child_count: Numpy int array, number of children of each node (0 for leaves).
+    """
+    def __init__(self, positions, masses):
+        positions = np.asarray(positions, dtype=float)
+        masses = np.asarray(masses, dtype=float)
+        corner = positions.min(axis=0)
+        root_size = (positions.max(axis=0) - corner).max()*(1 + 1e-9) + 1e-300
+        cells = np.floor((positions - corner)/root_size*2**TREE_LEVELS).astype(np.int64)
+        self.body_keys = morton_keys(np.clip(cells, 0, 2**TREE_LEVELS - 1))
+        self.order = np.argsort(self.body_keys, kind="stable")
+        sorted_keys = self.body_keys[self.order]
+        sorted_masses = masses[self.order]
+        sorted_moments = positions[self.order]*sorted_masses[:, None]
+        sorted_positions = positions[self.order]
+
+        levels = []
+        node_offset = 0
+        active = np.ones(len(sorted_keys), dtype=bool) # bodies whose node on the previous level was split
+        for level in range(TREE_LEVELS + 1):
+            shift = 3*(TREE_LEVELS - level)
+            prefix = sorted_keys >> shift
+            starts = np.flatnonzero(np.r_[True, prefix[1:] != prefix[:-1]])
+            counts = np.diff(np.r_[starts, len(sorted_keys)])
+            keep = active[starts]
+            if not keep.any():
+                break
+            active = np.repeat(keep & (counts > 1), counts)
+            # sums run up to the next start, so take them over every prefix before dropping nodes
+            node_mass = np.add.reduceat(sorted_masses, starts)[keep]
+            moment = np.add.reduceat(sorted_moments, starts, axis=0)[keep]
+            mean_position = np.add.reduceat(sorted_positions, starts, axis=0)[keep]/counts[keep][:, None]
+            starts, counts = starts[keep], counts[keep]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                center = np.where(node_mass[:, None] > 0, moment/node_mass[:, None], mean_position)
+            levels.append({"start": starts, "count": counts, "mass": node_mass, "center": center,
+                           "prefix": prefix[starts], "shift": np.full(len(starts), shift),
+                           "size": np.full(len(starts), root_size/2**level), "offset": node_offset})
+            node_offset += len(starts)
+
+        # children of a split node are the next level's nodes inside its slice of order
+        for level, nodes in enumerate(levels):
+            split = nodes["count"] > 1
+            if level + 1 < len(levels):
+                below = levels[level + 1]
+                first = np.searchsorted(below["start"], nodes["start"])
+                last = np.searchsorted(below["start"], nodes["start"] + nodes["count"])
+                nodes["child_start"] = below["offset"] + first
+                nodes["child_count"] = np.where(split, last - first, 0)
+            else:
+                nodes["child_start"] = np.zeros(len(nodes["start"]), dtype=int)
+                nodes["child_count"] = np.zeros(len(nodes["start"]), dtype=int)
+
+        for attribute in ("start", "count", "mass", "prefix", "shift", "size", "child_start", "child_count"):
+            setattr(self, attribute, np.concatenate([nodes[attribute] for nodes in levels]))
+        self.center_of_mass = np.concatenate([nodes["center"] for nodes in levels])
+
+    def __repr__(self):
+        return f"Octree: {len(self.order)} bodies, {len(self.mass)} nodes"
+
+
+def morton_keys(cells):
+    """
+    Interleaves the bits of integer cell coordinates into Morton (Z-order) keys.
+
+    Args:
+        cells: Numpy int array (bodies x 3) of cell coordinates below 2^TREE_LEVELS.
+
+    Returns:
+        keys: Numpy int64 array, one key per body.
+    """
+    keys = np.zeros(len(cells), dtype=np.int64)
+    for bit in range(TREE_LEVELS):
+        for axis in range(3):
+            keys |= ((cells[:, axis] >> bit) & 1) << (3*bit + 2 - axis)
+    return keys
+
+
+def _expand(body, node, counts, starts):
+    """Repeats each (body, node) pair counts times, pairing it with starts, starts + 1, ... starts + counts - 1."""
+    repeated_body = np.repeat(body, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return repeated_body, np.repeat(starts, counts) + offsets
+
+
+def barnes_hut_accelerations(positions, masses, softening = 0.0, theta = 0.5):
+    """
+    Approximates the gravitational acceleration on every body with a Barnes-Hut octree. A node is used as a
+    single point mass when its size / distance is below theta, otherwise it is opened into its children.
+    All bodies walk the tree together, one tree level per pass.
+
+    Args:
+        positions: Numpy array (bodies x 3) holding body positions in AU.
+        masses: Numpy array holding the mass of each body in kg.
+        softening: Float representing the softening length in AU, keeps close encounters finite.
+        theta: Float representing the opening angle. 0 gives direct summation, larger is faster and less accurate.
+
+    Returns:
+        accelerations: Numpy array (bodies x 3) holding accelerations in AU/year^2.
+    """
+    positions = np.asarray(positions, dtype=float)
+    masses = np.asarray(masses, dtype=float)
+    num_bodies = len(masses)
+    accelerations = np.zeros((num_bodies, 3))
+    if num_bodies < 2:
+        return accelerations
+    tree = Octree(positions, masses)
+
+    def add_point_masses(body, point_positions, point_masses):
+        separations = point_positions - positions[body]
+        distances_squared = np.einsum("ij,ij->i", separations, separations) + softening**2
+        with np.errstate(divide="ignore"):
+            weights = np.where(distances_squared > 0, point_masses*distances_squared**-1.5, 0.0)
+        for k in range(3):
+            accelerations[:, k] += np.bincount(body, weights=weights*separations[:, k], minlength=num_bodies)
+
+    body = np.arange(num_bodies)
+    node = np.zeros(num_bodies, dtype=int) # every body starts at the root
+    while len(body):
+        separations = tree.center_of_mass[node] - positions[body]
+        distances_squared = np.einsum("ij,ij->i", separations, separations)
+        contains = (tree.body_keys[body] >> tree.shift[node]) == tree.prefix[node]
+        leaf = tree.child_count[node] == 0
+        far_enough = tree.size[node]**2 < theta**2*distances_squared
+        use = ~contains & (far_enough | leaf)
+        add_point_masses(body[use], tree.center_of_mass[node[use]], tree.mass[node[use]])
+
+        # a leaf holding the body and others (bodies too close to split): sum the others directly
+        crowded = contains & leaf & (tree.count[node] > 1)
+        if crowded.any():
+            pair_body, slot = _expand(body[crowded], node[crowded], tree.count[node[crowded]], tree.start[node[crowded]])
+            other = tree.order[slot]
+            distinct = other != pair_body
+            add_point_masses(pair_body[distinct], positions[other[distinct]], masses[other[distinct]])
+
+        opened = ~use & ~leaf
+        body, node = _expand(body[opened], node[opened], tree.child_count[node[opened]], tree.child_start[node[opened]])
+
+    return GRAVITATIONAL_CONSTANT_YEARS*accelerations
+
+
+def benchmark_against_direct(num_bodies, theta = 0.5, seed = 0, repeats = 3):
+    """
+    Times Barnes-Hut against direct summation on a cloud of debris around a central planet-mass body
+    and measures the force error.
+
+    Args:
+        num_bodies: Int representing the number of bodies (central body included).
+        theta: Float representing the Barnes-Hut opening angle.
+        seed: Int seed for the random body positions and masses.
+        repeats: Int representing how many times each solver is timed (best time is kept).
+
+    Returns:
+        results: Dictionary with the wall times of both solvers in seconds, the speedup and the median and
+            maximum relative acceleration error of Barnes-Hut.
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.normal(0, 1e-3, (num_bodies, 3))
+    positions[0] = 0
+    masses = rng.uniform(1e3, 1e9, num_bodies)
+    masses[0] = 6e24
+
+    def best_time(function):
+        times = []
+        for _ in range(repeats):
+            started = timer.perf_counter()
+            result = function(positions, masses)
+            times.append(timer.perf_counter() - started)
+        return min(times), result
+
+    direct_seconds, direct = best_time(direct_accelerations)
+    barnes_hut_seconds, approximate = best_time(lambda p, m: barnes_hut_accelerations(p, m, theta=theta))
+    errors = np.linalg.norm(approximate - direct, axis=1)/np.linalg.norm(direct, axis=1)
+    return {"num_bodies": num_bodies, "theta": theta,
+            "direct_seconds": direct_seconds, "barnes_hut_seconds": barnes_hut_seconds,
+            "speedup": direct_seconds/barnes_hut_seconds,
+            "median_relative_error": float(np.median(errors)), "max_relative_error": float(errors.max())}
+
+
+if __name__ == "__main__":
+    for num_bodies in (500, 1000, 2000, 5000):
+        for theta in (0.3, 0.5, 0.8):
+            print(benchmark_against_direct(num_bodies, theta))
@@ -0,0 +1,111 @@
+# Runs many orbital simulations (parameter sweeps, ensembles) in parallel across processes
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import math
+import multiprocessing
+import os
+import numpy as np
+import simulate_orbits
+
+
+class BatchResult:
+    """
+    Result of one simulation in a batch, stored as one array rather than a dictionary of arrays so that it
+    travels between processes as a single buffer.
+
+    Attributes:
+        names: List of object names, in the order of run_simulation's positions dictionary.
+        positions: Numpy array (objects x steps x 3) holding x, y, z positions for each object.
+        time: Numpy array (vector) holding a timestep-ed time vector in years.
+        stats: Dictionary holding the step counts of the run when run_batch was given stats, None otherwise.
+    """
+    def __init__(self, names, positions, time, stats = None):
+        self.names = names
+        self.positions = positions
+        self.time = time
+        self.stats = stats
+
+    def __repr__(self):
+        return f"Batch result: {len(self.names)} objects, {len(self.time)} steps"
+
+    def positions_dictionary(self):
+        """Returns the positions as a dictionary of (steps x 3) arrays keyed by name, like run_simulation."""
+        return {name: self.positions[i] for i, name in enumerate(self.names)}
+
+
+def _run_chunk(jobs, sim_duration, timestep, engine, engine_options, with_stats = False):
+    """Runs a list of (key, system) jobs in a worker process and packs each result into a BatchResult."""
+    results = []
+    for key, system in jobs:
+        stats = {} if with_stats else None # one per run, filled in the worker and sent back with the result
+        options = dict(engine_options, stats=stats) if with_stats else dict(engine_options)
+        positions, time = simulate_orbits.run_simulation(system, sim_duration, timestep, engine, **options)
+        names = list(positions.keys())
+        stacked = np.stack([positions[name] for name in names]) if names else np.zeros((0, len(time), 3))
+        results.append((key, BatchResult(names, stacked, time, stats)))
+    return results
+
+
+def run_batch(systems, sim_duration = 2, timestep = 0.00273973*7, engine = "vectorized", processes = None, chunksize = None, **engine_options):
+    """
+    Runs run_simulation for many systems, spreading chunks of runs over a pool of processes.
+
+    Args:
+        systems: List of Orbital Systems (keyed by position) or dictionary of Orbital Systems keyed by run
+            (ex: the output of parameter_grid).
+        sim_duration: Float representing length of simulation in years.
+        timestep: Float representing length of simulation timestep in years.
+        engine: String selecting the run_simulation engine.
+        processes: Int representing the number of worker processes (defaults to the CPU count, 1 runs in this process).
+        chunksize: Int representing how many runs are sent to a worker at once (defaults to about four chunks per worker).
+        engine_options: Keyword arguments passed on to run_simulation for every run. A stats dictionary (for the
+            "adaptive" engine) is not shared with the workers: each BatchResult holds the stats of its run, and
+            stats is filled with the totals over all runs.
+
+    Returns:
+        results: Dictionary of BatchResult keyed like systems, in the same order.
+    """
+    jobs = list(systems.items()) if isinstance(systems, dict) else list(enumerate(systems))
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(jobs)))
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(jobs)/(processes*4)))
+    chunks = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+    stats = engine_options.pop("stats", None)
+    with_stats = stats is not None
+    options = tuple(engine_options.items())
+
+    results = {}
+    if processes == 1:
+        for chunk in chunks:
+            results.update(_run_chunk(chunk, sim_duration, timestep, engine, options, with_stats))
+    else:
+        # spawned, not forked: a fork copies thread pools already running here (ex: Numba's) and can hang
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(_run_chunk, chunk, sim_duration, timestep, engine, options, with_stats) for chunk in chunks]
+            for future in futures:
+                results.update(future.result())
+    results = {key: results[key] for key, _ in jobs}
+    if stats is not None:
+        for result in results.values():
+            simulate_orbits.add_stats(stats, result.stats)
+    return results
+
+
+def parameter_grid(build_system, **parameters):
+    """
+    Builds one system for every combination of parameter values.
+
+    Args:
+        build_system: Function taking the parameters as keyword arguments and returning an Orbital System.
+        parameters: Lists of values for each keyword argument of build_system (ex: mass=[1e23, 1e24], distance=[1, 2]).
+
+    Returns:
+        systems: Dictionary of Orbital Systems keyed by the tuple of parameter values, in the order the parameters were given.
+    """
+    names = list(parameters.keys())
+    systems = {}
+    for values in itertools.product(*parameters.values()):
+        systems[values] = build_system(**dict(zip(names, values)))
+    return systems
@@ -0,0 +1,260 @@
+# Benchmark suite for the simulator, data wrangling and plotting, with a history file and a regression gate
+# Run with: python benchmarks.py [--quick] [--filter run_simulation] [--threshold 0.25]
+import argparse
+import io
+import itertools
+import json
+import math
+import os
+import statistics
+import sys
+import time as clock
+import tracemalloc
+import numpy as np
+from matplotlib.figure import Figure
+
+from orbital_system_sim import Planet, Satellite, Star, OrbitalSystem, StellarOrbitalSystem
+from body_registry import BodyRegistry
+import simulate_orbits
+import data_wrangling
+import visualization
+
+DEFAULT_HISTORY = os.path.join(os.path.expanduser("~"), ".cache", "orbit_simulator", "benchmark_history.jsonl") # outside the source tree
+MAX_POINTS = 10**7 # body-steps per case, the largest cases hold 240 MB of positions (and peak a few times that)
+
+
+def tree_parents(num_bodies, depth):
+    """
+    Returns the parent index of every body of a tree of the given depth (-1 for the system center), filled
+    breadth first with the same number of children per body (ex: 100 bodies at depth 2 is 10 planets with 9 moons).
+    """
+    fanout = max(1, math.ceil(num_bodies**(1/depth)))
+    parents = []
+    level = [-1]
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            children = min(fanout, num_bodies - len(parents))
+            next_level += range(len(parents), len(parents) + children)
+            parents += [parent]*children
+        level = next_level
+    parents += [-1]*(num_bodies - len(parents)) # rounding leftovers orbit the center
+    return np.array(parents, dtype=int)
+
+
+def build_registry(num_bodies, depth):
+    """Builds a BodyRegistry of num_bodies bodies nested depth levels deep around a solar mass."""
+    parents = tree_parents(num_bodies, depth)
+    registry_depth = np.zeros(num_bodies, dtype=int)
+    for i, parent in enumerate(parents):
+        registry_depth[i] = 0 if parent == -1 else registry_depth[parent] + 1
+    distance = (0.5 + np.arange(num_bodies) % 97/10)*0.01**registry_depth # each level orbits much closer in
+    mass = 1e24*1e-3**registry_depth
+    return BodyRegistry([f"Body {i}" for i in range(num_bodies)], mass, np.ones(num_bodies), distance,
+                        np.zeros((num_bodies, 3)), parents, "Sun", 1.989e30)
+
+
+def build_system(num_bodies, depth):
+    """Builds the same tree as build_registry out of Planet, Satellite and (nested) Orbital System objects."""
+    parents = tree_parents(num_bodies, depth)
+    registry = build_registry(num_bodies, depth)
+    children = {}
+    for i, parent in enumerate(parents):
+        children.setdefault(parent, []).append(i)
+
+    def make_object(i):
+        body_type = Planet if parents[i] == -1 else Satellite
+        extra = ("rocky",) if body_type is Planet else (100, "rock")
+        body = body_type(registry.names[i], 1, registry.mass[i], 0, 0, 0, registry.distance_from_center[i], *extra)
+        if i not in children:
+            return body
+        system = OrbitalSystem(f"{registry.names[i]} system", body)
+        system.add_orbiting_objects([make_object(child) for child in children[i]])
+        return system
+
+    system = StellarOrbitalSystem("Benchmark system", Star("Sun", 695700, 1.989e30, 0, 0, 0, 3.828e26, "G-type"))
+    system.add_orbiting_objects([make_object(i) for i in children.get(-1, [])])
+    return system
+
+
+def _setup_run(num_bodies, depth, num_steps, use_system = False):
+    system = build_system(num_bodies, depth) if use_system else build_registry(num_bodies, depth)
+    return lambda: simulate_orbits.run_simulation(system, sim_duration=num_steps, timestep=1.0)
+
+def _setup_establish(num_bodies, depth, num_steps):
+    system = build_system(num_bodies, depth)
+    time = np.linspace(0, num_steps, num_steps)
+    return lambda: simulate_orbits.establish_simulation(system, system.orbiting_objects, time)
+
+def _setup_dataframe(num_bodies, depth, num_steps):
+    positions, time = simulate_orbits.run_simulation(build_registry(num_bodies, depth), sim_duration=num_steps, timestep=1.0)
+    return lambda: data_wrangling.convert_simulation_to_dataframe(positions, time)
+
+def _setup_plot(num_bodies, depth, num_steps):
+    system = build_system(num_bodies, depth) # plot_system titles the plot with the system's name
+    positions, time = simulate_orbits.run_simulation(system, sim_duration=num_steps, timestep=1.0)
+    grouped = visualization.group_trajectories(data_wrangling.convert_simulation_to_dataframe(positions, time))
+    def plot():
+        ax = Figure(figsize=(8, 5)).add_subplot()
+        visualization.plot_system(system, grouped, ax=ax, show=False)
+        ax.figure.savefig(io.BytesIO(), format="png")
+    return plot
+
+
+# benchmark name: (setup function returning the timed callable, parameter grid)
+BENCHMARKS = {
+    "run_simulation": (_setup_run, {"bodies": [1, 100, 10000, 100000], "depth": [1, 2, 3, 4], "steps": [100, 1000]}),
+    "run_simulation_system": (lambda b, d, s: _setup_run(b, d, s, use_system=True),
+                              {"bodies": [1, 100, 10000], "depth": [1, 2, 3, 4], "steps": [100]}),
+    "establish_simulation": (_setup_establish, {"bodies": [1, 100, 10000], "depth": [1, 4], "steps": [100]}),
+    "convert_simulation_to_dataframe": (_setup_dataframe, {"bodies": [1, 100, 10000], "depth": [1], "steps": [100, 1000]}),
+    "plot_system": (_setup_plot, {"bodies": [1, 10, 100], "depth": [1], "steps": [1000]}),
+}
+
+
+def benchmark_cases(name_filter = None, quick = False):
+    """
+    Lists the (name, parameters) of every benchmark case, skipping cases above MAX_POINTS body-steps.
+
+    Args:
+        name_filter: String, only benchmarks whose name contains it are listed (None lists all).
+        quick: Boolean, True keeps only cases up to 10k bodies and 100 steps (ex: for a pre-commit check).
+    """
+    cases = []
+    for name, (_, grid) in BENCHMARKS.items():
+        if name_filter is not None and name_filter not in name:
+            continue
+        for bodies, depth, steps in itertools.product(grid["bodies"], grid["depth"], grid["steps"]):
+            if bodies*steps > MAX_POINTS or depth > max(bodies, 1) or (quick and (bodies > 10000 or steps > 100)):
+                continue
+            cases.append((name, {"bodies": bodies, "depth": depth, "steps": steps}))
+    return cases
+
+
+def measure(function, repeats = 3):
+    """
+    Times a function and measures its peak memory.
+
+    Returns:
+        seconds: Float representing the fastest of repeats wall-clock times.
+        peak_bytes: Int representing the largest memory allocated at once by one more call (traced separately,
+            so tracing does not slow down the timed calls).
+    """
+    times = []
+    for _ in range(repeats):
+        start = clock.perf_counter()
+        function()
+        times.append(clock.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak_bytes
+
+
+def run_benchmarks(cases, repeats = 3, report = None):
+    """
+    Runs benchmark cases.
+
+    Args:
+        cases: List of (name, parameters) from benchmark_cases.
+        repeats: Int representing how many timed calls each case gets.
+        report: Optional function called with each result as it is measured (ex: print).
+
+    Returns:
+        results: List of dictionaries with the benchmark name, its parameters, seconds and peak_bytes.
+    """
+    results = []
+    for name, parameters in cases:
+        setup, _ = BENCHMARKS[name]
+        function = setup(parameters["bodies"], parameters["depth"], parameters["steps"])
+        seconds, peak_bytes = measure(function, repeats)
+        result = {"name": name, "parameters": parameters, "seconds": seconds, "peak_bytes": peak_bytes}
+        results.append(result)
+        if report is not None:
+            report(result)
+    return results
+
+
+def _case_key(result):
+    return (result["name"], tuple(sorted(result["parameters"].items())))
+
+
+def load_history(path = DEFAULT_HISTORY):
+    """Returns the list of past benchmark runs stored in path (one JSON run per line), oldest first."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def save_run(results, path = DEFAULT_HISTORY, label = ""):
+    """Appends a run (its results, time and label, ex: a commit hash) to the history file."""
+    run = {"timestamp": clock.time(), "label": label, "python": sys.version.split()[0],
+           "numpy": np.__version__, "results": results}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as file:
+        file.write(json.dumps(run) + "\n")
+    return run
+
+
+def find_regressions(results, history, threshold = 0.25, window = 5):
+    """
+    Compares results with the median of the last window runs of each case in the history.
+
+    Args:
+        results: List of results from run_benchmarks.
+        history: List of past runs from load_history.
+        threshold: Float representing the allowed slowdown or memory growth (0.25 allows 25% over the baseline).
+        window: Int representing how many past runs make the baseline.
+
+    Returns:
+        regressions: List of dictionaries with the case name, parameters, metric ("seconds" or "peak_bytes"),
+            baseline and current value, for every metric above baseline*(1 + threshold).
+    """
+    past = {}
+    for run in history:
+        for result in run["results"]:
+            past.setdefault(_case_key(result), []).append(result)
+    regressions = []
+    for result in results:
+        previous = past.get(_case_key(result), [])[-window:]
+        if not previous:
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            baseline = statistics.median(entry[metric] for entry in previous)
+            if result[metric] > baseline*(1 + threshold):
+                regressions.append({"name": result["name"], "parameters": result["parameters"], "metric": metric,
+                                    "baseline": baseline, "current": result[metric]})
+    return regressions
+
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description="Benchmarks the simulator and fails on regressions against the history.")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="only run cases up to 10k bodies and 100 steps")
+    parser.add_argument("--repeats", type=int, default=3, help="timed calls per case (fastest is kept)")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON lines file of past runs")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown or memory growth, 0.25 is 25%%")
+    parser.add_argument("--label", default="", help="label stored with the run (ex: a commit hash)")
+    parser.add_argument("--no-save", action="store_true", help="compare without adding this run to the history")
+    options = parser.parse_args(arguments)
+
+    def report(result):
+        parameters = ", ".join(f"{key}={value}" for key, value in result["parameters"].items())
+        print(f"{result['name']:<34}{parameters:<36}{result['seconds']*1000:>12.3f} ms{result['peak_bytes']/2**20:>12.2f} MiB")
+
+    results = run_benchmarks(benchmark_cases(options.filter, options.quick), options.repeats, report)
+    regressions = find_regressions(results, load_history(options.history), options.threshold)
+    if not options.no_save:
+        save_run(results, options.history, options.label)
+    for regression in regressions:
+        print(f"REGRESSION {regression['name']} {regression['parameters']} {regression['metric']}: "
+              f"{regression['baseline']:.6g} -> {regression['current']:.6g}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+# Structure-of-arrays registry of simulated bodies, for systems too large for one Python object per body
+import math
+import numpy as np
+from orbital_system_sim import GRAVITATIONAL_CONSTANT, ORBITAL_ELEMENTS, OrbitingObject, OrbitalSystem
+
+
+def walk_system(system, orbiting_objects_dictionary, parent_name = None):
+    """
+    Goes through every simulated object of a system, then (depth first) the objects of any orbital system inside it.
+
+    Args:
+        system: Orbital System holding orbiting_objects_dictionary.
+        orbiting_objects_dictionary: Dictionary of objects, orbiting within system.
+        parent_name: String representing the name of the object at the center of system (None for the simulated system).
+
+    Yields:
+        Tuples (system, orbit_object_name, body, parent_name), where body is the object that moves for orbit_object_name
+        (the central object when orbit_object_name is an orbital system) and system is the system it orbits in.
+    """
+    for orbit_object_name, orbit_object in orbiting_objects_dictionary.items():
+        if isinstance(orbit_object, OrbitingObject):
+            yield system, orbit_object_name, orbit_object, parent_name
+        elif isinstance(orbit_object, OrbitalSystem):
+            # the central object of an orbital system orbits for the whole system
+            body = orbit_object.get_central_object()
+            yield system, orbit_object_name, body, parent_name
+            yield from walk_system(orbit_object, orbit_object.orbiting_objects, body.get_name())
+
+
+def _element_property(element):
+    """Returns a BodyView property reading and writing one of the registry's orbital element arrays."""
+    def getter(self):
+        return float(getattr(self._registry, element)[self._index])
+
+    def setter(self, value):
+        getattr(self._registry, element)[self._index] = value
+    return property(getter, setter)
+
+
+class BodyView:
+    """
+    Lightweight view of one body in a BodyRegistry, with the attribute names of SpaceObject / OrbitingObject.
+    Reading or setting an attribute reads or writes the registry's arrays.
+    """
+    __slots__ = ("_registry", "_index")
+
+    def __init__(self, registry, index):
+        self._registry = registry
+        self._index = index
+
+    def __repr__(self):
+        return f"Name: {self.name}, radius: {self.radius} km, mass: {self.mass} kg, x start: {self.start_x}, y start: {self.start_y}, z start: {self.start_z}, semi-major axis: {self.distance_from_center} AU"
+
+    def get_name(self):
+        """Returns name of the body."""
+        return self.name
+
+    @property
+    def name(self):
+        return self._registry.names[self._index]
+
+    @property
+    def radius(self):
+        return float(self._registry.radius[self._index])
+
+    @radius.setter
+    def radius(self, value):
+        self._registry.radius[self._index] = value
+
+    @property
+    def mass(self):
+        return float(self._registry.mass[self._index])
+
+    @mass.setter
+    def mass(self, value):
+        self._registry.mass[self._index] = value
+        # the body's own period and those of everything orbiting it depend on its mass
+        self._registry.update_periods(np.r_[self._index, np.flatnonzero(self._registry.parent_index == self._index)])
+
+    @property
+    def distance_from_center(self):
+        return float(self._registry.distance_from_center[self._index])
+
+    @distance_from_center.setter
+    def distance_from_center(self, value):
+        self._registry.distance_from_center[self._index] = value
+        self._registry.update_periods([self._index])
+
+    @property
+    def start_x(self):
+        return float(self._registry.start[self._index, 0])
+
+    @start_x.setter
+    def start_x(self, value):
+        self._registry.start[self._index, 0] = value
+
+    @property
+    def start_y(self):
+        return float(self._registry.start[self._index, 1])
+
+    @start_y.setter
+    def start_y(self, value):
+        self._registry.start[self._index, 1] = value
+
+    @property
+    def start_z(self):
+        return float(self._registry.start[self._index, 2])
+
+    @start_z.setter
+    def start_z(self, value):
+        self._registry.start[self._index, 2] = value
+
+    eccentricity = _element_property("eccentricity")
+    inclination = _element_property("inclination")
+    longitude_of_ascending_node = _element_property("longitude_of_ascending_node")
+    argument_of_periapsis = _element_property("argument_of_periapsis")
+    mean_anomaly = _element_property("mean_anomaly")
+
+    @property
+    def orbital_period(self):
+        return float(self._registry.orbital_period[self._index])
+
+    @property
+    def parent(self):
+        """Returns the view of the body this one orbits, None when it orbits the system center."""
+        parent_index = self._registry.parent_index[self._index]
+        return None if parent_index == -1 else BodyView(self._registry, int(parent_index))
+
+
+class BodyRegistry:
+    """
+    Structure-of-arrays store of the orbiting bodies of a system. Can be flattened from an Orbital System or built
+    directly from arrays (ex: a constellation of 100k satellites) without creating one Python object per body.
+
+    Attributes:
+        names: List of body names.
+        mass: Numpy array holding the mass of each body in kg.
+        radius: Numpy array holding the radius of each body in km.
+        distance_from_center: Numpy array holding each body's orbit radius around its parent in AU.
+        start: Numpy array (bodies x 3) holding start x, y, z positions in AU.
+        parent_index: Numpy int array holding the index of the body each body orbits, -1 for the system center.
+        orbital_period: Numpy array holding each body's orbital period in Earth years.
+        eccentricity, inclination, longitude_of_ascending_node, argument_of_periapsis, mean_anomaly: Numpy arrays holding
+            each body's orbital elements (angles in radians), all zero for circular orbits in the x-y plane.
+        center_name: String representing the name of the system's central object.
+        center_mass: Float representing the mass of the system's central object in kg.
+        center_start: Numpy array holding the start x, y, z position of the system's central object in AU.
+        depth: Numpy int array holding how many parents each body has.
+        levels: List of numpy int arrays, levels[d] holds the indices of all bodies at depth d.
+    """
+    def __init__(self, names, mass, radius, distance_from_center, start, parent_index, center_name = "Center",
+                 center_mass = 0.0, center_start = (0, 0, 0), orbital_period = None,
+                 orbital_elements = None):
+        self.names = list(names)
+        self._index = {name: i for i, name in enumerate(self.names)}
+        if len(self._index) != len(self.names):
+            raise ValueError("Body names must be unique.")
+        self.mass = np.array(mass, dtype=float)
+        self.radius = np.array(radius, dtype=float)
+        self.distance_from_center = np.array(distance_from_center, dtype=float)
+        self.start = np.array(start, dtype=float).reshape(len(self.names), 3)
+        self.parent_index = np.array(parent_index, dtype=int)
+        self.center_name = center_name
+        self.center_mass = float(center_mass)
+        self.center_start = np.array(center_start, dtype=float)
+        self._compile_levels()
+        if orbital_period is None:
+            self.orbital_period = np.zeros(len(self.names))
+            self.update_periods(np.arange(len(self.names)))
+        else:
+            self.orbital_period = np.array(orbital_period, dtype=float)
+        orbital_elements = orbital_elements or {}
+        unknown = set(orbital_elements) - set(ORBITAL_ELEMENTS)
+        if unknown:
+            raise ValueError(f"Unknown orbital elements {', '.join(sorted(unknown))}.")
+        for element in ORBITAL_ELEMENTS:
+            values = orbital_elements.get(element)
+            setattr(self, element, np.zeros(len(self.names)) if values is None else np.array(values, dtype=float))
+        if np.any(self.eccentricity < 0) or np.any(self.eccentricity >= 1):
+            raise ValueError("The eccentricity of an orbit must be at least 0 and below 1.")
+
+    @classmethod
+    def from_system(cls, system):
+        """
+        Flattens an Orbital System (nested systems included) into a registry. Periods are taken from
+        the systems' get_orbital_elements, so simulations match establish_simulation exactly.
+
+        Args:
+            system: Orbital System to flatten.
+
+        Returns:
+            registry: BodyRegistry holding every body establish_simulation would simulate, in the same order.
+        """
+        names, mass, radius, distance, start, parent_index, period = [], [], [], [], [], [], []
+        elements = {element: [] for element in ORBITAL_ELEMENTS}
+        index = {}
+        for current_system, orbit_object_name, body, parent_name in walk_system(system, system.orbiting_objects):
+            index[body.get_name()] = len(names)
+            names.append(body.get_name())
+            mass.append(body.mass)
+            radius.append(body.radius)
+            orbit = current_system.get_orbital_elements(orbit_object_name)
+            distance.append(orbit["radius"])
+            start.append((body.start_x, body.start_y, body.start_z))
+            parent_index.append(-1 if parent_name is None else index[parent_name])
+            period.append(orbit["period"])
+            for element, values in elements.items():
+                values.append(getattr(body, element, 0.0)) # bodies without elements (ex: a Star at the center of a nested system) orbit on circles
+        central_object = system.get_central_object()
+        return cls(names, mass, radius, distance, np.reshape(start, (len(names), 3)), parent_index,
+                   central_object.get_name(), central_object.mass,
+                   (central_object.start_x, central_object.start_y, central_object.start_z), period, elements)
+
+    def __repr__(self):
+        return f"Body registry around {self.center_name}: {len(self.names)} bodies, {len(self.levels)} levels"
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __getitem__(self, name):
+        """Returns a BodyView of the body with the given name (or index)."""
+        if isinstance(name, (int, np.integer)):
+            if not -len(self.names) <= name < len(self.names):
+                raise IndexError(f"Body index {name} out of range.")
+            return BodyView(self, int(name) % len(self.names))
+        if name not in self._index:
+            raise ValueError(f"Object {name} not found in registry.")
+        return BodyView(self, self._index[name])
+
+    def __iter__(self):
+        return (BodyView(self, i) for i in range(len(self.names)))
+
+    def index(self, name):
+        """Returns the position of a body in the registry's arrays."""
+        if name not in self._index:
+            raise ValueError(f"Object {name} not found in registry.")
+        return self._index[name]
+
+    def angular_velocities(self):
+        """Returns a numpy array holding each body's angular velocity in radians per year."""
+        return 2*math.pi/self.orbital_period
+
+    def parent_names(self):
+        """Returns a dictionary holding the name of the body each body orbits, None for the system center."""
+        return {name: None if parent == -1 else self.names[parent] for name, parent in zip(self.names, self.parent_index)}
+
+    def parent_masses(self):
+        """Returns a numpy array holding the mass each body orbits (its parent's, or the central object's)."""
+        return np.where(self.parent_index == -1, self.center_mass, self.mass[self.parent_index])
+
+    def update_periods(self, indices):
+        """
+        Recomputes the orbital periods of the given bodies from their distance and masses.
+
+        Args:
+            indices: Sequence of body indices to update.
+        """
+        indices = np.asarray(indices, dtype=int)
+        distance = self.distance_from_center[indices]
+        total_mass = self.mass[indices] + self.parent_masses()[indices]
+        self.orbital_period[indices] = np.sqrt((distance**3*4*math.pi**2)/(GRAVITATIONAL_CONSTANT*total_mass))/31536000
+
+    def _compile_levels(self):
+        """Computes depth and levels from parent_index, one pass per level of the tree."""
+        num_bodies = len(self.names)
+        if np.any(self.parent_index >= num_bodies) or np.any(self.parent_index < -1):
+            raise ValueError("Parent index out of range.")
+        self.depth = np.zeros(num_bodies, dtype=int)
+        ancestor = self.parent_index.copy()
+        climbing = ancestor != -1
+        while climbing.any():
+            self.depth[climbing] += 1
+            if self.depth.max() > num_bodies:
+                raise ValueError("Parent indices contain a cycle.")
+            ancestor[climbing] = self.parent_index[ancestor[climbing]]
+            climbing = ancestor != -1
+        num_levels = self.depth.max() + 1 if num_bodies else 0
+        self.levels = [np.flatnonzero(self.depth == d) for d in range(num_levels)]
+
+
+def as_registry(system):
+    """Returns system itself if it is a BodyRegistry, otherwise the registry flattened from the Orbital System."""
+    if isinstance(system, BodyRegistry):
+        return system
+    return BodyRegistry.from_system(system)
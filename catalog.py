@@ -0,0 +1,78 @@
+# Reads catalogs of space objects (CSV or JSON) and adds them to orbital systems in bulk
+import csv
+import json
+from orbital_system_sim import ORBITAL_ELEMENTS, Planet, Satellite, Star
+
+CATALOG_TYPES = {"planet": Planet, "satellite": Satellite, "star": Star}
+NUMBER_FIELDS = ("radius", "mass", "start_x", "start_y", "start_z", "distance_from_center", "lifetime", "luminosity") + ORBITAL_ELEMENTS
+
+
+def _build_object(record, row):
+    """Creates a Planet, Satellite or Star from one catalog record (a dictionary of strings or numbers)."""
+    object_type = str(record.get("type", "")).strip().lower()
+    if object_type not in CATALOG_TYPES:
+        raise ValueError(f"Unknown object type {record.get('type')} in catalog row {row}.")
+    values = {}
+    for field, value in record.items():
+        if value is None or value == "":
+            continue
+        values[field] = float(value) if field in NUMBER_FIELDS else value
+    try:
+        common = (values["name"], values["radius"], values["mass"],
+                  values.get("start_x", 0.0), values.get("start_y", 0.0), values.get("start_z", 0.0))
+        orbital_elements = {element: values[element] for element in ORBITAL_ELEMENTS if element in values}
+        if object_type == "star":
+            return Star(*common, values["luminosity"], values.get("spectral_type", ""))
+        elif object_type == "planet":
+            return Planet(*common, values["distance_from_center"], values.get("planet_type", ""), **orbital_elements)
+        else:
+            return Satellite(*common, values["distance_from_center"], values.get("lifetime", 0.0), values.get("material", ""), **orbital_elements)
+    except KeyError as error:
+        raise ValueError(f"Missing field {error.args[0]} in catalog row {row}.") from None
+
+
+def load_catalog(path, file_format = None):
+    """
+    Reads space objects from a catalog file.
+
+    Args:
+        path: String representing the catalog file. CSV files have a header row, JSON files hold a list of records
+            (or {"objects": [...]}). Each record has a type (planet, satellite or star), name, radius (km), mass (kg),
+            optional start_x, start_y, start_z (AU, default 0) and the fields of its type: distance_from_center (AU)
+            and planet_type for planets, distance_from_center, lifetime and material for satellites, luminosity and
+            spectral_type for stars. Planets and satellites also take the optional orbital elements eccentricity,
+            inclination, longitude_of_ascending_node, argument_of_periapsis and mean_anomaly (radians, default 0).
+        file_format: String, "csv" or "json" (defaults to the file extension).
+
+    Returns:
+        objects: List of Planet, Satellite and Star objects, in file order.
+    """
+    if file_format is None:
+        file_format = "json" if str(path).lower().endswith(".json") else "csv"
+    if file_format == "csv":
+        with open(path, newline="") as file:
+            records = list(csv.DictReader(file))
+    elif file_format == "json":
+        with open(path) as file:
+            records = json.load(file)
+        if isinstance(records, dict):
+            records = records["objects"]
+    else:
+        raise ValueError(f"Unknown catalog format {file_format}.")
+    return [_build_object(record, row) for row, record in enumerate(records, start=1)]
+
+
+def add_catalog(system, path, on_conflict = "error", file_format = None):
+    """
+    Reads a catalog file and adds every object in it to a system, without prompting.
+
+    Args:
+        system: Orbital System to add the objects to.
+        path: String representing the catalog file (see load_catalog).
+        on_conflict: String, "replace", "skip" or "error" for names already in the system (see add_orbiting_objects).
+        file_format: String, "csv" or "json" (defaults to the file extension).
+
+    Returns:
+        report: Dictionary with lists of the names "added", "replaced" and "skipped".
+    """
+    return system.add_orbiting_objects(load_catalog(path, file_format), on_conflict)
@@ -0,0 +1,201 @@
+# Command line interface: python cli.py {period, simulate, export, plot} ...
+# NumPy, pandas and matplotlib are only imported by the commands that need them, so period queries start fast.
+import argparse
+import sys
+import time as clock
+from orbital_system_sim import Planet, Satellite, Star, OrbitalSystem, PlanetaryOrbitalSystem, StellarOrbitalSystem
+
+DEFAULT_TIMESTEP = 0.00273973*7 # one week in years
+
+
+def build_demo_system():
+    """Builds the Sun / Mercury / Mars system (with Phobos and Deimos) simulated by default."""
+    mercury_planet = Planet("Mercury", 100, 100, 0, 0, 0, 0.3, "rocky") # creating planets
+    mars_planet = Planet("Mars", 3390, 6.4191*10**23, 0, 0, 0, 1.5, "rocky")
+    phobos_moon = Satellite("Phobos", 11, 0, 0, 0, 0, 0.00004011, 100, "asteroid") # creating Martian planet moons as satellite instances
+    deimos_moon = Satellite("Deimos", 11, 0, 0, 0, 0, 0.00004011, 100, "asteroid")
+    mars_system = PlanetaryOrbitalSystem("Mars system", mars_planet) # creating Mars orbit system
+    mars_system.add_orbiting_objects([phobos_moon, deimos_moon])
+    sun = Star("Sun", 695700, 1.989e30, 0, 0, 0, 3.828e26, "O-type") # creating Sun
+    solar_system = StellarOrbitalSystem("Solar System", sun)
+    solar_system.add_orbiting_objects([mars_system, mercury_planet])
+    return solar_system
+
+
+def load_system(catalog_path = None):
+    """
+    Returns the system to work on: the demo system, or the system of a catalog file around its first star.
+
+    Args:
+        catalog_path: String representing a catalog file (see catalog.load_catalog), None for the demo system.
+    """
+    if catalog_path is None:
+        return build_demo_system()
+    import catalog
+    objects = catalog.load_catalog(catalog_path)
+    stars = [object for object in objects if isinstance(object, Star)]
+    if not stars:
+        raise ValueError(f"Catalog {catalog_path} has no star to put at the center.")
+    system = StellarOrbitalSystem(f"{stars[0].name} system", stars[0])
+    system.add_orbiting_objects([object for object in objects if object is not stars[0]])
+    return system
+
+
+def find_orbit(system, name):
+    """Returns the (system, orbiting object name) pair that name orbits in, searching nested systems too."""
+    for orbit_object_name, orbit_object in system.orbiting_objects.items():
+        if isinstance(orbit_object, OrbitalSystem):
+            if orbit_object.central_object.name == name:
+                return system, orbit_object_name
+            found = find_orbit(orbit_object, name)
+            if found is not None:
+                return found
+        elif orbit_object_name == name:
+            return system, orbit_object_name
+    return None
+
+
+def period_command(options):
+    system = load_system(options.catalog)
+    names = options.names
+    if not names:
+        names = [orbit_object.central_object.name if isinstance(orbit_object, OrbitalSystem) else orbit_object_name
+                 for orbit_object_name, orbit_object in system.orbiting_objects.items()]
+    for name in names:
+        found = find_orbit(system, name)
+        if found is None:
+            raise ValueError(f"Object {name} not found in system.")
+        elements = found[0].get_orbital_elements(found[1])
+        print(f"{name}: period {elements['period']:.6g} years, angular velocity {elements['angular_velocity']:.6g} rad/year, "
+              f"semi-major axis {elements['radius']:.6g} AU")
+    return 0
+
+
+def simulate_command(options):
+    import simulate_orbits
+    system = load_system(options.catalog)
+    start = clock.perf_counter()
+    profile = False
+    if options.report is not None:
+        import instrumentation
+        profile = instrumentation.RunReport(track_memory=options.track_memory)
+    result = simulate_orbits.run_simulation(system, options.duration, options.timestep, options.engine,
+                                            cache=options.cache or None, profile=profile)
+    seconds = clock.perf_counter() - start
+    positions, time = result[0], result[1]
+    print(f"Simulated {len(positions)} objects over {len(time)} steps with the {options.engine} engine in {seconds:.3f} s")
+    if len(time):
+        for name, trajectory in positions.items():
+            x, y, z = trajectory[-1]
+            print(f"{name}: x {x:.6g} AU, y {y:.6g} AU, z {z:.6g} AU at {time[-1]:.6g} years")
+    if options.report is not None:
+        result[2].to_json(options.report)
+    return 0
+
+
+def export_command(options):
+    import simulate_orbits
+    system = load_system(options.catalog)
+    file_format = options.format
+    if file_format is None:
+        file_format = {".parquet": "parquet", ".csv": "csv"}.get(options.output[options.output.rfind("."):].lower(), "npy")
+    if file_format == "csv":
+        import data_wrangling
+        positions, time = simulate_orbits.run_simulation(system, options.duration, options.timestep, options.engine,
+                                                         cache=options.cache or None, dtype=options.dtype)
+        data_wrangling.convert_simulation_to_dataframe(positions, time).to_csv(options.output, index=False)
+        num_steps = len(time)
+    else:
+        # stream the run in chunks, so long runs never sit in memory whole
+        chunks = simulate_orbits.iter_simulation(system, options.duration, options.timestep, options.engine, dtype=options.dtype)
+        if file_format == "store":
+            import trajectory_store
+            num_steps = round(options.duration/options.timestep)
+            trajectory_store.save_trajectory_chunks(options.output, chunks, num_steps, options.dtype, options.drop_constant)
+        else:
+            import data_wrangling
+            num_steps = data_wrangling.write_simulation_chunks(chunks, options.output, file_format)
+    print(f"Wrote {num_steps} steps to {options.output} ({file_format})")
+    return 0
+
+
+def plot_command(options):
+    import simulate_orbits
+    import data_wrangling
+    import visualization
+    system = load_system(options.catalog)
+    positions, time = simulate_orbits.run_simulation(system, options.duration, options.timestep, options.engine,
+                                                     cache=options.cache or None)
+    grouped = visualization.group_trajectories(data_wrangling.convert_simulation_to_dataframe(positions, time))
+    if options.object is None:
+        job = {"plot": "system", "system": system}
+    else:
+        job = {"plot": "object", "object_name": options.object}
+    job.update(df=grouped, x_axis=options.x_axis, y_axis=options.y_axis)
+    if options.output is None:
+        visualization.PLOTS[job.pop("plot")](**job) # opens a window
+    else:
+        visualization.render_figures([dict(job, path=options.output)], processes=1)
+        print(f"Wrote {options.output}")
+    return 0
+
+
+def build_parser():
+    """Returns the argument parser of the command line interface."""
+    parser = argparse.ArgumentParser(description="Orbit simulator.")
+    parser.add_argument("--catalog", help="catalog file (CSV or JSON) to build the system from, around its first star "
+                                          "(default: Sun, Mercury, Mars with Phobos and Deimos)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    period = commands.add_parser("period", help="print orbital periods")
+    period.add_argument("names", nargs="*", help="objects to describe (default: every object orbiting the central object)")
+    period.set_defaults(run=period_command)
+
+    simulation = argparse.ArgumentParser(add_help=False) # options shared by the commands that simulate
+    simulation.add_argument("--duration", type=float, default=2, help="simulated time in years (default 2)")
+    simulation.add_argument("--timestep", type=float, default=DEFAULT_TIMESTEP, help="timestep in years (default one week)")
+    simulation.add_argument("--engine", default="vectorized", help="simulation engine (vectorized, loop, kepler, nbody, adaptive)")
+    simulation.add_argument("--cache", action="store_true", help="reuse stored results of identical runs")
+
+    simulate = commands.add_parser("simulate", parents=[simulation], help="run a simulation and print final positions")
+    simulate.add_argument("--report", help="write a JSON run report (stage timings, throughput) to this file")
+    simulate.add_argument("--track-memory", action="store_true", help="also record peak memory in the report (slows the run down)")
+    simulate.set_defaults(run=simulate_command)
+
+    export = commands.add_parser("export", parents=[simulation], help="run a simulation and write it to disk")
+    export.add_argument("output", help="file or directory to write")
+    export.add_argument("--format", choices=["npy", "parquet", "csv", "store"],
+                        help="npy shards, Parquet, CSV or a memory-mappable trajectory store (default: from the extension, npy otherwise)")
+    export.add_argument("--dtype", choices=["float64", "float32"], default="float64", help="precision of stored positions")
+    export.add_argument("--drop-constant", action="store_true", help="store: leave out axes that never change (ex: z)")
+    export.set_defaults(run=export_command)
+
+    plot = commands.add_parser("plot", parents=[simulation], help="plot a simulation")
+    plot.add_argument("--object", help="plot a single object (default: the whole system)")
+    plot.add_argument("--x-axis", default="Time", help="column on the x axis (default Time)")
+    plot.add_argument("--y-axis", default="X_pos", help="column on the y axis (default X_pos)")
+    plot.add_argument("--output", help="image file to write instead of opening a window")
+    plot.set_defaults(run=plot_command)
+    return parser
+
+
+def main(arguments = None):
+    """
+    Runs the command line interface.
+
+    Args:
+        arguments: List of strings representing the command line arguments (defaults to sys.argv[1:]).
+
+    Returns:
+        status: Int exit status, 0 on success, 1 on errors.
+    """
+    options = build_parser().parse_args(arguments)
+    try:
+        return options.run(options)
+    except (ValueError, TypeError, OSError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# Detects close approaches and collisions between bodies in simulation output
+import numpy as np
+import pandas as pd
+from orbital_system_sim import OrbitalSystem
+from body_registry import as_registry
+
+KM_PER_AU = 149597870.7
+
+
+def _candidate_pairs(low, high):
+    """
+    Sweep and prune: returns the index pairs (i < j in sorted order) of boxes that overlap on every axis.
+
+    Args:
+        low: Numpy array (boxes x 3) holding the lower corner of each box.
+        high: Numpy array (boxes x 3) holding the upper corner of each box.
+
+    Returns:
+        first, second: Numpy int arrays holding the indices of the overlapping pairs.
+    """
+    order = np.argsort(low[:, 0], kind="stable")
+    sorted_low = low[order, 0]
+    # boxes starting before box i ends along x, after it in sorted order, are the only ones that can overlap it
+    ends = np.searchsorted(sorted_low, high[order, 0], side="right")
+    counts = np.maximum(ends - np.arange(1, len(order) + 1), 0)
+    first = np.repeat(np.arange(len(order)), counts)
+    second = first + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    first, second = order[first], order[second]
+    overlap = np.all((low[first, 1:] <= high[second, 1:]) & (low[second, 1:] <= high[first, 1:]), axis=1)
+    return first[overlap], second[overlap]
+
+
+def find_close_approaches(positions, time, threshold, system = None, radii = None, start_step = 0):
+    """
+    Finds every time two bodies come within threshold of each other (or touch, with their radii).
+    Each body's path between two output times is boxed and the boxes are sorted along x, so only pairs whose
+    boxes overlap are measured: the cost grows with bodies*log(bodies) per step rather than bodies^2.
+    Bodies move in straight lines between output times, so the timestep should be short next to the encounters.
+
+    Args:
+        positions: Dictionary holding x, y, z positions (steps x 3) of each body, as returned by run_simulation
+            (or TrajectoryStore.positions_dictionary).
+        time: Numpy array (vector) holding the times of the positions in years.
+        threshold: Float representing the approach distance in AU between the bodies' surfaces (0 for collisions).
+        system: Optional Orbital System or BodyRegistry. Its bodies' radii (km) are added to the distances, and its
+            central object is included, fixed at the origin, when positions does not hold it.
+        radii: Optional dictionary holding radii in AU by body name, used instead of (or on top of) system's.
+        start_step: Int representing the first row searched. The "vectorized" and "loop" engines' first row holds
+            the start positions (often every body at the origin), so pass 1 for their output to avoid false
+            approaches at time 0.
+
+    Returns:
+        approaches: Dataframe with a row per approach: Time of the closest point, Object_A, Object_B and the
+            center to center Distance in AU. An approach lasting several steps is one row.
+    """
+    positions = dict(positions)
+    body_radii = {}
+    if system is not None:
+        registry = as_registry(system)
+        if registry.center_name not in positions:
+            positions[registry.center_name] = np.zeros((len(time), 3))
+        if isinstance(system, OrbitalSystem): # registries do not hold the central object's radius
+            body_radii[registry.center_name] = system.get_central_object().radius/KM_PER_AU
+        body_radii.update(zip(registry.names, registry.radius/KM_PER_AU))
+    body_radii.update(radii or {})
+
+    names = list(positions)
+    trajectories = np.stack([np.asarray(positions[name], dtype=float)[:len(time)] for name in names]) if names else np.zeros((0, len(time), 3))
+    time = np.asarray(time, dtype=float)
+    trajectories, time = trajectories[:, start_step:], time[start_step:]
+    reach = np.array([body_radii.get(name, 0.0) for name in names]) + threshold/2 # box padding of each body
+    if len(time) == 1:
+        trajectories, time = np.repeat(trajectories, 2, axis=1), np.repeat(time, 2)
+
+    steps, first_bodies, second_bodies, distances, times = [], [], [], [], []
+    for step in range(len(time) - 1):
+        start, end = trajectories[:, step], trajectories[:, step + 1]
+        first, second = _candidate_pairs(np.minimum(start, end) - reach[:, None], np.maximum(start, end) + reach[:, None])
+        # closest point of the straight relative motion between the two output times
+        relative = start[second] - start[first]
+        motion = end[second] - end[first] - relative
+        speed_squared = np.einsum("ij,ij->i", motion, motion)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fraction = np.clip(-np.einsum("ij,ij->i", relative, motion)/speed_squared, 0, 1)
+        fraction[speed_squared == 0] = 0
+        distance = np.linalg.norm(relative + fraction[:, None]*motion, axis=1)
+        close = distance <= reach[first] + reach[second]
+        steps.append(np.full(close.sum(), step))
+        first_bodies.append(np.minimum(first, second)[close])
+        second_bodies.append(np.maximum(first, second)[close])
+        distances.append(distance[close])
+        times.append(time[step] + fraction[close]*(time[step + 1] - time[step]))
+
+    columns = ["Time", "Object_A", "Object_B", "Distance"]
+    if not names or not sum(len(step) for step in steps):
+        return pd.DataFrame({column: [] for column in columns})
+    steps, first_bodies, second_bodies = np.concatenate(steps), np.concatenate(first_bodies), np.concatenate(second_bodies)
+    distances, times = np.concatenate(distances), np.concatenate(times)
+
+    # merge consecutive steps of the same pair into one approach, keeping its closest point
+    order = np.lexsort((steps, second_bodies, first_bodies))
+    steps, first_bodies, second_bodies = steps[order], first_bodies[order], second_bodies[order]
+    distances, times = distances[order], times[order]
+    new_approach = np.r_[True, (np.diff(first_bodies) != 0) | (np.diff(second_bodies) != 0) | (np.diff(steps) > 1)]
+    approach = np.cumsum(new_approach) - 1
+    closest = np.lexsort((distances, approach))
+    closest = closest[np.r_[True, np.diff(approach[closest]) != 0]]
+    closest = closest[np.argsort(times[closest], kind="stable")]
+    return pd.DataFrame({"Time": times[closest],
+                         "Object_A": [names[i] for i in first_bodies[closest]],
+                         "Object_B": [names[i] for i in second_bodies[closest]],
+                         "Distance": distances[closest]})
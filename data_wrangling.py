@@ -1,22 +1,158 @@
+import json
+import os
+import numpy as np
 import pandas as pd
+import instrumentation
 
+@instrumentation.timed("dataframe")
 def convert_simulation_to_dataframe(dictionary, time):
     """
     Converts dictionary into a pandas dataframe.
+    Columns are built whole from the position arrays, so no per-row Python objects are created.
 
     Args:
         dictionary: Dioctionary representing simulation data over time
         time: Numpy array (vector) holding a timestep-ed time vector in years.
 
     Returns:
-        df: Dataframe with all dictionary values as column values, row for each time
+        df: Dataframe with all dictionary values as column values, row for each time.
+            Object is a categorical column with the objects in dictionary order.
 
     """
-    data_list = []
+    names = list(dictionary.keys())
+    num_steps = len(time)
+    columns = {"Time": np.tile(np.asarray(time, dtype=float), len(names))}
+    codes = np.repeat(np.arange(len(names)), num_steps) # rows are grouped by object, then time
+    columns["Object"] = pd.Categorical.from_codes(codes, categories=pd.Index(names, dtype=object))
+    for axis, column in enumerate(["X_pos", "Y_pos", "Z_pos"]):
+        if names:
+            columns[column] = np.concatenate([np.asarray(dictionary[name])[:num_steps, axis] for name in names])
+        else:
+            columns[column] = np.zeros(0)
 
-    for object_name, pos_array in dictionary.items():
-        for i in range(len(time)):
-            data_list.append([time[i], object_name, pos_array[i, 0], pos_array[i, 1], pos_array[i, 2]])
+    df = pd.DataFrame(columns, copy=False)
+    return df
 
-    df = pd.DataFrame(data_list, columns=["Time", "Object", "X_pos", "Y_pos", "Z_pos"])
-    return df
\ No newline at end of file
+
+def _chunk_format(path, file_format):
+    """Returns the file format of a chunked simulation file, "parquet" for .parquet paths and "npy" otherwise."""
+    if file_format is None:
+        file_format = "parquet" if str(path).endswith(".parquet") else "npy"
+    if file_format not in ("npy", "parquet"):
+        raise ValueError(f"Unknown simulation file format {file_format}.")
+    return file_format
+
+
+@instrumentation.timed("write")
+def write_simulation_chunks(chunks, path, file_format = None):
+    """
+    Writes simulation chunks to disk as they are produced, so only one chunk is ever held in memory.
+
+    Args:
+        chunks: Iterable of (positions, time) pairs, such as simulate_orbits.iter_simulation.
+        path: String representing where to write. "npy" writes a directory of .npy shards (two per chunk) and a
+            metadata.json, "parquet" writes one Parquet file (one row group per chunk, same columns as
+            convert_simulation_to_dataframe) and needs pyarrow. A system with no objects is written to Parquet
+            as one row per time with a null Object and null positions, so its times are kept.
+        file_format: String, "npy" or "parquet" (defaults to "parquet" when path ends in .parquet, "npy" otherwise).
+
+    Returns:
+        num_steps: Int representing the total number of timesteps written.
+    """
+    file_format = _chunk_format(path, file_format)
+    names = None
+    num_steps = 0
+    num_chunks = 0
+    if file_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+    else:
+        os.makedirs(path, exist_ok=True)
+
+    for positions, time in chunks:
+        if names is None:
+            names = list(positions.keys())
+        if file_format == "npy":
+            np.save(os.path.join(path, f"time_{num_chunks:05d}.npy"), np.asarray(time, dtype=float))
+            stacked = np.stack([positions[name] for name in names]) if names else np.zeros((0, len(time), 3))
+            np.save(os.path.join(path, f"positions_{num_chunks:05d}.npy"), stacked)
+        else:
+            if names:
+                table = pa.Table.from_pandas(convert_simulation_to_dataframe(positions, time), preserve_index=False)
+            else:
+                # no object rows to carry the times, so each time gets a row with a null object and position
+                table = pa.table({"Time": np.asarray(time, dtype=float), "Object": pa.nulls(len(time)),
+                                  **{column: pa.nulls(len(time), pa.float64()) for column in ["X_pos", "Y_pos", "Z_pos"]}})
+            if writer is None:
+                schema = table.schema.with_metadata({"names": json.dumps(names)})
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(table.cast(writer.schema), row_group_size=max(table.num_rows, 1))
+        num_steps += len(time)
+        num_chunks += 1
+
+    if file_format == "npy":
+        with open(os.path.join(path, "metadata.json"), "w") as file:
+            json.dump({"names": names or [], "num_chunks": num_chunks, "num_steps": num_steps}, file)
+    else:
+        if writer is None: # no chunks: an empty file with the columns, so it still reads back
+            schema = pa.schema([("Time", pa.float64()), ("Object", pa.null()), ("X_pos", pa.float64()),
+                                ("Y_pos", pa.float64()), ("Z_pos", pa.float64())], metadata={"names": json.dumps([])})
+            writer = pq.ParquetWriter(path, schema)
+        writer.close()
+    return num_steps
+
+
+def read_simulation_chunks(path, file_format = None):
+    """
+    Reads a file written by write_simulation_chunks back one chunk at a time.
+
+    Args:
+        path: String representing the directory or Parquet file to read.
+        file_format: String, "npy" or "parquet" (inferred from path as in write_simulation_chunks).
+
+    Yields:
+        positions: Dictionary holding x, y, z positions of each object for the chunk's timesteps
+            (for "npy", read-only memory-mapped views of the shard).
+        time: Numpy array (vector) holding the chunk's times in years.
+    """
+    file_format = _chunk_format(path, file_format)
+    if file_format == "npy":
+        with open(os.path.join(path, "metadata.json")) as file:
+            metadata = json.load(file)
+        for k in range(metadata["num_chunks"]):
+            time = np.load(os.path.join(path, f"time_{k:05d}.npy"))
+            positions = np.load(os.path.join(path, f"positions_{k:05d}.npy"), mmap_mode="r")
+            yield {name: positions[i] for i, name in enumerate(metadata["names"])}, time
+        return
+
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(path)
+    names = json.loads(parquet_file.schema_arrow.metadata[b"names"])
+    for k in range(parquet_file.num_row_groups):
+        table = parquet_file.read_row_group(k, columns=["Time", "X_pos", "Y_pos", "Z_pos"])
+        if not names:
+            yield {}, table.column("Time").to_numpy() # one placeholder row per time
+            continue
+        num_steps = table.num_rows//len(names) # rows are grouped by object, then time
+        columns = [table.column(column).to_numpy().reshape(len(names), num_steps) for column in ["X_pos", "Y_pos", "Z_pos"]]
+        positions = np.stack(columns, axis=-1)
+        time = table.column("Time").to_numpy()[:num_steps]
+        yield {name: positions[i] for i, name in enumerate(names)}, time
+
+
+def read_simulation_dataframe(path, file_format = None):
+    """
+    Reads a whole file written by write_simulation_chunks into one dataframe (see convert_simulation_to_dataframe).
+
+    Args:
+        path: String representing the directory or Parquet file to read.
+        file_format: String, "npy" or "parquet" (inferred from path as in write_simulation_chunks).
+
+    Returns:
+        df: Dataframe with Time, Object, X_pos, Y_pos, Z_pos columns, rows grouped by chunk, then object, then time.
+    """
+    frames = [convert_simulation_to_dataframe(positions, time) for positions, time in read_simulation_chunks(path, file_format)]
+    if not frames:
+        return convert_simulation_to_dataframe({}, [])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,124 @@
+# Opt-in timing and memory instrumentation of simulation runs, exported as structured JSON reports
+import contextlib
+import contextvars
+import functools
+import json
+import math
+import time as clock
+import tracemalloc
+
+_active_report = contextvars.ContextVar("active_report", default=None) # the report being recorded, if any
+
+
+class RunReport:
+    """
+    Timings, counters and peak memory of a run. Stages are timed while the report is recording (see recording),
+    so one report can follow a simulation, its DataFrame conversion and its plots.
+
+    Attributes:
+        stages: Dictionary holding {"seconds": ..., "calls": ...} for each stage name (ex: "establish", "propagate").
+        counters: Dictionary of counts (ex: bodies, steps, body_steps, body_steps_per_second, adaptive step stats).
+        info: Dictionary describing the run (ex: engine, sim_duration, timestep).
+        total_seconds: Float representing the wall-clock time spent recording.
+        peak_bytes: Int representing the largest memory allocated at once while recording (None if not tracked).
+        track_memory: Boolean, True also traces allocations with tracemalloc. Off by default, since tracing
+            slows Python-heavy code down and so skews the stage timings.
+    """
+    def __init__(self, track_memory = False):
+        self.stages = {}
+        self.counters = {}
+        self.info = {}
+        self.total_seconds = 0.0
+        self.peak_bytes = None
+        self.track_memory = track_memory
+
+    def __repr__(self):
+        stages = ", ".join(f"{name} {stage['seconds']*1000:.3f} ms" for name, stage in self.stages.items())
+        return f"Run report: {self.total_seconds*1000:.3f} ms ({stages})"
+
+    @contextlib.contextmanager
+    def recording(self):
+        """Context manager making this the active report: stages reached inside it are timed into it."""
+        token = _active_report.set(self)
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        elif self.track_memory:
+            tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0] if self.track_memory else 0
+        start = clock.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total_seconds += clock.perf_counter() - start
+            if self.track_memory:
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                self.peak_bytes = max(self.peak_bytes or 0, peak)
+                if started_tracing:
+                    tracemalloc.stop()
+            _active_report.reset(token)
+
+    def add_stage(self, name, seconds):
+        """Adds the time of one call of a stage."""
+        stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+        stage["seconds"] += seconds
+        stage["calls"] += 1
+
+    def count_steps(self, num_bodies, num_steps):
+        """Records the size of a simulation and its throughput (body-steps per second of propagation)."""
+        self.counters["bodies"] = num_bodies
+        self.counters["steps"] = num_steps
+        self.counters["body_steps"] = num_bodies*num_steps
+        seconds = self.stages.get("propagate", {}).get("seconds") or self.total_seconds
+        self.counters["body_steps_per_second"] = num_bodies*num_steps/seconds if seconds > 0 else None
+
+    def to_dict(self):
+        """Returns the report as a dictionary of plain values, infinite counters (ex: min_step of a run without steps) as None."""
+        counters = {name: None if isinstance(value, float) and not math.isfinite(value) else value
+                    for name, value in self.counters.items()}
+        return {"info": dict(self.info), "total_seconds": self.total_seconds, "peak_bytes": self.peak_bytes,
+                "stages": {name: dict(stage) for name, stage in self.stages.items()}, "counters": counters}
+
+    def to_json(self, path = None):
+        """Returns the report as a JSON string, and writes it to path when one is given."""
+        text = json.dumps(self.to_dict(), indent=2, default=float, allow_nan=False)
+        if path is not None:
+            with open(path, "w") as file:
+                file.write(text)
+        return text
+
+
+@contextlib.contextmanager
+def _timed_stage(report, name):
+    start = clock.perf_counter()
+    try:
+        yield
+    finally:
+        report.add_stage(name, clock.perf_counter() - start)
+
+
+def stage(name):
+    """
+    Returns a context manager timing a stage into the active report, or doing nothing when no report is recording.
+
+    Args:
+        name: String representing the stage (ex: "propagate").
+    """
+    report = _active_report.get()
+    if report is None:
+        return contextlib.nullcontext()
+    return _timed_stage(report, name)
+
+
+def timed(name):
+    """Decorator timing every call of a function as a stage of the active report (ex: @timed("dataframe"))."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            report = _active_report.get()
+            if report is None:
+                return function(*args, **kwargs)
+            with _timed_stage(report, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,146 @@
+# Optional Numba-compiled kernels for the force, time-stepping and hierarchy loops, with NumPy fallbacks
+# Numba is not a requirement: without it every public function here runs the NumPy code of nbody.py and
+# simulate_orbits.py, so callers never need to check JIT_AVAILABLE themselves.
+import math
+import numpy as np
+import nbody
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+JIT_AVAILABLE = numba is not None
+
+
+def _compile(parallel = False):
+    """Returns a decorator compiling a kernel with Numba (cached on disk), or leaving it as Python without Numba."""
+    if numba is None:
+        return lambda function: function
+    return numba.njit(parallel=parallel, cache=True)
+
+prange = numba.prange if numba is not None else range # parallel loop over the available cores
+
+
+@_compile(parallel=True)
+def _direct_accelerations_kernel(positions, masses, softening_squared, gravitational_constant):
+    """Direct summation of nbody.direct_accelerations, one body per iteration of the parallel loop."""
+    num_bodies = positions.shape[0]
+    accelerations = np.zeros((num_bodies, 3))
+    for i in prange(num_bodies):
+        x, y, z = 0.0, 0.0, 0.0
+        for j in range(num_bodies):
+            if j == i:
+                continue
+            dx = positions[j, 0] - positions[i, 0]
+            dy = positions[j, 1] - positions[i, 1]
+            dz = positions[j, 2] - positions[i, 2]
+            distance_squared = dx**2 + dy**2 + dz**2 + softening_squared
+            if distance_squared == 0:
+                continue # bodies at the same point, as in nbody.direct_accelerations
+            inverse_distance = 1/math.sqrt(distance_squared)
+            weight = masses[j]*inverse_distance*inverse_distance*inverse_distance
+            x += weight*dx
+            y += weight*dy
+            z += weight*dz
+        accelerations[i, 0] = gravitational_constant*x
+        accelerations[i, 1] = gravitational_constant*y
+        accelerations[i, 2] = gravitational_constant*z
+    return accelerations
+
+
+@_compile()
+def _leapfrog_kernel(positions, velocities, masses, time, softening_squared, gravitational_constant):
+    """Kick-drift-kick loop of nbody.leapfrog with the forces of _direct_accelerations_kernel."""
+    num_bodies = positions.shape[0]
+    position = positions.copy()
+    velocity = velocities.copy()
+    trajectory_positions = np.zeros((num_bodies, len(time), 3))
+    trajectory_velocities = np.zeros((num_bodies, len(time), 3))
+    trajectory_positions[:, 0] = position
+    trajectory_velocities[:, 0] = velocity
+
+    acceleration = _direct_accelerations_kernel(position, masses, softening_squared, gravitational_constant)
+    for i in range(1, len(time)):
+        dt = time[i] - time[i - 1]
+        velocity += 0.5*dt*acceleration
+        position += dt*velocity
+        acceleration = _direct_accelerations_kernel(position, masses, softening_squared, gravitational_constant)
+        velocity += 0.5*dt*acceleration
+        trajectory_positions[:, i] = position
+        trajectory_velocities[:, i] = velocity
+    return trajectory_positions, trajectory_velocities
+
+
+@_compile() # too little work per step to pay for threads, and no thread pool is started by plain simulations
+def _parent_offsets_kernel(trajectories, parent_index, order, num_axes):
+    """Adds parent positions to children in order (parents first), one timestep at a time."""
+    for step in range(trajectories.shape[1]):
+        for body in order:
+            parent = parent_index[body]
+            for k in range(num_axes):
+                trajectories[body, step, k] += trajectories[parent, step, k]
+
+
+def direct_accelerations(positions, masses, softening = 0.0):
+    """
+    Same as nbody.direct_accelerations, with the pairwise loop compiled and spread over all cores when Numba
+    is installed. Sums run in a different order than NumPy's, so results agree to rounding (about 1e-15).
+
+    Args:
+        positions: Numpy array (bodies x 3) holding body positions in AU.
+        masses: Numpy array holding the mass of each body in kg.
+        softening: Float representing the softening length in AU, keeps close encounters finite.
+
+    Returns:
+        accelerations: Numpy array (bodies x 3) holding accelerations in AU/year^2.
+    """
+    if not JIT_AVAILABLE:
+        return nbody.direct_accelerations(positions, masses, softening)
+    return _direct_accelerations_kernel(np.ascontiguousarray(positions, dtype=float), np.ascontiguousarray(masses, dtype=float),
+                                        float(softening)**2, nbody.GRAVITATIONAL_CONSTANT_YEARS)
+
+
+def leapfrog(positions, velocities, masses, time, softening = 0.0):
+    """
+    Same as nbody.leapfrog with direct forces, with the whole time-stepping loop compiled when Numba is installed,
+    so no step goes back to Python.
+
+    Args:
+        positions: Numpy array (bodies x 3) holding starting positions in AU.
+        velocities: Numpy array (bodies x 3) holding starting velocities in AU/year.
+        masses: Numpy array holding the mass of each body in kg.
+        time: Numpy array (vector) holding the output times in years, each step goes from one time to the next.
+        softening: Float representing the softening length in AU.
+
+    Returns:
+        trajectory_positions: Numpy array (bodies x steps x 3) holding positions at every time.
+        trajectory_velocities: Numpy array (bodies x steps x 3) holding velocities at every time.
+    """
+    if not JIT_AVAILABLE:
+        return nbody.leapfrog(positions, velocities, masses, time, softening=softening)
+    return _leapfrog_kernel(np.array(positions, dtype=float), np.array(velocities, dtype=float),
+                            np.ascontiguousarray(masses, dtype=float), np.ascontiguousarray(time, dtype=float),
+                            float(softening)**2, nbody.GRAVITATIONAL_CONSTANT_YEARS)
+
+
+def add_parent_offsets(trajectories, parent_index, levels, num_axes = 3):
+    """
+    Turns positions around each parent into positions around the system center, in place. Additions happen in
+    the same order with or without Numba, so results are identical.
+
+    Args:
+        trajectories: Numpy array (bodies x steps x 3) holding each body's positions around its parent.
+        parent_index: Numpy array holding the index of each body's parent (-1 for the system center).
+        levels: List of index arrays, one per depth (ex: BodyRegistry.levels), the first holding the bodies
+            orbiting the center.
+        num_axes: Int representing how many axes to offset (ex: 2 when every z is 0).
+    """
+    if not JIT_AVAILABLE or trajectories.dtype != np.float64 or not trajectories.flags.c_contiguous:
+        # parents are already absolute when their children are reached (ex: Moon around Earth around Sun)
+        for level in levels[1:]:
+            trajectories[level, :, :num_axes] += trajectories[parent_index[level], :, :num_axes]
+        return
+    if len(levels) > 1:
+        order = np.concatenate([np.asarray(level, dtype=np.int64) for level in levels[1:]])
+        _parent_offsets_kernel(trajectories, np.asarray(parent_index, dtype=np.int64), order, num_axes)
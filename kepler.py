@@ -0,0 +1,92 @@
+# Keplerian (two-body) orbit propagation from orbital elements, vectorized over bodies and times
+import numpy as np
+
+
+def solve_kepler(mean_anomaly, eccentricity, tolerance = 1e-14, max_iterations = 50):
+    """
+    Solves Kepler's equation E - e sin(E) = M for the eccentric anomaly E with Newton's method,
+    for whole arrays of mean anomalies at once.
+
+    Args:
+        mean_anomaly: Numpy array of mean anomalies M in radians.
+        eccentricity: Numpy array of eccentricities below 1, broadcastable against mean_anomaly.
+        tolerance: Float representing the largest Newton correction (radians) accepted as converged.
+        max_iterations: Int representing the number of Newton steps after which the solver gives up.
+
+    Returns:
+        eccentric_anomaly: Numpy array of eccentric anomalies E in radians, shaped like the broadcast inputs.
+    """
+    mean_anomaly, eccentricity = np.broadcast_arrays(np.asarray(mean_anomaly, dtype=float), np.asarray(eccentricity, dtype=float))
+    # solve on [-pi, pi) where the start guess is good, then add the whole turns back
+    turns = np.floor((mean_anomaly + np.pi)/(2*np.pi))
+    reduced = mean_anomaly - 2*np.pi*turns
+    # start at M for low eccentricity, pi (with the sign of M) for high eccentricity
+    eccentric_anomaly = np.where(eccentricity < 0.8, reduced, np.where(reduced < 0, -np.pi, np.pi))
+    largest = np.inf
+    for _ in range(max_iterations):
+        correction = (eccentric_anomaly - eccentricity*np.sin(eccentric_anomaly) - reduced)/(1 - eccentricity*np.cos(eccentric_anomaly))
+        eccentric_anomaly = eccentric_anomaly - correction
+        previous, largest = largest, np.max(np.abs(correction), initial=0.0)
+        # near e = 1 rounding noise is amplified by 1/(1 - e cos E); stop once Newton no longer improves
+        if largest <= tolerance or (largest < 1e-10 and largest >= previous):
+            break
+    else:
+        raise RuntimeError(f"Kepler's equation did not converge in {max_iterations} iterations.")
+    return eccentric_anomaly + 2*np.pi*turns
+
+
+def orbit_rotation(inclination, longitude_of_ascending_node, argument_of_periapsis):
+    """
+    Returns the rotation matrices (bodies x 3 x 3) taking orbit-plane coordinates (x towards periapsis)
+    to system coordinates, R = Rz(node) Rx(inclination) Rz(argument of periapsis).
+    """
+    cos_node, sin_node = np.cos(longitude_of_ascending_node), np.sin(longitude_of_ascending_node)
+    cos_i, sin_i = np.cos(inclination), np.sin(inclination)
+    cos_w, sin_w = np.cos(argument_of_periapsis), np.sin(argument_of_periapsis)
+    rotation = np.empty(np.shape(inclination) + (3, 3))
+    rotation[..., 0, 0] = cos_node*cos_w - sin_node*sin_w*cos_i
+    rotation[..., 0, 1] = -cos_node*sin_w - sin_node*cos_w*cos_i
+    rotation[..., 0, 2] = sin_node*sin_i
+    rotation[..., 1, 0] = sin_node*cos_w + cos_node*sin_w*cos_i
+    rotation[..., 1, 1] = -sin_node*sin_w + cos_node*cos_w*cos_i
+    rotation[..., 1, 2] = -cos_node*sin_i
+    rotation[..., 2, 0] = sin_w*sin_i
+    rotation[..., 2, 1] = cos_w*sin_i
+    rotation[..., 2, 2] = cos_i
+    return rotation
+
+
+def kepler_state(semi_major_axis, eccentricity, inclination, longitude_of_ascending_node, argument_of_periapsis,
+                 mean_anomaly, mean_motion, time):
+    """
+    Positions and velocities of bodies on Keplerian orbits around their parents, for all bodies and times at once.
+
+    Args:
+        semi_major_axis: Numpy array holding each body's semi-major axis in AU.
+        eccentricity: Numpy array holding each body's eccentricity.
+        inclination, longitude_of_ascending_node, argument_of_periapsis: Numpy arrays holding angles in radians.
+        mean_anomaly: Numpy array holding each body's mean anomaly at time 0 in radians.
+        mean_motion: Numpy array holding each body's mean motion (2 pi / period) in radians per year.
+        time: Numpy array (vector) holding times in years.
+
+    Returns:
+        positions: Numpy array (bodies x steps x 3) holding positions relative to the parent in AU.
+        velocities: Numpy array (bodies x steps x 3) holding velocities relative to the parent in AU/year.
+    """
+    a = np.asarray(semi_major_axis, dtype=float)[:, None]
+    e = np.asarray(eccentricity, dtype=float)[:, None]
+    n = np.asarray(mean_motion, dtype=float)[:, None]
+    anomaly = np.asarray(mean_anomaly, dtype=float)[:, None] + n*np.asarray(time, dtype=float)[None, :]
+    eccentric_anomaly = solve_kepler(anomaly, e)
+    cos_e, sin_e = np.cos(eccentric_anomaly), np.sin(eccentric_anomaly)
+    semi_minor = a*np.sqrt(1 - e**2)
+    anomaly_rate = n/(1 - e*cos_e)
+
+    # positions and velocities in the orbit plane, x towards periapsis
+    plane_positions = np.stack([a*(cos_e - e), semi_minor*sin_e, np.zeros_like(cos_e)], axis=-1)
+    plane_velocities = np.stack([-a*sin_e*anomaly_rate, semi_minor*cos_e*anomaly_rate, np.zeros_like(cos_e)], axis=-1)
+    rotation = orbit_rotation(np.asarray(inclination, dtype=float), np.asarray(longitude_of_ascending_node, dtype=float),
+                              np.asarray(argument_of_periapsis, dtype=float))
+    positions = np.einsum("bij,bsj->bsi", rotation, plane_positions)
+    velocities = np.einsum("bij,bsj->bsi", rotation, plane_velocities)
+    return positions, velocities
@@ -0,0 +1,179 @@
+# N-body gravity: pairwise accelerations and time integrators for orbital systems
+import numpy as np
+from orbital_system_sim import GRAVITATIONAL_CONSTANT
+
+SECONDS_PER_YEAR = 31536000
+GRAVITATIONAL_CONSTANT_YEARS = GRAVITATIONAL_CONSTANT*SECONDS_PER_YEAR**2 # AU^3/kgs^2 -> AU^3/kg year^2
+
+
+def direct_accelerations(positions, masses, softening = 0.0):
+    """
+    Computes the gravitational acceleration on every body from every other body by direct summation.
+
+    Args:
+        positions: Numpy array (bodies x 3) holding body positions in AU.
+        masses: Numpy array holding the mass of each body in kg.
+        softening: Float representing the softening length in AU, keeps close encounters finite.
+
+    Returns:
+        accelerations: Numpy array (bodies x 3) holding accelerations in AU/year^2.
+    """
+    # separations[i, j] points from body i to body j, one component at a time to keep the temporaries 2D
+    separations = [positions[None, :, k] - positions[:, None, k] for k in range(3)]
+    distances_squared = separations[0]**2 + separations[1]**2 + separations[2]**2 + softening**2
+    np.fill_diagonal(distances_squared, np.inf) # no force of a body on itself
+    distances_squared[distances_squared == 0] = np.inf # nor between bodies at the same point (ex: two moons on one orbit)
+    inverse_distances = 1/np.sqrt(distances_squared)
+    weights = masses[None, :]*inverse_distances*inverse_distances*inverse_distances
+    accelerations = np.empty_like(positions, dtype=float)
+    for k in range(3):
+        accelerations[:, k] = np.einsum("ij,ij->i", weights, separations[k])
+    return GRAVITATIONAL_CONSTANT_YEARS*accelerations
+
+
+def leapfrog(positions, velocities, masses, time, accelerations = direct_accelerations, **force_options):
+    """
+    Integrates the bodies with the kick-drift-kick leapfrog (velocity Verlet) scheme, which is symplectic and
+    keeps the energy error bounded over long runs.
+
+    Args:
+        positions: Numpy array (bodies x 3) holding starting positions in AU.
+        velocities: Numpy array (bodies x 3) holding starting velocities in AU/year.
+        masses: Numpy array holding the mass of each body in kg.
+        time: Numpy array (vector) holding the output times in years, each step goes from one time to the next.
+        accelerations: Function (positions, masses, **force_options) -> accelerations used for the forces.
+        force_options: Keyword arguments passed on to accelerations (ex: softening).
+
+    Returns:
+        trajectory_positions: Numpy array (bodies x steps x 3) holding positions at every time.
+        trajectory_velocities: Numpy array (bodies x steps x 3) holding velocities at every time.
+    """
+    position = np.array(positions, dtype=float)
+    velocity = np.array(velocities, dtype=float)
+    trajectory_positions = np.zeros((len(masses), len(time), 3))
+    trajectory_velocities = np.zeros((len(masses), len(time), 3))
+    trajectory_positions[:, 0] = position
+    trajectory_velocities[:, 0] = velocity
+
+    acceleration = accelerations(position, masses, **force_options)
+    for i in range(1, len(time)):
+        dt = time[i] - time[i - 1]
+        velocity += 0.5*dt*acceleration
+        position += dt*velocity
+        acceleration = accelerations(position, masses, **force_options)
+        velocity += 0.5*dt*acceleration
+        trajectory_positions[:, i] = position
+        trajectory_velocities[:, i] = velocity
+
+    return trajectory_positions, trajectory_velocities
+
+
+# Dormand-Prince 5(4) coefficients: stage weights (the last row is the 5th order solution), 5th minus 4th order weights
+DORMAND_PRINCE_STAGES = [
+    [],
+    [1/5],
+    [3/40, 9/40],
+    [44/45, -56/15, 32/9],
+    [19372/6561, -25360/2187, 64448/6561, -212/729],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+    [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84],
+]
+DORMAND_PRINCE_ERROR = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0]) - np.array([5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40])
+
+
+def dormand_prince(positions, velocities, masses, time, rtol = 1e-9, atol = 1e-12, accelerations = direct_accelerations,
+                   max_steps = 1000000, **force_options):
+    """
+    Integrates the bodies with an adaptive Dormand-Prince 5(4) Runge-Kutta scheme. Each step's error is estimated
+    from the embedded 4th order solution; steps above tolerance are rejected and retried smaller, so close
+    orbits (ex: Phobos around Mars) get many small steps and wide quiet orbits get few large ones.
+    Steps are shortened to land exactly on every output time.
+
+    Args:
+        positions: Numpy array (bodies x 3) holding starting positions in AU.
+        velocities: Numpy array (bodies x 3) holding starting velocities in AU/year.
+        masses: Numpy array holding the mass of each body in kg.
+        time: Numpy array (vector) holding the output times in years.
+        rtol: Float representing the relative error tolerance per step.
+        atol: Float representing the absolute error tolerance per step (AU and AU/year).
+        accelerations: Function (positions, masses, **force_options) -> accelerations used for the forces.
+        max_steps: Int representing the number of steps (accepted and rejected) after which the run is abandoned.
+        force_options: Keyword arguments passed on to accelerations (ex: softening).
+
+    Returns:
+        trajectory_positions: Numpy array (bodies x steps x 3) holding positions at every output time.
+        trajectory_velocities: Numpy array (bodies x steps x 3) holding velocities at every output time.
+        stats: Dictionary with the number of accepted steps, rejected steps, force evaluations and the
+            smallest and largest accepted step in years.
+    """
+    num_bodies = len(masses)
+    state = np.concatenate([np.asarray(positions, dtype=float), np.asarray(velocities, dtype=float)])
+    trajectory_positions = np.zeros((num_bodies, len(time), 3))
+    trajectory_velocities = np.zeros((num_bodies, len(time), 3))
+    trajectory_positions[:, 0] = state[:num_bodies]
+    trajectory_velocities[:, 0] = state[num_bodies:]
+    stats = {"accepted_steps": 0, "rejected_steps": 0, "force_evaluations": 0,
+             "min_step": float("inf"), "max_step": 0.0}
+
+    def derivative(current):
+        stats["force_evaluations"] += 1
+        return np.concatenate([current[num_bodies:], accelerations(current[:num_bodies], masses, **force_options)])
+
+    def error_norm(error, old, new):
+        scale = atol + rtol*np.maximum(np.abs(old), np.abs(new))
+        return np.sqrt(np.mean((error/scale)**2))
+
+    slope = derivative(state)
+    # starting step from the size of the state and of its rate of change (Hairer, Norsett & Wanner)
+    step = 0.01*error_norm(state, state, state)/max(error_norm(slope, state, state), 1e-300)
+    current_time = time[0]
+    for i in range(1, len(time)):
+        while current_time < time[i]:
+            if stats["accepted_steps"] + stats["rejected_steps"] >= max_steps:
+                raise RuntimeError(f"Adaptive integration took more than {max_steps} steps.")
+            # finish on the output time rather than leave a sliver of a step before it
+            trial_step = time[i] - current_time if current_time + 1.1*step >= time[i] else step
+            stages = [slope]
+            for weights in DORMAND_PRINCE_STAGES[1:]:
+                stage_state = state + trial_step*sum(w*k for w, k in zip(weights, stages))
+                stages.append(derivative(stage_state))
+            new_state = stage_state # the last stage is taken at the 5th order solution (first same as last)
+            error = error_norm(trial_step*sum(w*k for w, k in zip(DORMAND_PRINCE_ERROR, stages)), state, new_state)
+
+            if not np.isfinite(error):
+                raise FloatingPointError(f"Adaptive integration produced non-finite values at time {current_time} years.")
+            factor = 5.0 if error == 0 else min(5.0, max(0.2, 0.9*error**-0.2))
+            if error <= 1:
+                stats["accepted_steps"] += 1
+                stats["min_step"] = min(stats["min_step"], float(trial_step))
+                stats["max_step"] = max(stats["max_step"], float(trial_step))
+                current_time = time[i] if trial_step == time[i] - current_time else current_time + trial_step
+                state = new_state
+                slope = stages[-1]
+                if trial_step == step: # a step shortened to hit an output time says nothing about the next step size
+                    step = trial_step*factor
+            else:
+                stats["rejected_steps"] += 1
+                step = trial_step*factor
+        trajectory_positions[:, i] = state[:num_bodies]
+        trajectory_velocities[:, i] = state[num_bodies:]
+
+    return trajectory_positions, trajectory_velocities, stats
+
+
+def total_energy(positions, velocities, masses, softening = 0.0):
+    """
+    Returns the total (kinetic + potential) energy of the bodies in kg AU^2/year^2, used to check integrators.
+
+    Args:
+        positions: Numpy array (bodies x 3) holding body positions in AU.
+        velocities: Numpy array (bodies x 3) holding body velocities in AU/year.
+        masses: Numpy array holding the mass of each body in kg.
+        softening: Float representing the softening length in AU.
+    """
+    kinetic = 0.5*np.sum(masses*np.einsum("ij,ij->i", velocities, velocities))
+    separations = positions[None, :, :] - positions[:, None, :]
+    distances = np.sqrt(np.einsum("ijk,ijk->ij", separations, separations) + softening**2)
+    upper = np.triu_indices(len(masses), k=1)
+    potential = -GRAVITATIONAL_CONSTANT_YEARS*np.sum(masses[upper[0]]*masses[upper[1]]/distances[upper])
+    return kinetic + potential
@@ -4,6 +4,8 @@
 
 import math
 GRAVITATIONAL_CONSTANT = 6.67408*10**(-11)/149597870691**3 #m^3/kgs^2 -> AU/kgs^2
+# orbit shape and orientation of an OrbitingObject, in the order kepler.kepler_state takes them after the semi-major axis
+ORBITAL_ELEMENTS = ("eccentricity", "inclination", "longitude_of_ascending_node", "argument_of_periapsis", "mean_anomaly")
 
 
 class SpaceObject:
@@ -18,6 +20,7 @@ class SpaceObject:
         start_y: A float representing the starting y position of space object in AU. 
         start_z: A float representing the starting z position of space object in AU. 
     """
+    __slots__ = ("name", "radius", "mass", "start_x", "start_y", "start_z") # no per-instance __dict__, keeps large systems compact
 
     def __init__(self, name, radius, mass, start_x, start_y, start_z):
         self.name = name
@@ -36,18 +39,36 @@ class SpaceObject:
 
 class OrbitingObject(SpaceObject):
     """
-    Represents all orbiting objects.
+    Represents all orbiting objects. The orbit is circular and in the x-y plane unless orbital elements are given.
 
     Attributes:
         distance_from_center = Float representing semi-major axis in AU.
+        eccentricity: Float representing the orbit's eccentricity (0 for a circle, below 1).
+        inclination: Float representing the tilt of the orbit from the x-y plane in radians.
+        longitude_of_ascending_node: Float representing the angle from the x axis to the ascending node in radians.
+        argument_of_periapsis: Float representing the angle from the ascending node to periapsis in radians.
+        mean_anomaly: Float representing the mean anomaly at time 0 in radians.
     """
+    __slots__ = ("distance_from_center", "eccentricity", "inclination", "longitude_of_ascending_node",
+                 "argument_of_periapsis", "mean_anomaly")
 
-    def __init__(self, name, radius, mass, start_x, start_y, start_z, distance_from_center):
+    def __init__(self, name, radius, mass, start_x, start_y, start_z, distance_from_center, eccentricity = 0.0,
+                 inclination = 0.0, longitude_of_ascending_node = 0.0, argument_of_periapsis = 0.0, mean_anomaly = 0.0):
         super().__init__(name, radius, mass, start_x, start_y, start_z)
+        if not 0 <= eccentricity < 1:
+            raise ValueError("The eccentricity of an orbit must be at least 0 and below 1.")
         self.distance_from_center = distance_from_center
+        self.eccentricity = eccentricity
+        self.inclination = inclination
+        self.longitude_of_ascending_node = longitude_of_ascending_node
+        self.argument_of_periapsis = argument_of_periapsis
+        self.mean_anomaly = mean_anomaly
 
     def __repr__(self):
-        return f"{super().__repr__()}, semi-major axis: {self.distance_from_center} AU"
+        description = f"{super().__repr__()}, semi-major axis: {self.distance_from_center} AU"
+        if self.eccentricity or self.inclination:
+            description += f", eccentricity: {self.eccentricity}, inclination: {self.inclination} rad"
+        return description
 
 
 class Star(SpaceObject):
@@ -57,6 +78,7 @@ class Star(SpaceObject):
     Attributes:
         luminosity: An int representing the luminosity of the star (Watts). Total amount of energy radiated per unit time. 
     """
+    __slots__ = ("luminosity", "spectral_type")
 
     def __init__(self, name: str, radius, mass, start_x, start_y, start_z, luminosity, spectral_type):
         super().__init__(name, radius, mass, start_x, start_y, start_z)
@@ -74,9 +96,11 @@ class Planet(OrbitingObject):
     Attributes:
         planet_type: A string representing the type of planet (gaseous or rocky).
     """
+    __slots__ = ("planet_type",)
 
-    def __init__(self, name, radius, mass, start_x, start_y, start_z, distance_from_center, planet_type):
-        super().__init__(name, radius, mass, start_x, start_y, start_z, distance_from_center)
+    def __init__(self, name, radius, mass, start_x, start_y, start_z, distance_from_center, planet_type, **orbital_elements):
+        """orbital_elements: Optional eccentricity, inclination, etc. keyword arguments (see OrbitingObject)."""
+        super().__init__(name, radius, mass, start_x, start_y, start_z, distance_from_center, **orbital_elements)
         self.planet_type = planet_type
 
     def __repr__(self):
@@ -91,9 +115,11 @@ class Satellite(OrbitingObject):
         lifetime: A float representing the expected lifetime of satellite in years.
         material: A string representing the primary material of the satellite.
     """
+    __slots__ = ("lifetime", "material")
 
-    def __init__(self, name, radius, mass, start_x, start_y, start_z, distance_from_center, lifetime, material):
-        super().__init__(name, radius, mass, start_x, start_y, start_z, distance_from_center)
+    def __init__(self, name, radius, mass, start_x, start_y, start_z, distance_from_center, lifetime, material, **orbital_elements):
+        """orbital_elements: Optional eccentricity, inclination, etc. keyword arguments (see OrbitingObject)."""
+        super().__init__(name, radius, mass, start_x, start_y, start_z, distance_from_center, **orbital_elements)
         self.lifetime = lifetime
         self.material = material
 
@@ -115,6 +141,10 @@ class OrbitalSystem:
         self.name = name
         self.central_object = central_object
         self.orbiting_objects = {}
+        # derived orbital elements by object name, each stored with the inputs it was computed from
+        self._element_cache = {}
+        self.element_cache_hits = 0
+        self.element_cache_misses = 0
 
     def __repr__(self):
         return f"System name: {self.name}, Central Object: {self.central_object}, Number of orbiting objects: {len(self.orbiting_objects)}"
@@ -141,6 +171,7 @@ class OrbitalSystem:
             correct = input("You already have an object with the same name in this system. Enter 1 to replace and 2 to cancel.")
             if correct == "1":
                 self.orbiting_objects[object.name] = object
+                self._element_cache.pop(object.name, None)
                 print("Original replaced")
                 return None
             elif correct == "2":
@@ -156,21 +187,104 @@ class OrbitalSystem:
                 self.orbiting_objects[object.name] = object
         else:
             self.orbiting_objects[object.name] = object
+        self._element_cache.pop(object.name, None)
+
+    def add_orbiting_objects(self, objects, on_conflict = "error"):
+        """
+        Adds many orbiting objects at once without ever prompting (ex: a catalog of asteroids).
+        Every object is checked, all together, before any is added.
+
+        Args:
+            objects: List of orbiting objects (or orbital systems) to add.
+            on_conflict: String, what to do with a name already in the system or repeated in objects. "replace" keeps
+                the new object, "skip" keeps the existing one, "error" raises a ValueError and adds nothing.
+
+        Returns:
+            report: Dictionary with lists of the names "added", "replaced" and "skipped".
+        """
+        if on_conflict not in ("replace", "skip", "error"):
+            raise ValueError(f"Unknown conflict policy {on_conflict}.")
+        objects = list(objects)
+        names = [object.name for object in objects]
+        for invalid, message in self._invalid_type_rules(objects):
+            if any(invalid):
+                raise TypeError(f"{message} ({', '.join(name for name, bad in zip(names, invalid) if bad)})")
+        too_close = [isinstance(object, OrbitingObject) and self.central_object.radius >= object.distance_from_center*149597871
+                     for object in objects] #converting distance_from_center AU -> km
+        if any(too_close):
+            raise ValueError("The distance between the orbiting object and the central object must be greater than the radius of the central object. "
+                             f"({', '.join(name for name, bad in zip(names, too_close) if bad)})")
+
+        seen = set(self.orbiting_objects)
+        conflicts = []
+        for name in names:
+            if name in seen:
+                conflicts.append(name)
+            seen.add(name)
+        if conflicts and on_conflict == "error":
+            raise ValueError(f"Objects already in the system: {', '.join(conflicts)}")
+
+        report = {"added": [], "replaced": [], "skipped": []}
+        for name, object in zip(names, objects):
+            if name not in self.orbiting_objects:
+                self.orbiting_objects[name] = object
+                report["added"].append(name)
+            elif on_conflict == "replace":
+                self.orbiting_objects[name] = object
+                self._element_cache.pop(name, None)
+                report["replaced"].append(name)
+            else:
+                report["skipped"].append(name)
+        return report
+
+    def _invalid_type_rules(self, objects):
+        """Returns (mask, message) pairs, mask marking the objects that break the rule as a list of booleans."""
+        is_star = [isinstance(object, Star) for object in objects]
+        is_planet = [isinstance(object, Planet) for object in objects]
+        if isinstance(self.central_object, Planet):
+            return [(is_star, "A star cannot orbit a planet.")]
+        elif isinstance(self.central_object, Satellite):
+            return [(is_star, "A star cannot orbit a satellite."), (is_planet, "A planet cannot orbit a satellite.")]
+        return []
 
     def get_orbital_period(self, object_name):
         """Returns the orbital period of an orbiting object in Earth years."""
-        object = self.orbiting_objects.get(object_name)
         if len(self.orbiting_objects) == 0:
             return "There are no orbiting objects in the system."
-        elif isinstance(object, OrbitingObject):
-            period = math.sqrt( (object.distance_from_center**3*4*math.pi**2)/(GRAVITATIONAL_CONSTANT*(object.mass + self.central_object.mass)) ) /31536000
-            return period
+        return self.get_orbital_elements(object_name)["period"]
+
+    def get_orbital_elements(self, object_name):
+        """
+        Returns the derived orbital elements of an orbiting object (or orbital system, from its central object).
+        Results are cached per object and recomputed when the object, its mass or distance, or the central
+        object's mass change, so repeated simulations of the same system skip the calculation.
+
+        Returns:
+            elements: Dictionary with the orbital "period" in Earth years, "angular_velocity" in radians per year
+                and orbit "radius" in AU.
+        """
+        object = self.orbiting_objects.get(object_name)
+        if isinstance(object, OrbitingObject):
+            body = object
         elif isinstance(object, OrbitalSystem):
             # take the period from the central object
-            period = math.sqrt( (object.central_object.distance_from_center**3*4*math.pi**2)/(GRAVITATIONAL_CONSTANT*(object.central_object.mass + self.central_object.mass)) ) /31536000
-            return period
+            body = object.central_object
         else:
             raise ValueError(f"Object {object_name} not found in system.")
+        inputs = (object, body.mass, body.distance_from_center, self.central_object.mass)
+        cached = self._element_cache.get(object_name)
+        if cached is not None and cached[0][0] is object and cached[0][1:] == inputs[1:]:
+            self.element_cache_hits += 1
+            return dict(cached[1])
+        self.element_cache_misses += 1
+        period = math.sqrt( (body.distance_from_center**3*4*math.pi**2)/(GRAVITATIONAL_CONSTANT*(body.mass + self.central_object.mass)) ) /31536000
+        elements = {"period": period, "angular_velocity": 2*math.pi/period, "radius": body.distance_from_center}
+        self._element_cache[object_name] = (inputs, elements)
+        return dict(elements)
+
+    def element_cache_info(self):
+        """Returns a dictionary with the element cache's hits, misses and number of cached objects."""
+        return {"hits": self.element_cache_hits, "misses": self.element_cache_misses, "size": len(self._element_cache)}
 
     def get_orbit_object_distance(self, object_name):
         """Returns the distance from the central object to the orbital object in AU."""
@@ -179,7 +293,7 @@ class OrbitalSystem:
             return "There are no orbiting objects in the system."
         elif isinstance(object, OrbitingObject):
             return object.distance_from_center
-        elif isinstance(object, PlanetaryOrbitalSystem):
+        elif isinstance(object, OrbitalSystem):
             return object.central_object.distance_from_center
         else:
             raise ValueError(f"Object {object_name} not found in system.")
@@ -217,6 +331,11 @@ class PlanetaryOrbitalSystem(OrbitalSystem):
             raise TypeError("The orbiting object must be a Satellite.")
         super().add_orbiting_object(object)
 
+    def _invalid_type_rules(self, objects):
+        """Returns (mask, message) pairs for the type rules, only satellites may orbit a planet."""
+        not_satellite = [not isinstance(object, Satellite) for object in objects]
+        return [(not_satellite, "The orbiting object must be a Satellite.")] + super()._invalid_type_rules(objects)
+
     def orbiting_objects_list(self):
         """Returns string of all moons around planet."""
         moon_descriptions = []
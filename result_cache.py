@@ -0,0 +1,163 @@
+# Content-addressed on-disk cache of simulation results, keyed by the system's contents and the run parameters
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from orbital_system_sim import SpaceObject, OrbitalSystem
+from body_registry import BodyRegistry, ORBITAL_ELEMENTS
+from trajectory_store import save_trajectories
+
+CACHE_VERSION = 1 # bump when simulation results change, so old entries are never returned
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "orbit_simulator")
+DEFAULT_MAX_BYTES = 1024**3
+
+
+def _describe(item):
+    """Returns a string holding every attribute of a space object or system, nested systems included."""
+    if isinstance(item, OrbitalSystem):
+        members = ", ".join(f"{name!r}: {_describe(member)}" for name, member in item.orbiting_objects.items())
+        return f"{type(item).__name__}({item.name!r}, {_describe(item.central_object)}, {{{members}}})"
+    if isinstance(item, SpaceObject):
+        slots = [slot for cls in type(item).__mro__ for slot in getattr(cls, "__slots__", ())]
+        attributes = {slot: getattr(item, slot, None) for slot in slots}
+        attributes.update(getattr(item, "__dict__", {}))
+        return f"{type(item).__name__}({', '.join(f'{key}={attributes[key]!r}' for key in sorted(attributes))})"
+    return repr(item)
+
+
+def system_fingerprint(system):
+    """
+    Hashes the full contents of a system: every attribute of every object, and which objects orbit which.
+
+    Args:
+        system: Orbital System or BodyRegistry.
+
+    Returns:
+        fingerprint: String holding the hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    if isinstance(system, BodyRegistry):
+        digest.update(repr((system.names, system.center_name, system.center_mass)).encode())
+        for array in (system.mass, system.radius, system.distance_from_center, system.start, system.parent_index,
+                      system.orbital_period, system.center_start) + tuple(getattr(system, element) for element in ORBITAL_ELEMENTS):
+            digest.update(np.ascontiguousarray(array).tobytes())
+    else:
+        digest.update(_describe(system).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Directory of simulation results, one trajectory store per key. Hits are memory-mapped (copy on write), so
+    they return instantly whatever the run's size. When the cache grows past max_bytes, the least recently
+    used entries are deleted.
+
+    Attributes:
+        path: String representing the cache directory.
+        max_bytes: Int representing the largest total size of the cache in bytes.
+        enabled: Boolean, False turns the cache off (nothing is read or written). The ORBIT_SIM_CACHE
+            environment variable set to "off" turns every cache off.
+        hits: Int counting the lookups that found a stored result.
+        misses: Int counting the lookups that did not.
+    """
+    def __init__(self, path = DEFAULT_CACHE_DIR, max_bytes = DEFAULT_MAX_BYTES, enabled = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled and os.environ.get("ORBIT_SIM_CACHE", "").lower() != "off"
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"Result cache at {self.path}: {self.hits} hits, {self.misses} misses, {self.size()} bytes"
+
+    def key(self, system, sim_duration, timestep, engine, engine_options):
+        """Returns the cache key of a run_simulation call."""
+        options = sorted((name, repr(value)) for name, value in engine_options.items())
+        parameters = repr((CACHE_VERSION, float(sim_duration), float(timestep), engine, options))
+        return hashlib.sha256((system_fingerprint(system) + parameters).encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Looks up a stored result. An entry that cannot be read (ex: truncated by a crash) is deleted and counts as a miss.
+
+        Returns:
+            Tuple (positions, time) as returned by run_simulation, or None when the key is not stored.
+        """
+        if not self.enabled:
+            return None
+        entry = os.path.join(self.path, key)
+        if not os.path.isdir(entry):
+            self.misses += 1
+            return None
+        try:
+            time = np.load(os.path.join(entry, "time.npy"), mmap_mode="c")
+            trajectories = np.load(os.path.join(entry, "positions.npy"), mmap_mode="c")
+            with open(os.path.join(entry, "metadata.json")) as file:
+                names = json.load(file)["names"]
+            if trajectories.shape != (len(names), len(time), 3):
+                raise ValueError(f"Cache entry {key} holds {trajectories.shape} positions for {len(names)} objects.")
+        except (OSError, ValueError, KeyError):
+            shutil.rmtree(entry, ignore_errors=True)
+            self.misses += 1
+            return None
+        os.utime(entry) # mark as recently used
+        self.hits += 1
+        return {name: trajectories[i] for i, name in enumerate(names)}, time
+
+    def put(self, key, positions, time):
+        """Stores a result under key, then evicts least recently used entries to stay within max_bytes."""
+        if not self.enabled:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        # write next to the cache and rename, so readers never see a half-written entry
+        staging = tempfile.mkdtemp(dir=self.path, prefix=".tmp-")
+        try:
+            save_trajectories(staging, positions, time) # names are kept in its metadata.json
+            os.replace(staging, os.path.join(self.path, key))
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True) # another process stored the same key first
+        self.evict()
+
+    def entries(self):
+        """Returns a list of (last used time, size in bytes, path) of every stored result, least recently used first."""
+        if not os.path.isdir(self.path):
+            return []
+        entries = []
+        for name in os.listdir(self.path):
+            entry = os.path.join(self.path, name)
+            if name.startswith(".") or not os.path.isdir(entry):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry, file)) for file in os.listdir(entry))
+            entries.append((os.path.getmtime(entry), size, entry))
+        return sorted(entries)
+
+    def size(self):
+        """Returns the total size of the stored results in bytes."""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """Deletes every stored result."""
+        for _, _, entry in self.entries():
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+_default_cache = None
+
+def default_cache():
+    """Returns the shared cache in DEFAULT_CACHE_DIR, used by run_simulation(cache=True)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
@@ -1,12 +1,35 @@
 # File holds simulation function
 import numpy as np
 import math
-import pandas as pd
-from orbital_system_sim import Planet, Satellite, Star, PlanetaryOrbitalSystem, StellarOrbitalSystem, OrbitingObject, OrbitalSystem
+import weakref
+from orbital_system_sim import ORBITAL_ELEMENTS, Planet, Satellite, Star, PlanetaryOrbitalSystem, StellarOrbitalSystem, OrbitingObject, OrbitalSystem
+import nbody
+import barnes_hut
+import kepler
+from body_registry import BodyRegistry, as_registry, walk_system
+import result_cache
+import instrumentation
+import jit_kernels
+
+ENGINES = ("vectorized", "loop", "nbody", "adaptive", "kepler")
+# keyword arguments each engine takes through run_simulation's engine_options
+ENGINE_OPTIONS = {"vectorized": (), "loop": (), "kepler": (), "nbody": ("force_solver", "softening", "theta"),
+                  "adaptive": ("force_solver", "softening", "theta", "rtol", "atol", "max_steps", "stats")}
+FORCE_SOLVERS = {"direct": nbody.direct_accelerations, "barnes_hut": barnes_hut.barnes_hut_accelerations,
+                 "jit": jit_kernels.direct_accelerations}
+
+def check_engine(engine, engine_options):
+    """Raises a ValueError for an unknown engine, and a TypeError for options the engine does not take (ex: a typo)."""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown simulation engine {engine}.")
+    unknown = sorted(set(engine_options) - set(ENGINE_OPTIONS[engine]))
+    if unknown:
+        raise TypeError(f"The {engine} engine does not take {', '.join(unknown)}.")
 
 def establish_simulation(system, orbiting_objects_dictionary, time):
     """
     Function used within run_simulation in order to create the initial system vectors. Defines intial position conditions. 
+    Orbital systems inside the system are followed to any depth (ex: a satellite around a moon around a planet).
 
     Args:
         orbiting_objects_dictionary: Dictionary of objects, orbiting within system.
@@ -26,75 +49,260 @@ def establish_simulation(system, orbiting_objects_dictionary, time):
     angular_velocities = {}
     orbit_radii = {}
     parent = {}
-    for orbit_object_name, orbit_object in orbiting_objects_dictionary.items():
-        # this is for the orbiting objects
-        if isinstance(orbit_object, OrbitingObject):
-            angular_velocities[orbit_object_name] = 2*math.pi/system.get_orbital_period(orbit_object_name)
+    for current_system, orbit_object_name, body, parent_name in walk_system(system, orbiting_objects_dictionary):
+        body_name = body.get_name()
+        elements = current_system.get_orbital_elements(orbit_object_name)
+        angular_velocities[body_name] = elements["angular_velocity"]
 
-            positions[orbit_object_name] = np.zeros((num_steps, 3))
-            velocities[orbit_object_name] = np.zeros((num_steps, 3))
+        positions[body_name] = np.zeros((num_steps, 3))
+        velocities[body_name] = np.zeros((num_steps, 3))
 
-            positions[orbit_object_name][0] = [orbit_object.start_x, orbit_object.start_y, orbit_object.start_z]
-            velocities[orbit_object_name][0] = [0, 0, 0]
+        positions[body_name][0] = [body.start_x, body.start_y, body.start_z]
+        velocities[body_name][0] = [0, 0, 0]
 
-            orbit_radii[orbit_object_name] = system.get_orbit_object_distance(orbit_object_name)
+        orbit_radii[body_name] = elements["radius"]
 
-            parent[orbit_object_name] = None
+        parent[body_name] = parent_name
 
-        elif isinstance(orbit_object, OrbitalSystem):
-            # setting empty lists for central object of system
-            central_object = orbit_object.get_central_object()
-            central_object_name = central_object.get_name()
-            angular_velocities[central_object_name] = 2*math.pi/system.get_orbital_period(orbit_object_name) #taken care of in orbital_system_sim.py
+    return positions, velocities, angular_velocities, orbit_radii, parent
 
-            positions[central_object_name] = np.zeros((num_steps, 3))
-            velocities[central_object_name] = np.zeros((num_steps, 3))
+def establish_nbody(system):
+    """
+    Creates the initial state for an N-body run: every body of the system, including its central object, with the
+    position and velocity of its Keplerian orbit at time 0 (ex: the Moon starts on its orbit around Earth, moving with Earth).
 
-            positions[central_object_name][0] = [central_object.start_x, central_object.start_y, central_object.start_z]
-            velocities[central_object_name][0] = [0, 0, 0]
+    Args:
+        system: Orbital System or BodyRegistry representing the system to simulate.
 
-            orbit_radii[central_object_name] = system.get_orbit_object_distance(orbit_object_name)
+    Returns:
+        names: List of body names, central object first.
+        masses: Numpy array holding the mass of each body in kg.
+        positions: Numpy array (bodies x 3) holding starting positions in AU.
+        velocities: Numpy array (bodies x 3) holding starting velocities in AU/year, with the system's total momentum removed.
+    """
+    registry = as_registry(system)
+    names = [registry.center_name] + registry.names
+    masses = np.r_[registry.center_mass, registry.mass]
 
-            parent[central_object_name] = None
-            
-            for sub_orbit_object_name, sub_orbit_object in orbit_object.orbiting_objects.items():
-                # this is for the orbiting objects in orbital systems IN ORBIT 
-                if isinstance(sub_orbit_object, OrbitingObject):
-                    angular_velocities[sub_orbit_object_name] = 2*math.pi/orbit_object.get_orbital_period(sub_orbit_object_name)
+    # Keplerian state at time 0 around the parent (circular orbits: on the x axis, moving along y)
+    local_positions, local_velocities = kepler_trajectories(registry, np.zeros(1))
+    local_positions, local_velocities = local_positions[:, 0], local_velocities[:, 0]
 
-                    positions[sub_orbit_object_name] = np.zeros((num_steps, 3))
-                    velocities[sub_orbit_object_name] = np.zeros((num_steps, 3))
+    positions = np.zeros((len(names), 3))
+    velocities = np.zeros((len(names), 3))
+    positions[0] = registry.center_start
+    positions[1:] = positions[0] + local_positions
+    velocities[1:] = local_velocities
+    if masses.sum() > 0:
+        velocities -= (masses[:, None]*velocities).sum(axis=0)/masses.sum() # keep the system's center of mass at rest
+    return names, masses, positions, velocities
 
-                    positions[sub_orbit_object_name][0] = [sub_orbit_object.start_x, sub_orbit_object.start_y, sub_orbit_object.start_z]
-                    velocities[sub_orbit_object_name][0] = [0, 0, 0]
+class SimulationHierarchy:
+    """
+    Flattened parent / child structure of a simulation, compiled once from the parent dictionary of establish_simulation.
 
-                    orbit_radii[sub_orbit_object_name] = orbit_object.get_orbit_object_distance(sub_orbit_object_name)
+    Attributes:
+        names: List of object names, in the order of the parent dictionary.
+        parent_index: Numpy int array holding the index (in names) of each object's parent, -1 for the system center.
+        depth: Numpy int array holding how many parents each object has (0 for objects orbiting the system center).
+        levels: List of numpy int arrays, levels[d] holds the indices of all objects at depth d.
+    """
+    def __init__(self, parent_relationship):
+        self.names = list(parent_relationship.keys())
+        index = {name: i for i, name in enumerate(self.names)}
+        self.parent_index = np.full(len(self.names), -1, dtype=int)
+        for name, parent_name in parent_relationship.items():
+            if parent_name is not None:
+                if parent_name not in index:
+                    raise ValueError(f"Parent {parent_name} of {name} not found in simulation.")
+                self.parent_index[index[name]] = index[parent_name]
 
-                    parent[sub_orbit_object_name] = central_object_name
+        self.depth = np.full(len(self.names), -1, dtype=int)
+        for i in range(len(self.names)):
+            # walk up until an object with known depth (or the system center), then fill in the chain
+            chain = []
+            j = i
+            while j != -1 and self.depth[j] == -1:
+                if j in chain:
+                    raise ValueError(f"Object {self.names[j]} is its own parent.")
+                chain.append(j)
+                j = self.parent_index[j]
+            known = -1 if j == -1 else self.depth[j]
+            for k in reversed(chain):
+                known += 1
+                self.depth[k] = known
 
-    return positions, velocities, angular_velocities, orbit_radii, parent
+        num_levels = self.depth.max() + 1 if len(self.names) else 0
+        self.levels = [np.flatnonzero(self.depth == d) for d in range(num_levels)]
 
-def run_simulation(system, sim_duration = 2, timestep = 0.00273973*7):
+    def __repr__(self):
+        return f"Simulation hierarchy: {len(self.names)} objects, {len(self.levels)} levels"
+
+    def ordered_names(self):
+        """Returns the object names ordered so every parent comes before its children."""
+        return [self.names[i] for level in self.levels for i in level]
+
+def run_simulation(system, sim_duration = 2, timestep = 0.00273973*7, engine = "vectorized", cache = None, profile = False, dtype = None, **engine_options):
     """
     Function runs orbital simulation. Generates x, y, z, position and velocity vectors, time vector.
 
     Args: 
-        system: Orbital System representing the system orbital system to simulate.
+        system: Orbital System representing the system orbital system to simulate (or a BodyRegistry, except for the "loop" engine).
         sim_duration: Float representing length of simulation in years. 
         timestep: Float representing length of simulation timestep in years.
+        engine: String selecting how positions are computed. "vectorized" evaluates every object at every time
+            as array operations, "loop" steps through time one object at a time (reference implementation).
+            "nbody" integrates the mutual gravity of all bodies (central object included) with leapfrog steps,
+            "adaptive" does the same with error-controlled Dormand-Prince steps between the output times.
+            "kepler" evaluates each body's elliptical orbit from its orbital elements (eccentricity, inclination, ...)
+            by solving Kepler's equation; unlike "vectorized", its first row is the orbit position at time 0.
+        engine_options: Keyword arguments for the "nbody" and "adaptive" engines. force_solver: "direct" (default),
+            "barnes_hut" or "jit" (direct forces compiled with Numba when installed, NumPy otherwise), softening:
+            softening length in AU, theta: Barnes-Hut opening angle. "adaptive" also takes rtol and atol
+            (error tolerances), max_steps and stats, a dictionary filled with the step counts of the run. Other
+            engines take no options; options an engine does not take raise a TypeError (see ENGINE_OPTIONS).
+        cache: None (default) to always simulate, True to use result_cache.default_cache(), or a ResultCache.
+            A run whose system, parameters and engine options were simulated before is read back from disk.
+            Runs passing stats are never cached.
+        profile: False (default) for no instrumentation, True for a new instrumentation.RunReport, or a RunReport
+            to add this run to. The report times the "cache", "establish" and "propagate" stages and counts body-steps
+            per second; export it with report.to_json(). Pass instrumentation.RunReport(track_memory=True) to also
+            track peak memory (tracing slows the run down).
+        dtype: Numpy dtype of the returned positions (ex: np.float32 halves their memory), None keeps float64.
+            The simulation itself always runs in float64 and is converted at the end, so only the memory kept
+            after the call shrinks: the peak is the float64 run plus its copy. For a lower peak, use
+            iter_simulation, which converts one chunk at a time.
     
     Returns:
         positions: Dictionary holding x, y, z positions for each orbiting object within simulated system.
         time: Numpy array (vector) holding a timestep-ed time vector in years.
+        report: instrumentation.RunReport of the run, only returned when profile is set.
 
     """
+    check_engine(engine, engine_options)
+    if dtype is not None:
+        result = run_simulation(system, sim_duration, timestep, engine, cache, profile, **engine_options)
+        positions = {name: np.asarray(trajectory, dtype=dtype) for name, trajectory in result[0].items()}
+        return (positions,) + tuple(result[1:])
+    if profile:
+        report = profile if isinstance(profile, instrumentation.RunReport) else instrumentation.RunReport()
+        report.info.update(engine=engine, sim_duration=sim_duration, timestep=timestep)
+        with report.recording():
+            positions, time = run_simulation(system, sim_duration, timestep, engine, cache, **engine_options)
+        report.count_steps(len(positions), len(time))
+        if isinstance(engine_options.get("stats"), dict):
+            report.counters.update(engine_options["stats"]) # adaptive step counts
+        return positions, time, report
+    if cache is not None and cache is not False and "stats" not in engine_options:
+        cache = result_cache.default_cache() if cache is True else cache
+        with instrumentation.stage("cache"):
+            key = cache.key(system, sim_duration, timestep, engine, engine_options)
+            cached = cache.get(key)
+        if cached is not None:
+            return cached
+        positions, time = run_simulation(system, sim_duration, timestep, engine, **engine_options)
+        with instrumentation.stage("cache"):
+            cache.put(key, positions, time)
+        return positions, time
     time = np.linspace(0, sim_duration, round(sim_duration/timestep)) # time vector in years
-    num_steps = len(time)
-    positions, velocities, angular_velocities, orbit_radii, parent_relationship = establish_simulation(system, system.orbiting_objects, time) 
+    if engine in ("nbody", "adaptive"):
+        with instrumentation.stage("establish"):
+            names, masses, start_positions, start_velocities = establish_nbody(system)
+        with instrumentation.stage("propagate"):
+            trajectories, _ = integrate_nbody(engine, start_positions, start_velocities, masses, time, engine_options)
+        positions = {name: trajectories[i] for i, name in enumerate(names)}
+        return positions, time
+
+    if engine == "kepler":
+        with instrumentation.stage("establish"):
+            registry = as_registry(system)
+        with instrumentation.stage("propagate"):
+            trajectories, _ = kepler_trajectories(registry, time)
+        positions = {name: trajectories[i] for i, name in enumerate(registry.names)}
+        return positions, time
+
+    if engine == "vectorized":
+        with instrumentation.stage("establish"):
+            registry = as_registry(system)
+        with instrumentation.stage("propagate"):
+            trajectories = registry_trajectories(registry, time)
+        if len(time):
+            trajectories[:, 0] = registry.start # first row keeps the start position
+        positions = {name: trajectories[i] for i, name in enumerate(registry.names)}
+        return positions, time
+
+    if isinstance(system, BodyRegistry):
+        raise TypeError("The loop engine needs an OrbitalSystem.")
+    with instrumentation.stage("establish"):
+        positions, velocities, angular_velocities, orbit_radii, parent_relationship = establish_simulation(system, system.orbiting_objects, time) 
     # now we have a position, velocity dictionary for all orbiting objects with initial position conditions defined, have a time vector
+    with instrumentation.stage("propagate"):
+        propagate_loop(positions, angular_velocities, orbit_radii, parent_relationship, time)
+
+    return positions, time
+
+def integrate_nbody(engine, start_positions, start_velocities, masses, time, engine_options):
+    """
+    Integrates bodies from establish_nbody with the "nbody" (leapfrog) or "adaptive" (Dormand-Prince) engine.
+
+    Args:
+        engine: String, "nbody" or "adaptive".
+        start_positions: Numpy array (bodies x 3) holding starting positions in AU.
+        start_velocities: Numpy array (bodies x 3) holding starting velocities in AU/year.
+        masses: Numpy array holding the mass of each body in kg.
+        time: Numpy array (vector) holding the output times in years.
+        engine_options: Dictionary of engine keyword arguments (see run_simulation), consumed by this function.
+
+    Returns:
+        trajectories: Numpy array (bodies x steps x 3) holding positions at every time.
+        velocities: Numpy array (bodies x steps x 3) holding velocities at every time.
+    """
+    force_solver = engine_options.pop("force_solver", "direct")
+    if force_solver not in FORCE_SOLVERS:
+        raise ValueError(f"Unknown force solver {force_solver}.")
+    stats = engine_options.pop("stats", None)
+    if stats is not None and engine != "adaptive":
+        raise ValueError("Only the adaptive engine fills stats.")
+    if engine == "nbody" and force_solver == "jit":
+        return jit_kernels.leapfrog(start_positions, start_velocities, masses, time, **engine_options) # compiled loop
+    if engine == "nbody":
+        return nbody.leapfrog(start_positions, start_velocities, masses, time, FORCE_SOLVERS[force_solver], **engine_options)
+
+    trajectories, velocities, run_stats = nbody.dormand_prince(start_positions, start_velocities, masses, time,
+                                                               accelerations=FORCE_SOLVERS[force_solver], **engine_options)
+    if stats is not None:
+        add_stats(stats, run_stats) # counts add up when a run is integrated in several pieces
+    return trajectories, velocities
+
+def add_stats(stats, run_stats):
+    """
+    Adds the step counts of an "adaptive" run (or piece of a run) to a stats dictionary, in place:
+    min_step and max_step keep the extremes, every other count is summed.
+    """
+    for key, value in run_stats.items():
+        if key == "min_step":
+            stats[key] = min(stats.get(key, value), value)
+        elif key == "max_step":
+            stats[key] = max(stats.get(key, value), value)
+        else:
+            stats[key] = stats.get(key, 0) + value
+
+def propagate_loop(positions, angular_velocities, orbit_radii, parent_relationship, time):
+    """
+    Fills the position arrays one timestep and one object at a time. Reference implementation for the other engines.
+
+    Args:
+        positions: Dictionary of position arrays from establish_simulation, filled in place.
+        angular_velocities: Dictionary for angular velocity of each orbiting object.
+        orbit_radii: Dictionary for distances between system center and each orbiting object.
+        parent_relationship: Dictionary with parent of each object (None for objects orbiting the system center).
+        time: Numpy array (vector) holding a timestep-ed time vector in years.
+    """
+    num_steps = len(time)
+    ordered_objects = SimulationHierarchy(parent_relationship).ordered_names() # parents are always computed before children
     # looping through time
     for i in range(1, num_steps):
-        for orbit_object in positions.keys():
+        for orbit_object in ordered_objects:
             object_parent = parent_relationship.get(orbit_object)
             if object_parent is None: #if just an Orbiting Object, then simulate as normal
                 positions[orbit_object][i, 0] = orbit_radii[orbit_object]*math.cos(angular_velocities[orbit_object]*time[i])
@@ -112,4 +320,216 @@ def run_simulation(system, sim_duration = 2, timestep = 0.00273973*7):
                 positions[orbit_object][i, 0] = parent_x + child_x
                 positions[orbit_object][i, 1] = parent_y + child_y
 
-    return positions, time
+def registry_trajectories(registry, time):
+    """
+    Evaluates the circular orbits of every body of a registry at the given times, straight from its arrays.
+
+    Args:
+        registry: BodyRegistry holding the bodies.
+        time: Numpy array (vector) holding times in years.
+
+    Returns:
+        trajectories: Numpy array (bodies x steps x 3) holding positions in registry order.
+    """
+    trajectories = np.zeros((len(registry), len(time), 3))
+    angles = np.outer(registry.angular_velocities(), time) # angle of every body at every time
+    radii = registry.distance_from_center[:, None]
+    trajectories[:, :, 0] = radii*np.cos(angles)
+    trajectories[:, :, 1] = radii*np.sin(angles)
+    jit_kernels.add_parent_offsets(trajectories, registry.parent_index, registry.levels, num_axes=2)
+    return trajectories
+
+def kepler_trajectories(registry, time):
+    """
+    Evaluates the Keplerian orbits of every body of a registry at the given times, from its orbital elements.
+    Each body moves around its parent, so positions and velocities are accumulated level by level.
+
+    Args:
+        registry: BodyRegistry holding the bodies.
+        time: Numpy array (vector) holding times in years.
+
+    Returns:
+        positions: Numpy array (bodies x steps x 3) holding positions around the system center in AU, in registry order.
+        velocities: Numpy array (bodies x steps x 3) holding velocities in AU/year.
+    """
+    positions, velocities = kepler.kepler_state(registry.distance_from_center, registry.eccentricity, registry.inclination,
+                                                registry.longitude_of_ascending_node, registry.argument_of_periapsis,
+                                                registry.mean_anomaly, registry.angular_velocities(), time)
+    jit_kernels.add_parent_offsets(positions, registry.parent_index, registry.levels)
+    jit_kernels.add_parent_offsets(velocities, registry.parent_index, registry.levels)
+    return positions, velocities
+
+_body_paths_cache = weakref.WeakKeyDictionary() # system -> body name -> steps from the system down to the body
+
+def _body_paths(system, names):
+    """
+    Returns the (system, orbit_object_name, orbit object) steps from system down to each named body, outermost first.
+    The paths of a system are found once and kept while they still lead to the same objects, so a lookup costs
+    the depth of the body, not the size of the system.
+    """
+    paths = _body_paths_cache.get(system)
+    for _ in range(2):
+        if paths is None:
+            paths = {}
+            for current_system, orbit_object_name, body, parent_name in walk_system(system, system.orbiting_objects):
+                step = (current_system, orbit_object_name, current_system.orbiting_objects[orbit_object_name])
+                paths[body.get_name()] = (paths[parent_name] if parent_name is not None else []) + [step]
+            _body_paths_cache[system] = paths
+        found = {}
+        for name in names:
+            path = paths.get(name)
+            if path is None or any(step_system.orbiting_objects.get(key) is not object for step_system, key, object in path) \
+                    or _step_body(path[-1][2]).get_name() != name:
+                break
+            found[name] = path
+        else:
+            return found
+        paths = None # the system changed since its paths were found
+    raise ValueError(f"Object {name} not found in system.")
+
+def _step_body(object):
+    """Returns the body that moves for an orbiting object or orbital system (its central object)."""
+    return object.get_central_object() if isinstance(object, OrbitalSystem) else object
+
+def positions_at(system, names, times, engine = "vectorized"):
+    """
+    Evaluates the positions of a few bodies at arbitrary times, without computing the whole system on a time grid.
+    Only the requested bodies and the bodies they orbit (ex: Earth for the Moon) are evaluated. The first query
+    of an Orbital System indexes where each body sits; after that, the cost grows with the number of requested
+    bodies, their depth and the number of times, not with the size of the system or the length of a run.
+
+    Args:
+        system: Orbital System or BodyRegistry.
+        names: String or list of strings representing the bodies to evaluate.
+        times: Float or numpy array (vector) holding times in years.
+        engine: String, "vectorized" for circular orbits (as run_simulation, except that time 0 gives the orbit
+            position rather than the start position) or "kepler" for orbits from the bodies' orbital elements.
+
+    Returns:
+        positions: Dictionary holding x, y, z positions (steps x 3, or 3 for a single time) of each requested body.
+    """
+    if engine not in ("vectorized", "kepler"):
+        raise ValueError(f"Unknown position engine {engine}.")
+    if isinstance(names, str):
+        names = [names]
+    time = np.atleast_1d(np.asarray(times, dtype=float))
+
+    # requested bodies and their ancestors, parents first, as rows of the arrays below
+    if isinstance(system, BodyRegistry):
+        needed = {}
+        for name in names:
+            index = system.index(name)
+            while index != -1 and index not in needed:
+                needed[index] = system.depth[index]
+                index = system.parent_index[index]
+        indices = np.array(sorted(needed, key=needed.get), dtype=int)
+        row = {index: i for i, index in enumerate(indices)}
+        parents = [row.get(parent, -1) for parent in system.parent_index[indices]]
+        distance = system.distance_from_center[indices]
+        period = system.orbital_period[indices]
+        elements = [getattr(system, element)[indices] for element in ORBITAL_ELEMENTS]
+        rows = {name: row[system.index(name)] for name in names}
+    else:
+        rows, parents, distance, period, bodies = {}, [], [], [], []
+        for name, path in _body_paths(system, names).items():
+            parent = -1
+            for step_system, key, object in path:
+                body = _step_body(object)
+                if body.get_name() not in rows:
+                    rows[body.get_name()] = len(parents)
+                    parents.append(parent)
+                    orbit = step_system.get_orbital_elements(key)
+                    distance.append(orbit["radius"])
+                    period.append(orbit["period"])
+                    bodies.append(body)
+                parent = rows[body.get_name()]
+        distance = np.array(distance, dtype=float)
+        period = np.array(period, dtype=float)
+        elements = [np.array([getattr(body, element, 0.0) for body in bodies], dtype=float) for element in ORBITAL_ELEMENTS]
+
+    angular_velocities = 2*math.pi/period
+    if engine == "kepler":
+        local, _ = kepler.kepler_state(distance, *elements, angular_velocities, time)
+    else:
+        local = np.zeros((len(distance), len(time), 3))
+        angles = np.outer(angular_velocities, time)
+        local[:, :, 0] = distance[:, None]*np.cos(angles)
+        local[:, :, 1] = distance[:, None]*np.sin(angles)
+    for i, parent in enumerate(parents):
+        if parent != -1:
+            local[i] += local[parent] # parents come first, so they already hold absolute positions
+
+    positions = {name: local[rows[name]] for name in names}
+    if np.ndim(times) == 0:
+        positions = {name: position[0] for name, position in positions.items()}
+    return positions
+
+def simulation_time(sim_duration, num_steps, start = 0, stop = None):
+    """
+    Returns steps start to stop of the simulation time vector np.linspace(0, sim_duration, num_steps), with the
+    same values, without building the whole vector.
+
+    Args:
+        sim_duration: Float representing length of simulation in years.
+        num_steps: Int representing the number of steps in the whole simulation.
+        start: Int representing the first step to return.
+        stop: Int representing the step after the last one to return (defaults to num_steps).
+
+    Returns:
+        time: Numpy array (vector) holding the requested times in years.
+    """
+    stop = num_steps if stop is None else min(stop, num_steps)
+    steps = np.arange(start, max(start, stop), dtype=float)
+    if num_steps > 1:
+        time = steps*(sim_duration/(num_steps - 1))
+        if stop == num_steps and stop > start:
+            time[-1] = sim_duration
+    else:
+        time = steps*sim_duration
+    return time
+
+def iter_simulation(system, sim_duration = 2, timestep = 0.00273973*7, engine = "vectorized", chunk_steps = 10000, dtype = None, **engine_options):
+    """
+    Runs the simulation in chunks of time, so memory stays bounded by chunk_steps however long the run is.
+    Concatenating the chunks gives the same positions and time as run_simulation.
+
+    Args:
+        system: Orbital System or BodyRegistry representing the system to simulate.
+        sim_duration: Float representing length of simulation in years.
+        timestep: Float representing length of simulation timestep in years.
+        engine: String selecting the engine, as in run_simulation ("loop" runs as "vectorized", which gives the same values).
+        chunk_steps: Int representing the number of timesteps in each chunk.
+        dtype: Numpy dtype of the yielded positions (ex: np.float32), None keeps float64. Only one chunk is ever float64.
+        engine_options: Keyword arguments for the engine, as in run_simulation. For "adaptive", stats adds up over all chunks.
+
+    Yields:
+        positions: Dictionary holding x, y, z positions of each object for the chunk's timesteps.
+        time: Numpy array (vector) holding the chunk's times in years.
+    """
+    check_engine(engine, engine_options)
+    num_steps = round(sim_duration/timestep)
+    if engine in ("nbody", "adaptive"):
+        names, masses, state_positions, state_velocities = establish_nbody(system)
+        previous_time = None
+        for start in range(0, num_steps, chunk_steps):
+            time = simulation_time(sim_duration, num_steps, start, start + chunk_steps)
+            # each chunk starts from the last state of the previous one
+            chunk_time = time if previous_time is None else np.r_[previous_time, time]
+            trajectories, velocities = integrate_nbody(engine, state_positions, state_velocities, masses, chunk_time, dict(engine_options))
+            state_positions, state_velocities, previous_time = trajectories[:, -1], velocities[:, -1], time[-1]
+            if chunk_time is not time:
+                trajectories = trajectories[:, 1:]
+            yield {name: np.asarray(trajectories[i], dtype=dtype) for i, name in enumerate(names)}, time
+        return
+
+    registry = as_registry(system)
+    for start in range(0, num_steps, chunk_steps):
+        time = simulation_time(sim_duration, num_steps, start, start + chunk_steps)
+        if engine == "kepler":
+            trajectories, _ = kepler_trajectories(registry, time)
+            yield {name: np.asarray(trajectories[i], dtype=dtype) for i, name in enumerate(registry.names)}, time
+            continue
+        trajectories = registry_trajectories(registry, time)
+        if start == 0:
+            trajectories[:, 0] = registry.start
+        yield {name: np.asarray(trajectories[i], dtype=dtype) for i, name in enumerate(registry.names)}, time
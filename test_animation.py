@@ -0,0 +1,67 @@
+# Unit tests for functions in animation.py
+import matplotlib.pyplot as plt
+from matplotlib import animation as mpl_animation
+import numpy as np
+import pytest
+
+import animation
+import simulate_orbits
+from test_simulate_orbits import make_solar_system
+
+@pytest.fixture(autouse=True)
+def headless_pyplot():
+    """
+    Draws with Agg during each test, then closes its figures and puts the previous backend back.
+    """
+    backend = plt.get_backend()
+    plt.switch_backend("Agg")
+    yield
+    plt.close("all")
+    plt.switch_backend(backend)
+
+class RecordingWriter(mpl_animation.AbstractMovieWriter):
+    """
+    Movie writer keeping the data of every line and text of each saved frame instead of encoding it.
+    """
+    def setup(self, fig, outfile, dpi = None):
+        super().setup(fig, outfile, dpi)
+        self.frames = []
+
+    def grab_frame(self, **savefig_kwargs):
+        ax = self.fig.axes[0]
+        self.frames.append(([np.array(line.get_xdata(), dtype=float) for line in ax.lines],
+                            [text.get_text() for text in ax.texts], [line.get_animated() for line in ax.lines]))
+
+    def finish(self):
+        pass
+
+def test_frames_move_points_and_trails(tmp_path):
+    """
+    Check that a frame draws each object at its position with a trail of trail_length steps, relative to center
+    """
+    positions, time = simulate_orbits.run_simulation(make_solar_system(), sim_duration=0.5, engine="kepler")
+    anim = animation.animate_system(positions, time, trail_length=5, center="Mars")
+    writer = RecordingWriter(fps=30)
+    anim.save(str(tmp_path/"frames"), writer=writer)
+    assert len(writer.frames) == len(time)
+    lines, texts, animated = writer.frames[20]
+    names = list(positions)
+    phobos = names.index("Phobos")
+    trail, point = lines[2*phobos], lines[2*phobos + 1] # each object has its trail, then its point
+    assert np.allclose(point, positions["Phobos"][20, 0] - positions["Mars"][20, 0])
+    assert len(trail) == 6
+    assert texts[0].startswith(f"t = {time[20]:.3f}")
+    assert all(animated)
+
+def test_save_gif_3d(tmp_path):
+    """
+    Check that a skipped-frame 3D animation is written to a file, and that bad dimensions or no objects are refused
+    """
+    positions, time = simulate_orbits.run_simulation(make_solar_system(), sim_duration=0.3, engine="kepler")
+    path = tmp_path/"orbits.gif"
+    animation.animate_system(positions, time, str(path), dimensions=3, frame_skip=3, fps=10, dpi=30)
+    assert path.stat().st_size > 0
+    with pytest.raises(ValueError):
+        animation.animate_system(positions, time, dimensions=4)
+    with pytest.raises(ValueError, match="No positions to animate"):
+        animation.animate_system({}, time)
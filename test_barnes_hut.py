@@ -0,0 +1,79 @@
+# Unit tests for functions in barnes_hut.py
+import numpy as np
+import pytest
+
+import barnes_hut
+import nbody
+import simulate_orbits
+from test_nbody import make_sun_earth
+
+def random_bodies(num_bodies, seed = 3):
+    """
+    Returns random positions (AU) and masses (kg) for num_bodies bodies.
+    """
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 1, (num_bodies, 3)), rng.uniform(1e20, 2e20, num_bodies)
+
+def test_octree_node_masses():
+    """
+    Check that the root holds all the mass and every level of split nodes adds up to its parent
+    """
+    positions, masses = random_bodies(200)
+    tree = barnes_hut.Octree(positions, masses)
+    assert np.isclose(tree.mass[0], masses.sum())
+    split = np.flatnonzero(tree.child_count > 0)
+    for node in split:
+        children = slice(tree.child_start[node], tree.child_start[node] + tree.child_count[node])
+        assert np.isclose(tree.mass[children].sum(), tree.mass[node])
+        assert tree.count[children].sum() == tree.count[node]
+
+def test_theta_zero_matches_direct():
+    """
+    Check that an opening angle of 0 (every node opened) gives direct summation
+    """
+    positions, masses = random_bodies(300)
+    direct = nbody.direct_accelerations(positions, masses)
+    approximate = barnes_hut.barnes_hut_accelerations(positions, masses, theta=0)
+    assert np.allclose(approximate, direct, rtol=1e-10, atol=0)
+
+def test_theta_accuracy():
+    """
+    Check that the force error grows with the opening angle and stays small at theta = 0.5
+    """
+    positions, masses = random_bodies(1000)
+    direct = nbody.direct_accelerations(positions, masses)
+    errors = []
+    for theta in (0.2, 0.5, 1.0):
+        approximate = barnes_hut.barnes_hut_accelerations(positions, masses, theta=theta)
+        errors.append(np.median(np.linalg.norm(approximate - direct, axis=1)/np.linalg.norm(direct, axis=1)))
+    assert errors[0] < errors[1] < errors[2]
+    assert errors[1] < 0.01
+
+def test_coincident_bodies():
+    """
+    Check that bodies too close to be split by the tree still feel each other
+    """
+    positions = np.array([[0.0, 0.0, 0.0], [1e-12, 0.0, 0.0], [1.0, 0.0, 0.0]])
+    masses = np.array([1e20, 1e20, 1e20])
+    direct = nbody.direct_accelerations(positions, masses)
+    approximate = barnes_hut.barnes_hut_accelerations(positions, masses, theta=0.5)
+    assert np.allclose(approximate, direct, rtol=1e-10)
+
+def test_benchmark_against_direct():
+    """
+    Check that the benchmark reports timings and errors for both solvers
+    """
+    results = barnes_hut.benchmark_against_direct(200, theta=0.5, repeats=1)
+    assert results["direct_seconds"] > 0 and results["barnes_hut_seconds"] > 0
+    assert results["max_relative_error"] < 0.1
+
+def test_run_simulation_barnes_hut():
+    """
+    Check that the N-body engine gives the same orbit with the Barnes-Hut solver (exact for two bodies)
+    """
+    system = make_sun_earth()
+    direct_positions, time = simulate_orbits.run_simulation(system, sim_duration=0.5, engine="nbody")
+    tree_positions, time = simulate_orbits.run_simulation(system, sim_duration=0.5, engine="nbody", force_solver="barnes_hut", theta=0.5)
+    assert np.allclose(direct_positions["Earth"], tree_positions["Earth"], rtol=1e-9, atol=1e-12)
+    with pytest.raises(ValueError, match="Unknown force solver fmm."):
+        simulate_orbits.run_simulation(system, engine="nbody", force_solver="fmm")
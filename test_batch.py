@@ -0,0 +1,59 @@
+# Unit tests for functions in batch.py
+import numpy as np
+
+from orbital_system_sim import Planet, Star, StellarOrbitalSystem
+import batch
+import simulate_orbits
+
+def build_system(mass, distance):
+    """
+    Builds a Sun / single planet system with the given planet mass (kg) and distance (AU).
+    """
+    sun = Star("Sun", 695700, 1.989e30, 0, 0, 0, 3.828e26, "O-type")
+    system = StellarOrbitalSystem("Sweep", sun)
+    system.add_orbiting_object(Planet("Planet", 6371, mass, 0, 0, 0, distance, "rocky"))
+    return system
+
+def test_parameter_grid():
+    """
+    Check that the grid builds one system per combination keyed by the parameter values
+    """
+    systems = batch.parameter_grid(build_system, mass=[1e23, 1e24], distance=[1.0, 2.0, 3.0])
+    assert list(systems.keys())[:2] == [(1e23, 1.0), (1e23, 2.0)]
+    assert len(systems) == 6
+    assert systems[(1e24, 3.0)].orbiting_objects["Planet"].distance_from_center == 3.0
+
+def test_run_batch_matches_serial():
+    """
+    Check that runs spread over processes give the same positions as serial run_simulation calls
+    """
+    systems = batch.parameter_grid(build_system, mass=[1e23, 1e24], distance=[1.0, 2.0])
+    results = batch.run_batch(systems, sim_duration=1, processes=2, chunksize=1)
+    assert list(results.keys()) == list(systems.keys())
+    for key, system in systems.items():
+        positions, time = simulate_orbits.run_simulation(system, sim_duration=1)
+        assert np.array_equal(results[key].time, time)
+        assert results[key].names == ["Planet"]
+        assert np.array_equal(results[key].positions_dictionary()["Planet"], positions["Planet"])
+
+def test_run_batch_list_in_process():
+    """
+    Check that a list of systems is keyed by position and engine options are passed on
+    """
+    systems = [build_system(1e24, 1.0), build_system(1e24, 1.5)]
+    results = batch.run_batch(systems, sim_duration=0.5, engine="nbody", processes=1, softening=1e-6)
+    assert list(results.keys()) == [0, 1]
+    assert results[1].names == ["Sun", "Planet"]
+    assert results[1].positions.shape == (2, len(results[1].time), 3)
+
+def test_run_batch_stats_from_processes():
+    """
+    Check that adaptive step counts filled in worker processes come back per run and as totals
+    """
+    systems = [build_system(1e24, 1.0), build_system(1e24, 2.0)]
+    stats = {}
+    results = batch.run_batch(systems, sim_duration=0.2, engine="adaptive", processes=2, chunksize=1, stats=stats)
+    assert all(result.stats["accepted_steps"] > 0 for result in results.values())
+    assert stats["accepted_steps"] == sum(result.stats["accepted_steps"] for result in results.values())
+    assert stats["min_step"] == min(result.stats["min_step"] for result in results.values())
+    assert batch.run_batch(systems, sim_duration=0.2, processes=1)[0].stats is None
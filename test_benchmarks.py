@@ -0,0 +1,37 @@
+# Unit tests for functions in benchmarks.py
+import numpy as np
+
+import benchmarks
+import simulate_orbits
+
+def test_tree_shapes():
+    """
+    Check that benchmark systems have the requested number of bodies and depth, as registries and as objects
+    """
+    for num_bodies, depth in [(1, 1), (100, 2), (100, 4), (1000, 3)]:
+        registry = benchmarks.build_registry(num_bodies, depth)
+        assert len(registry) == num_bodies and len(registry.levels) == depth
+    system = benchmarks.build_system(30, 3)
+    positions, _ = simulate_orbits.run_simulation(system)
+    registry_positions, _ = simulate_orbits.run_simulation(benchmarks.build_registry(30, 3))
+    assert sorted(positions) == sorted(registry_positions) # objects are walked depth first, the registry breadth first
+    assert np.allclose(positions["Body 29"], registry_positions["Body 29"])
+
+def test_cases_history_and_regressions(tmp_path):
+    """
+    Check case selection, that runs are stored, and that only slowdowns past the threshold are reported
+    """
+    assert all(parameters["bodies"]*parameters["steps"] <= benchmarks.MAX_POINTS for _, parameters in benchmarks.benchmark_cases())
+    cases = [case for case in benchmarks.benchmark_cases("convert", quick=True) if case[1]["bodies"] <= 100]
+    results = benchmarks.run_benchmarks(cases, repeats=1)
+    assert [result["name"] for result in results] == ["convert_simulation_to_dataframe"]*len(cases)
+    assert all(result["seconds"] > 0 and result["peak_bytes"] > 0 for result in results)
+
+    path = str(tmp_path/"history.jsonl")
+    benchmarks.save_run(results, path, "first")
+    assert benchmarks.load_history(path)[0]["label"] == "first"
+    assert benchmarks.find_regressions(results, benchmarks.load_history(path)) == []
+    slower = [dict(result, seconds=result["seconds"]*2) for result in results]
+    regressions = benchmarks.find_regressions(slower, benchmarks.load_history(path), threshold=0.5)
+    assert [regression["metric"] for regression in regressions] == ["seconds"]*len(results)
+    assert benchmarks.main(["--filter", "convert", "--quick", "--repeats", "1", "--history", path, "--threshold", "100"]) == 0
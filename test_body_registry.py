@@ -0,0 +1,84 @@
+# Unit tests for functions in body_registry.py
+import numpy as np
+import pytest
+
+from orbital_system_sim import Planet
+from body_registry import BodyRegistry
+import simulate_orbits
+from test_simulate_orbits import make_solar_system, make_nested_system
+
+def test_from_system_flattens_hierarchy():
+    """
+    Check that a system flattens into arrays in simulation order, with parent indices and periods
+    """
+    system = make_solar_system()
+    registry = BodyRegistry.from_system(system)
+    assert registry.names == ["Mars", "Phobos", "Deimos", "Mercury"]
+    assert list(registry.parent_index) == [-1, 0, 0, -1]
+    assert registry.center_name == "Sun"
+    assert registry.orbital_period[3] == system.get_orbital_period("Mercury")
+    assert registry["Phobos"].distance_from_center == 0.00004011
+
+def test_levels_follow_depth():
+    """
+    Check that depth and levels are computed for any order of parents
+    """
+    registry = BodyRegistry(["Probe", "Moon", "Earth"], [1, 7e22, 6e24], [1, 1, 1], [0.00002, 0.00257, 1.0],
+                            np.zeros((3, 3)), [1, 2, -1], "Sun", 1.989e30)
+    assert list(registry.depth) == [2, 1, 0]
+    assert [list(level) for level in registry.levels] == [[2], [1], [0]]
+    with pytest.raises(ValueError, match="Parent indices contain a cycle."):
+        BodyRegistry(["A", "B"], [1, 1], [1, 1], [1, 1], np.zeros((2, 3)), [1, 0])
+
+def test_registry_simulation_matches_system():
+    """
+    Check that simulating the registry gives exactly the loop engine's positions for a nested system
+    """
+    system = make_nested_system()
+    loop_positions, time = simulate_orbits.run_simulation(system, engine="loop")
+    registry_positions, time = simulate_orbits.run_simulation(BodyRegistry.from_system(system))
+    for name in loop_positions:
+        assert np.array_equal(loop_positions[name], registry_positions[name])
+    with pytest.raises(TypeError, match="The loop engine needs an OrbitalSystem."):
+        simulate_orbits.run_simulation(BodyRegistry.from_system(system), engine="loop")
+
+def test_views_read_and_write_arrays():
+    """
+    Check that views write through to the arrays and keep periods up to date
+    """
+    registry = BodyRegistry.from_system(make_solar_system())
+    mars = registry["Mars"]
+    assert mars.get_name() == "Mars" and registry["Phobos"].parent.name == "Mars"
+    phobos_period = registry["Phobos"].orbital_period
+    mars.mass = 4*mars.mass
+    assert registry.mass[0] == 4*6.4191*10**23
+    assert np.isclose(registry["Phobos"].orbital_period, phobos_period/2)
+    mars_period = mars.orbital_period
+    mars.distance_from_center = 6.0
+    assert np.isclose(mars.orbital_period, 8*mars_period)
+    assert not hasattr(mars, "__dict__")
+    with pytest.raises(ValueError, match="Object Venus not found in registry."):
+        registry["Venus"]
+
+def test_large_constellation_from_arrays():
+    """
+    Check that a registry of many satellites built from arrays simulates without per-object Python objects
+    """
+    num_satellites = 100000
+    rng = np.random.default_rng(0)
+    names = [f"Sat {i}" for i in range(num_satellites)]
+    distance = rng.uniform(4.5e-5, 3e-4, num_satellites)
+    registry = BodyRegistry(names, np.full(num_satellites, 500.0), np.full(num_satellites, 0.001), distance,
+                            np.zeros((num_satellites, 3)), np.full(num_satellites, -1), "Earth", 5.972e24)
+    positions, time = simulate_orbits.run_simulation(registry, sim_duration=0.01, timestep=0.001)
+    assert len(positions) == num_satellites
+    assert np.allclose(np.linalg.norm(positions["Sat 7"][1:], axis=1), distance[7])
+
+def test_space_objects_have_no_dict():
+    """
+    Check that space objects use slots rather than a per-instance dictionary
+    """
+    planet = Planet("Earth", 6371, 5.972e24, 0, 0, 0, 1.0, "rocky")
+    assert not hasattr(planet, "__dict__")
+    with pytest.raises(AttributeError):
+        planet.colour = "blue"
@@ -0,0 +1,93 @@
+# Unit tests for functions in catalog.py and OrbitalSystem.add_orbiting_objects
+import json
+import pytest
+
+from orbital_system_sim import Planet, Satellite, Star, OrbitalSystem, PlanetaryOrbitalSystem, StellarOrbitalSystem
+import catalog
+
+CSV_CATALOG = """type,name,radius,mass,distance_from_center,planet_type,lifetime,material
+planet,Earth,6371,5.972e24,1.0,rocky,,
+planet,Mars,3390,6.4191e23,1.5,rocky,,
+satellite,Probe,0.001,500,2.0,,10,aluminium
+"""
+
+def make_sun_system():
+    """
+    Builds an empty system around the Sun.
+    """
+    return StellarOrbitalSystem("Solar System", Star("Sun", 695700, 1.989e30, 0, 0, 0, 3.828e26, "O-type"))
+
+def test_load_csv_catalog(tmp_path):
+    """
+    Check that a CSV catalog loads into objects of the right types and values
+    """
+    path = tmp_path/"catalog.csv"
+    path.write_text(CSV_CATALOG)
+    objects = catalog.load_catalog(str(path))
+    assert [type(object) for object in objects] == [Planet, Planet, Satellite]
+    assert objects[1].distance_from_center == 1.5 and objects[1].start_x == 0.0
+    assert objects[2].material == "aluminium"
+
+def test_load_catalog_orbital_elements(tmp_path):
+    """
+    Check that optional orbital elements are read, and reach the body registry
+    """
+    from body_registry import BodyRegistry
+    path = tmp_path/"catalog.json"
+    path.write_text(json.dumps([{"type": "planet", "name": "Comet", "radius": 10, "mass": 1e13, "distance_from_center": 2.0,
+                                 "planet_type": "icy", "eccentricity": "0.6", "inclination": 0.3}]))
+    system = make_sun_system()
+    catalog.add_catalog(system, str(path))
+    assert system.orbiting_objects["Comet"].eccentricity == 0.6
+    registry = BodyRegistry.from_system(system)
+    assert registry["Comet"].inclination == 0.3 and registry["Comet"].mean_anomaly == 0.0
+
+def test_load_json_catalog(tmp_path):
+    """
+    Check that a JSON catalog loads, and a bad type is reported with its row
+    """
+    path = tmp_path/"catalog.json"
+    path.write_text(json.dumps({"objects": [{"type": "Satellite", "name": "Deimos", "radius": 11, "mass": 0,
+                                             "distance_from_center": 0.00004011, "lifetime": 100, "material": "asteroid"}]}))
+    assert catalog.load_catalog(str(path))[0].name == "Deimos"
+    path.write_text(json.dumps([{"type": "comet", "name": "Halley"}]))
+    with pytest.raises(ValueError, match="Unknown object type comet in catalog row 1."):
+        catalog.load_catalog(str(path))
+
+def test_add_catalog_policies(tmp_path):
+    """
+    Check that name conflicts follow the replace / skip / error policy and never prompt
+    """
+    path = tmp_path/"catalog.csv"
+    path.write_text(CSV_CATALOG)
+    system = make_sun_system()
+    earth = Planet("Earth", 6371, 5.972e24, 0, 0, 0, 1.0, "rocky")
+    system.add_orbiting_object(earth)
+    with pytest.raises(ValueError, match="Objects already in the system: Earth"):
+        catalog.add_catalog(system, str(path))
+    assert list(system.orbiting_objects) == ["Earth"]
+    report = catalog.add_catalog(system, str(path), on_conflict="skip")
+    assert report == {"added": ["Mars", "Probe"], "replaced": [], "skipped": ["Earth"]}
+    assert system.orbiting_objects["Earth"] is earth
+    report = catalog.add_catalog(system, str(path), on_conflict="replace")
+    assert report["replaced"] == ["Earth", "Mars", "Probe"]
+    assert system.orbiting_objects["Earth"] is not earth
+
+def test_add_orbiting_objects_validation():
+    """
+    Check that bulk adds apply the type and distance rules to all objects before adding any
+    """
+    mars_system = PlanetaryOrbitalSystem("Mars system", Planet("Mars", 3390, 6.4191e23, 0, 0, 0, 1.5, "rocky"))
+    phobos = Satellite("Phobos", 11, 0, 0, 0, 0, 0.00004011, 100, "asteroid")
+    earth = Planet("Earth", 6371, 5.972e24, 0, 0, 0, 1.0, "rocky")
+    with pytest.raises(TypeError, match=r"The orbiting object must be a Satellite. \(Earth\)"):
+        mars_system.add_orbiting_objects([phobos, earth])
+    assert mars_system.orbiting_objects == {}
+    low = Satellite("Low", 11, 0, 0, 0, 0, 0.00000001, 100, "asteroid")
+    with pytest.raises(ValueError, match=r"greater than the radius of the central object. \(Low\)"):
+        mars_system.add_orbiting_objects([phobos, low])
+    satellite_system = OrbitalSystem("Test system", phobos)
+    with pytest.raises(TypeError, match=r"A planet cannot orbit a satellite. \(Earth\)"):
+        satellite_system.add_orbiting_objects([earth])
+    with pytest.raises(ValueError, match="Unknown conflict policy ask."):
+        mars_system.add_orbiting_objects([phobos], on_conflict="ask")
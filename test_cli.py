@@ -0,0 +1,51 @@
+# Unit tests for functions in cli.py
+import json
+import subprocess
+import sys
+
+import numpy as np
+
+import cli
+import trajectory_store
+
+def test_period_without_heavy_imports():
+    """
+    Check that period queries print elements of nested objects without importing NumPy, pandas or matplotlib
+    """
+    script = ("import sys, cli; status = cli.main(['period', 'Phobos', 'Mars']); "
+              "print(sorted(name for name in ('numpy', 'pandas', 'matplotlib') if name in sys.modules)); sys.exit(status)")
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    assert result.returncode == 0
+    lines = result.stdout.splitlines()
+    assert lines[0].startswith("Phobos: period 0.000447") and lines[1].startswith("Mars: period 1.838")
+    assert lines[2] == "[]"
+
+def test_errors_and_catalog(tmp_path, capsys):
+    """
+    Check that unknown objects fail with status 1, and catalogs are built around their first star
+    """
+    assert cli.main(["period", "Pluto"]) == 1
+    assert "Object Pluto not found in system." in capsys.readouterr().err
+    path = tmp_path/"catalog.json"
+    path.write_text(json.dumps([{"type": "star", "name": "Sun", "radius": 695700, "mass": 1.989e30, "luminosity": 3.828e26},
+                                {"type": "planet", "name": "Earth", "radius": 6371, "mass": 5.972e24, "distance_from_center": 1.0}]))
+    assert cli.main(["--catalog", str(path), "period"]) == 0
+    assert capsys.readouterr().out.startswith("Earth: period 1.00")
+
+def test_simulate_export_plot(tmp_path, capsys):
+    """
+    Check that simulate, export and plot write their outputs
+    """
+    assert cli.main(["simulate", "--duration", "0.5", "--report", str(tmp_path/"report.json")]) == 0
+    assert "Simulated 4 objects over 26 steps" in capsys.readouterr().out
+    assert json.loads((tmp_path/"report.json").read_text())["counters"]["body_steps"] == 4*26
+    assert cli.main(["export", str(tmp_path/"store"), "--format", "store", "--duration", "0.5", "--engine", "kepler",
+                     "--dtype", "float32", "--drop-constant"]) == 0
+    store = trajectory_store.TrajectoryStore(str(tmp_path/"store"))
+    assert store.positions.dtype == np.float32 and store.axes == [0, 1]
+    assert store.names == ["Mars", "Phobos", "Deimos", "Mercury"] and len(store.time) == 26
+    assert np.abs(store.object_positions("Mars")[0]).max() > 0
+    assert cli.main(["export", str(tmp_path/"run.csv"), "--duration", "0.5"]) == 0
+    assert len((tmp_path/"run.csv").read_text().splitlines()) == 1 + 4*26
+    assert cli.main(["plot", "--y-axis", "Y_pos", "--output", str(tmp_path/"system.png")]) == 0
+    assert (tmp_path/"system.png").stat().st_size > 0
@@ -0,0 +1,70 @@
+# Unit tests for functions in close_approaches.py
+import numpy as np
+
+import close_approaches
+import simulate_orbits
+from test_simulate_orbits import make_solar_system
+
+def brute_force_pairs(positions, time, threshold):
+    """
+    Returns the set of name pairs coming within threshold at some step, by checking every pair.
+    """
+    names = list(positions)
+    pairs = set()
+    for i, first in enumerate(names):
+        for second in names[i + 1:]:
+            start = positions[second][:-1] - positions[first][:-1]
+            motion = positions[second][1:] - positions[first][1:] - start
+            speed_squared = (motion**2).sum(axis=1)
+            fraction = np.clip(-(start*motion).sum(axis=1)/np.where(speed_squared == 0, 1, speed_squared), 0, 1)
+            if (np.linalg.norm(start + fraction[:, None]*motion, axis=1) <= threshold).any():
+                pairs.add((first, second))
+    return pairs
+
+def test_matches_brute_force():
+    """
+    Check that pruning finds exactly the pairs a full pairwise check finds
+    """
+    rng = np.random.default_rng(3)
+    time = np.linspace(0, 1, 15)
+    positions = {f"Body {i}": np.cumsum(rng.normal(0, 0.02, (15, 3)), axis=0) + rng.uniform(-0.5, 0.5, 3) for i in range(150)}
+    approaches = close_approaches.find_close_approaches(positions, time, 0.02)
+    assert len(approaches) > 0
+    assert set(zip(approaches["Object_A"], approaches["Object_B"])) == brute_force_pairs(positions, time, 0.02)
+    assert (approaches["Distance"] <= 0.02).all()
+
+def test_crossing_bodies_one_approach():
+    """
+    Check the time and distance of two bodies passing each other, reported once over several steps
+    """
+    time = np.linspace(0, 1, 11)
+    positions = {"A": np.c_[2*time - 1, np.zeros(11), np.zeros(11)],
+                 "B": np.c_[1 - 2*time, np.full(11, 0.01), np.zeros(11)]}
+    approaches = close_approaches.find_close_approaches(positions, time, 0.5)
+    assert len(approaches) == 1
+    assert np.isclose(approaches["Time"][0], 0.5) and np.isclose(approaches["Distance"][0], 0.01)
+    assert close_approaches.find_close_approaches(positions, time, 0.005).empty
+
+def test_system_radii_and_center():
+    """
+    Check that coincident moons collide, and the central object (with its radius) is included
+    """
+    system = make_solar_system()
+    positions, time = simulate_orbits.run_simulation(system, sim_duration=0.2, engine="kepler") # no start-position first row
+    approaches = close_approaches.find_close_approaches(positions, time, 0.0, system=system)
+    pairs = set(zip(approaches["Object_A"], approaches["Object_B"]))
+    assert ("Phobos", "Deimos") in pairs and ("Mercury", "Sun") not in pairs and ("Mars", "Sun") not in pairs
+    sun_radius = {"Sun": 0.35} # a star larger than Mercury's orbit
+    approaches = close_approaches.find_close_approaches(positions, time, 0.0, system=system, radii=sun_radius)
+    assert ("Mercury", "Sun") in set(zip(approaches["Object_A"], approaches["Object_B"]))
+
+def test_start_step_skips_start_positions():
+    """
+    Check that the vectorized engine's start-position row (every body at the origin) is not reported with start_step=1
+    """
+    system = make_solar_system()
+    positions, time = simulate_orbits.run_simulation(system, sim_duration=0.2)
+    assert (close_approaches.find_close_approaches(positions, time, 0.0)["Time"] == 0).any() # everything starts at the origin
+    approaches = close_approaches.find_close_approaches(positions, time, 0.0, start_step=1)
+    assert (approaches["Time"] >= time[1]).all()
+    assert not {"Mercury", "Mars"} <= set(approaches["Object_A"]) | set(approaches["Object_B"]) # planets never meet
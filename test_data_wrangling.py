@@ -1,3 +1,124 @@
 # Unit test for functions in data_wrangling.py
+import numpy as np
+import pandas as pd
 import pytest
 
+import data_wrangling
+
+def row_by_row_dataframe(dictionary, time):
+    """
+    Builds the simulation dataframe one row at a time (the original implementation), as a reference.
+    """
+    data_list = []
+    for object_name, pos_array in dictionary.items():
+        for i in range(len(time)):
+            data_list.append([time[i], object_name, pos_array[i, 0], pos_array[i, 1], pos_array[i, 2]])
+    return pd.DataFrame(data_list, columns=["Time", "Object", "X_pos", "Y_pos", "Z_pos"])
+
+def make_positions():
+    """
+    Returns a small positions dictionary and time vector.
+    """
+    rng = np.random.default_rng(0)
+    time = np.linspace(0, 2, 7)
+    positions = {"Mars": rng.normal(size=(7, 3)), "Phobos": rng.normal(size=(7, 3)), "Mercury": rng.normal(size=(7, 3))}
+    return positions, time
+
+def test_convert_simulation_to_dataframe_matches_rows():
+    """
+    Check that the columnar conversion gives the same frame as building it row by row
+    """
+    positions, time = make_positions()
+    df = data_wrangling.convert_simulation_to_dataframe(positions, time)
+    expected = row_by_row_dataframe(positions, time)
+    pd.testing.assert_frame_equal(df.astype({"Object": object}), expected, check_dtype=False)
+    assert list(df.columns) == ["Time", "Object", "X_pos", "Y_pos", "Z_pos"]
+
+def test_convert_simulation_to_dataframe_categorical():
+    """
+    Check that Object is categorical with categories in simulation order
+    """
+    positions, time = make_positions()
+    df = data_wrangling.convert_simulation_to_dataframe(positions, time)
+    assert isinstance(df["Object"].dtype, pd.CategoricalDtype)
+    assert list(df["Object"].cat.categories) == ["Mars", "Phobos", "Mercury"]
+    assert len(df[df["Object"] == "Phobos"]) == 7
+
+def test_convert_simulation_to_dataframe_empty():
+    """
+    Check that an empty simulation gives an empty frame with the usual columns
+    """
+    df = data_wrangling.convert_simulation_to_dataframe({}, np.linspace(0, 1, 5))
+    assert list(df.columns) == ["Time", "Object", "X_pos", "Y_pos", "Z_pos"]
+    assert len(df) == 0
+
+def make_chunks():
+    """
+    Returns the chunks of a short solar system run.
+    """
+    from test_simulate_orbits import make_solar_system
+    import simulate_orbits
+    return list(simulate_orbits.iter_simulation(make_solar_system(), sim_duration=1, chunk_steps=20))
+
+@pytest.mark.parametrize("file_name", ["run", "run.parquet"])
+def test_write_read_simulation_chunks(tmp_path, file_name):
+    """
+    Check that chunks written to .npy shards or Parquet read back unchanged
+    """
+    if file_name.endswith(".parquet"):
+        pytest.importorskip("pyarrow")
+    chunks = make_chunks()
+    path = str(tmp_path/file_name)
+    assert data_wrangling.write_simulation_chunks(iter(chunks), path) == sum(len(time) for _, time in chunks)
+    read_chunks = list(data_wrangling.read_simulation_chunks(path))
+    assert len(read_chunks) == len(chunks)
+    for (positions, time), (read_positions, read_time) in zip(chunks, read_chunks):
+        assert np.array_equal(time, read_time)
+        assert list(read_positions.keys()) == list(positions.keys())
+        for name in positions:
+            assert np.array_equal(positions[name], read_positions[name])
+
+@pytest.mark.parametrize("file_name", ["run", "run.parquet"])
+def test_write_read_empty_system_chunks(tmp_path, file_name):
+    """
+    Check that chunks of a system with no objects read back as empty positions with their times
+    """
+    if file_name.endswith(".parquet"):
+        pytest.importorskip("pyarrow")
+    chunks = [({}, np.arange(3.0)), ({}, np.arange(3.0, 5.0))]
+    path = str(tmp_path/file_name)
+    assert data_wrangling.write_simulation_chunks(chunks, path) == 5
+    read_chunks = list(data_wrangling.read_simulation_chunks(path))
+    assert [positions for positions, _ in read_chunks] == [{}, {}]
+    assert [list(time) for _, time in read_chunks] == [[0, 1, 2], [3, 4]]
+    assert len(data_wrangling.read_simulation_dataframe(path)) == 0
+
+@pytest.mark.parametrize("file_name", ["run", "run.parquet"])
+def test_write_read_no_chunks(tmp_path, file_name):
+    """
+    Check that an iterator without any chunk still writes a file that reads back as no chunks
+    """
+    if file_name.endswith(".parquet"):
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path/file_name)
+    assert data_wrangling.write_simulation_chunks(iter([]), path) == 0
+    assert list(data_wrangling.read_simulation_chunks(path)) == []
+    assert len(data_wrangling.read_simulation_dataframe(path)) == 0
+
+def test_read_simulation_dataframe(tmp_path):
+    """
+    Check that a chunked file reads into the same rows as converting each chunk
+    """
+    chunks = make_chunks()
+    data_wrangling.write_simulation_chunks(chunks, str(tmp_path/"run"))
+    df = data_wrangling.read_simulation_dataframe(str(tmp_path/"run"))
+    expected = pd.concat([data_wrangling.convert_simulation_to_dataframe(p, t) for p, t in chunks], ignore_index=True)
+    pd.testing.assert_frame_equal(df, expected)
+    assert isinstance(df["Object"].dtype, pd.CategoricalDtype)
+
+def test_unknown_simulation_file_format(tmp_path):
+    """
+    Check that an unknown file format raises a ValueError
+    """
+    with pytest.raises(ValueError, match="Unknown simulation file format csv."):
+        data_wrangling.write_simulation_chunks([], str(tmp_path/"run"), "csv")
@@ -0,0 +1,63 @@
+# Unit tests for functions in instrumentation.py and run_simulation(profile=...)
+import json
+import numpy as np
+
+import data_wrangling
+import instrumentation
+import simulate_orbits
+from test_nbody import make_sun_earth
+from test_simulate_orbits import make_solar_system
+
+def test_profiled_run_report():
+    """
+    Check that a profiled run returns the same positions plus a report with stages, throughput and memory
+    """
+    positions, time = simulate_orbits.run_simulation(make_solar_system())
+    assert simulate_orbits.run_simulation(make_solar_system(), profile=True)[2].peak_bytes is None # memory is opt-in
+    profiled_positions, profiled_time, report = simulate_orbits.run_simulation(make_solar_system(),
+                                                                               profile=instrumentation.RunReport(track_memory=True))
+    assert np.array_equal(profiled_time, time)
+    assert all(np.array_equal(profiled_positions[name], positions[name]) for name in positions)
+    assert set(report.stages) == {"establish", "propagate"}
+    assert report.counters["body_steps"] == len(positions)*len(time)
+    assert report.counters["body_steps_per_second"] > 0
+    assert report.peak_bytes > 0 and report.total_seconds >= report.stages["propagate"]["seconds"]
+    assert report.info["engine"] == "vectorized"
+
+def test_report_follows_later_stages(tmp_path):
+    """
+    Check that one report also times DataFrame conversion, folds in adaptive stats and exports to JSON
+    """
+    stats = {}
+    positions, time, report = simulate_orbits.run_simulation(make_sun_earth(), sim_duration=0.5, engine="adaptive", stats=stats, profile=True)
+    with report.recording():
+        data_wrangling.convert_simulation_to_dataframe(positions, time)
+    assert report.stages["dataframe"]["calls"] == 1
+    assert report.counters["accepted_steps"] == stats["accepted_steps"] > 0
+    exported = json.loads(report.to_json(str(tmp_path/"report.json")))
+    assert exported == json.loads((tmp_path/"report.json").read_text())
+    assert exported["stages"]["propagate"]["calls"] == 1
+
+def test_disabled_stages_do_nothing():
+    """
+    Check that stages outside a recording report are not timed anywhere
+    """
+    with instrumentation.stage("propagate"):
+        pass
+    report = instrumentation.RunReport(track_memory=False)
+    with report.recording():
+        with instrumentation.stage("propagate"):
+            pass
+    with instrumentation.stage("propagate"):
+        pass
+    assert report.stages["propagate"]["calls"] == 1 and report.peak_bytes is None
+
+def test_run_without_steps_exports_standard_json():
+    """
+    Check that an adaptive run without any step exports min_step as null rather than Infinity
+    """
+    _, _, report = simulate_orbits.run_simulation(make_sun_earth(), sim_duration=0.01, timestep=0.01, engine="adaptive",
+                                                  stats={}, profile=True)
+    assert report.counters["accepted_steps"] == 0
+    exported = json.loads(report.to_json())
+    assert exported["counters"]["min_step"] is None and exported["counters"]["max_step"] == 0
@@ -0,0 +1,106 @@
+# Unit tests for functions in jit_kernels.py
+import numpy as np
+import pytest
+
+from test_nbody import make_sun_earth
+from benchmarks import build_registry
+import batch
+import jit_kernels
+import nbody
+import simulate_orbits
+
+def python_kernel(kernel):
+    """
+    Returns the Python code of a kernel (the compiled kernel keeps it as py_func), so the kernels are checked
+    with or without Numba.
+    """
+    return getattr(kernel, "py_func", kernel)
+
+def random_bodies(num_bodies, seed = 1):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-1, 1, (num_bodies, 3)), rng.uniform(-1, 1, (num_bodies, 3)), rng.uniform(1e20, 1e25, num_bodies)
+
+def test_direct_accelerations_kernel_matches_numpy():
+    """
+    Check the force kernel against nbody.direct_accelerations, with and without softening
+    """
+    positions, _, masses = random_bodies(30)
+    positions[3] = positions[4] # two bodies at the same point feel no force from each other
+    kernel = python_kernel(jit_kernels._direct_accelerations_kernel)
+    for softening in (0.0, 0.01):
+        expected = nbody.direct_accelerations(positions, masses, softening)
+        assert np.allclose(kernel(positions, masses, softening**2, nbody.GRAVITATIONAL_CONSTANT_YEARS), expected, rtol=1e-12, atol=0)
+        assert np.allclose(jit_kernels.direct_accelerations(positions, masses, softening), expected, rtol=1e-12, atol=0)
+
+def test_leapfrog_kernel_matches_numpy():
+    """
+    Check the compiled time-stepping loop follows nbody.leapfrog
+    """
+    positions, velocities, masses = random_bodies(5)
+    time = np.linspace(0, 0.1, 20)
+    expected_positions, expected_velocities = nbody.leapfrog(positions, velocities, masses, time, softening=0.1)
+    kernel = python_kernel(jit_kernels._leapfrog_kernel)
+    for result in (kernel(positions, velocities, masses, time, 0.1**2, nbody.GRAVITATIONAL_CONSTANT_YEARS),
+                   jit_kernels.leapfrog(positions, velocities, masses, time, softening=0.1)):
+        assert np.allclose(result[0], expected_positions, rtol=1e-12, atol=1e-15)
+        assert np.allclose(result[1], expected_velocities, rtol=1e-12, atol=1e-15)
+    assert np.array_equal(positions, random_bodies(5)[0]) # start positions are not changed
+
+def test_parent_offsets_kernel_identical():
+    """
+    Check the offset kernel gives the same bits as adding parents level by level with NumPy
+    """
+    registry = build_registry(40, 3)
+    rng = np.random.default_rng(2)
+    local = rng.uniform(-1, 1, (40, 6, 3))
+    expected = local.copy()
+    for level in registry.levels[1:]:
+        expected[level] += expected[registry.parent_index[level]]
+    order = np.concatenate(registry.levels[1:])
+    result = local.copy()
+    python_kernel(jit_kernels._parent_offsets_kernel)(result, registry.parent_index, order, 3)
+    assert np.array_equal(result, expected)
+    result = local.copy()
+    jit_kernels.add_parent_offsets(result, registry.parent_index, registry.levels)
+    assert np.array_equal(result, expected)
+    flat = local.copy()
+    jit_kernels.add_parent_offsets(flat, registry.parent_index, registry.levels, num_axes=2)
+    assert np.array_equal(flat[:, :, :2], expected[:, :, :2])
+    assert np.array_equal(flat[:, :, 2], local[:, :, 2]) # z is left alone
+
+def test_run_simulation_jit_force_solver():
+    """
+    Check the "jit" force solver reproduces the direct NumPy forces in both N-body engines
+    """
+    system = make_sun_earth()
+    for engine in ("nbody", "adaptive"):
+        expected, _ = simulate_orbits.run_simulation(system, 1, 0.01, engine=engine)
+        positions, _ = simulate_orbits.run_simulation(system, 1, 0.01, engine=engine, force_solver="jit")
+        for name in expected:
+            assert np.allclose(positions[name], expected[name], rtol=0, atol=1e-12)
+
+@pytest.mark.skipif(not jit_kernels.JIT_AVAILABLE, reason="Numba is not installed")
+def test_compiled_kernels_and_process_pools():
+    """
+    Check the compiled kernels against NumPy, then that a process pool still runs (and exits) after them
+    """
+    positions, velocities, masses = random_bodies(30)
+    expected = nbody.direct_accelerations(positions, masses, 0.01)
+    assert np.allclose(jit_kernels._direct_accelerations_kernel(positions, masses, 0.01**2, nbody.GRAVITATIONAL_CONSTANT_YEARS),
+                       expected, rtol=1e-12, atol=0)
+    time = np.linspace(0, 0.1, 20)
+    expected_positions, _ = nbody.leapfrog(positions, velocities, masses, time, softening=0.1)
+    assert np.allclose(jit_kernels.leapfrog(positions, velocities, masses, time, softening=0.1)[0], expected_positions,
+                       rtol=1e-12, atol=1e-15)
+    registry = build_registry(40, 3)
+    local = np.random.default_rng(2).uniform(-1, 1, (40, 6, 3))
+    numpy_offsets, compiled_offsets = local.copy(), local.copy()
+    for level in registry.levels[1:]:
+        numpy_offsets[level] += numpy_offsets[registry.parent_index[level]]
+    jit_kernels.add_parent_offsets(compiled_offsets, registry.parent_index, registry.levels)
+    assert np.array_equal(compiled_offsets, numpy_offsets)
+
+    system = make_sun_earth()
+    expected, _ = simulate_orbits.run_simulation(system, 1, 0.01, engine="nbody", force_solver="jit")
+    results = batch.run_batch([system, system], sim_duration=1, timestep=0.01, engine="nbody", processes=2, force_solver="jit")
+    assert all(np.array_equal(result.positions_dictionary()["Earth"], expected["Earth"]) for result in results.values())
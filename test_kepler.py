@@ -0,0 +1,84 @@
+# Unit tests for functions in kepler.py and the "kepler" engine
+import numpy as np
+import pytest
+
+from orbital_system_sim import Planet, Star, StellarOrbitalSystem
+import kepler
+import simulate_orbits
+from test_simulate_orbits import make_solar_system
+
+def make_eccentric_system():
+    """
+    Builds a Sun / comet-like planet system on an inclined, eccentric orbit.
+    """
+    sun = Star("Sun", 695700, 1.989e30, 0, 0, 0, 3.828e26, "O-type")
+    comet = Planet("Comet", 10, 1e13, 0, 0, 0, 2.0, "icy", eccentricity=0.6, inclination=0.3,
+                   longitude_of_ascending_node=1.0, argument_of_periapsis=0.5, mean_anomaly=0.2)
+    system = StellarOrbitalSystem("Solar System", sun)
+    system.add_orbiting_object(comet)
+    return system
+
+def test_solve_kepler_residual():
+    """
+    Check that Kepler's equation holds to near machine precision, up to very eccentric orbits
+    """
+    mean_anomaly = np.linspace(-20, 20, 20001)
+    for eccentricity in (0.0, 0.3, 0.9, 0.99, 0.999):
+        eccentric_anomaly = kepler.solve_kepler(mean_anomaly, eccentricity)
+        residual = eccentric_anomaly - eccentricity*np.sin(eccentric_anomaly) - mean_anomaly
+        assert np.abs(residual).max() < 1e-14
+
+def test_kepler_state_periapsis_and_speed():
+    """
+    Check the periapsis distance a(1 - e) and the vis-viva speed of an orbit starting at periapsis
+    """
+    a, e, n = 2.0, 0.5, 2*np.pi/2**1.5
+    positions, velocities = kepler.kepler_state([a], [e], [0.0], [0.0], [0.0], [0.0], [n], np.linspace(0, 2**1.5, 50))
+    assert np.allclose(positions[0, 0], [a*(1 - e), 0, 0])
+    mu = n**2*a**3
+    r = np.linalg.norm(positions[0], axis=1)
+    speed = np.linalg.norm(velocities[0], axis=1)
+    assert np.allclose(speed**2, mu*(2/r - 1/a))
+    assert np.allclose(positions[0, -1], positions[0, 0]) # one full period
+
+def test_circular_kepler_matches_vectorized():
+    """
+    Check that circular orbits give the vectorized engine's positions (after its start-position first row)
+    """
+    system = make_solar_system()
+    kepler_positions, kepler_time = simulate_orbits.run_simulation(system, engine="kepler")
+    vec_positions, vec_time = simulate_orbits.run_simulation(system, engine="vectorized")
+    assert np.array_equal(kepler_time, vec_time)
+    assert list(kepler_positions.keys()) == list(vec_positions.keys())
+    for name in vec_positions:
+        assert np.allclose(kepler_positions[name][1:], vec_positions[name][1:], rtol=0, atol=1e-12)
+
+def test_kepler_matches_adaptive_nbody():
+    """
+    Check an inclined eccentric orbit against the integrated two-body motion
+    """
+    system = make_eccentric_system()
+    kepler_positions, _ = simulate_orbits.run_simulation(system, sim_duration=3, timestep=0.05, engine="kepler")
+    nbody_positions, _ = simulate_orbits.run_simulation(system, sim_duration=3, timestep=0.05, engine="adaptive")
+    relative = nbody_positions["Comet"] - nbody_positions["Sun"]
+    assert np.abs(kepler_positions["Comet"][:, 2]).max() > 0.1 # leaves the x-y plane
+    assert np.allclose(kepler_positions["Comet"], relative, atol=1e-6)
+
+def test_iter_simulation_kepler_matches_run():
+    """
+    Check that chunked kepler runs concatenate to the full run
+    """
+    system = make_eccentric_system()
+    positions, time = simulate_orbits.run_simulation(system, engine="kepler")
+    chunks = list(simulate_orbits.iter_simulation(system, engine="kepler", chunk_steps=7))
+    assert np.array_equal(np.concatenate([chunk_time for _, chunk_time in chunks]), time)
+    assert np.allclose(np.concatenate([chunk["Comet"] for chunk, _ in chunks]), positions["Comet"], rtol=0, atol=1e-12)
+
+def test_invalid_eccentricity():
+    """
+    Check that open (or negative eccentricity) orbits are rejected
+    """
+    with pytest.raises(ValueError):
+        Planet("Comet", 10, 1e13, 0, 0, 0, 2.0, "icy", eccentricity=1.0)
+    with pytest.raises(ValueError):
+        Planet("Comet", 10, 1e13, 0, 0, 0, 2.0, "icy", eccentricity=-0.1)
@@ -0,0 +1,125 @@
+# Unit tests for functions in nbody.py
+import numpy as np
+import pytest
+
+from orbital_system_sim import Planet, Star, StellarOrbitalSystem
+import nbody
+import simulate_orbits
+
+def make_sun_earth():
+    """
+    Builds a Sun / Earth system.
+    """
+    sun = Star("Sun", 695700, 1.989e30, 0, 0, 0, 3.828e26, "O-type")
+    earth = Planet("Earth", 6371, 5.972e24, 0, 0, 0, 1.0, "rocky")
+    system = StellarOrbitalSystem("Solar System", sun)
+    system.add_orbiting_object(earth)
+    return system
+
+def test_direct_accelerations_inverse_square():
+    """
+    Check the acceleration of a body at 1 AU from a solar mass (about 4 pi^2 AU/year^2 with 365 day years)
+    """
+    positions = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+    masses = np.array([1.989e30, 0.0])
+    accelerations = nbody.direct_accelerations(positions, masses)
+    assert np.allclose(accelerations[1], [-4*np.pi**2, 0, 0], rtol=2e-3)
+    assert np.array_equal(accelerations[0], [0, 0, 0])
+
+def test_direct_accelerations_momentum():
+    """
+    Check that pairwise forces cancel (Newton's third law) for random bodies
+    """
+    rng = np.random.default_rng(1)
+    positions = rng.uniform(-1, 1, (50, 3))
+    masses = rng.uniform(1e20, 1e25, 50)
+    accelerations = nbody.direct_accelerations(positions, masses)
+    total_force = (masses[:, None]*accelerations).sum(axis=0)
+    assert np.allclose(total_force, 0, atol=1e-12*np.abs(masses[:, None]*accelerations).sum())
+
+def test_establish_nbody_initial_state():
+    """
+    Check that the N-body start state puts Earth on its circular orbit with the system at rest
+    """
+    system = make_sun_earth()
+    names, masses, positions, velocities = simulate_orbits.establish_nbody(system)
+    assert names == ["Sun", "Earth"]
+    assert np.array_equal(positions[1], [1.0, 0, 0])
+    momentum = (masses[:, None]*velocities).sum(axis=0)
+    assert np.all(np.abs(momentum) < 1e-12*masses[1]*abs(velocities[1, 1]))
+    assert np.isclose(velocities[1, 1] - velocities[0, 1], 2*np.pi/system.get_orbital_period("Earth"))
+
+def test_leapfrog_energy_conserved():
+    """
+    Check that the leapfrog integrator keeps the energy of a Sun / Earth orbit over ten years
+    """
+    system = make_sun_earth()
+    time = np.linspace(0, 10, 3651)
+    names, masses, positions, velocities = simulate_orbits.establish_nbody(system)
+    trajectory_positions, trajectory_velocities = nbody.leapfrog(positions, velocities, masses, time)
+    start_energy = nbody.total_energy(positions, velocities, masses)
+    end_energy = nbody.total_energy(trajectory_positions[:, -1], trajectory_velocities[:, -1], masses)
+    assert abs(end_energy - start_energy) < 1e-6*abs(start_energy)
+
+def test_run_simulation_nbody_follows_circular_orbit():
+    """
+    Check that the N-body engine keeps Earth on (close to) the circular orbit of the closed-form engine
+    """
+    system = make_sun_earth()
+    nbody_positions, time = simulate_orbits.run_simulation(system, sim_duration=1, timestep=0.001, engine="nbody")
+    circular_positions, time = simulate_orbits.run_simulation(system, sim_duration=1, timestep=0.001)
+    assert list(nbody_positions.keys()) == ["Sun", "Earth"]
+    earth_from_sun = nbody_positions["Earth"] - nbody_positions["Sun"]
+    assert np.allclose(earth_from_sun[1:], circular_positions["Earth"][1:], atol=1e-4)
+
+def test_direct_accelerations_coincident_bodies():
+    """
+    Check that two bodies at the same point (ex: two moons started on one orbit) do not produce NaNs
+    """
+    positions = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+    masses = np.array([1.989e30, 0.0, 0.0])
+    accelerations = nbody.direct_accelerations(positions, masses)
+    assert np.all(np.isfinite(accelerations))
+    assert np.array_equal(accelerations[1], accelerations[2])
+
+def test_dormand_prince_energy_and_stats():
+    """
+    Check that the adaptive integrator keeps a Sun / Earth orbit to tolerance with few steps and reports them
+    """
+    system = make_sun_earth()
+    time = np.linspace(0, 1, 5)
+    names, masses, positions, velocities = simulate_orbits.establish_nbody(system)
+    trajectory_positions, trajectory_velocities, stats = nbody.dormand_prince(positions, velocities, masses, time, rtol=1e-10)
+    start_energy = nbody.total_energy(positions, velocities, masses)
+    end_energy = nbody.total_energy(trajectory_positions[:, -1], trajectory_velocities[:, -1], masses)
+    assert abs(end_energy - start_energy) < 1e-8*abs(start_energy)
+    assert 4 <= stats["accepted_steps"] < 500
+    assert stats["force_evaluations"] >= 6*(stats["accepted_steps"] + stats["rejected_steps"])
+
+def test_adaptive_engine_resolves_phobos():
+    """
+    Check that the adaptive engine keeps Phobos on its orbit around Mars where fixed leapfrog steps lose it
+    """
+    from test_simulate_orbits import make_solar_system
+    system = make_solar_system()
+    stats = {}
+    positions, time = simulate_orbits.run_simulation(system, sim_duration=0.01, timestep=0.005, engine="adaptive", rtol=1e-8, stats=stats)
+    distance = np.linalg.norm(positions["Phobos"] - positions["Mars"], axis=1)
+    assert np.allclose(distance, 0.00004011, rtol=1e-3)
+    assert stats["accepted_steps"] > 100
+    assert stats["max_step"] < 0.005
+    fixed_positions, time = simulate_orbits.run_simulation(system, sim_duration=0.01, timestep=0.005, engine="nbody")
+    fixed_distance = np.linalg.norm(fixed_positions["Phobos"] - fixed_positions["Mars"], axis=1)
+    assert fixed_distance[-1] > 10*0.00004011
+
+def test_stats_only_for_adaptive():
+    """
+    Check that asking the leapfrog engine for adaptive step stats is a clear error, whatever the force solver
+    """
+    names, masses, positions, velocities = simulate_orbits.establish_nbody(make_sun_earth())
+    for force_solver in ("direct", "jit"):
+        with pytest.raises(TypeError, match="The nbody engine does not take stats."):
+            simulate_orbits.run_simulation(make_sun_earth(), 0.1, 0.01, engine="nbody", force_solver=force_solver, stats={})
+        with pytest.raises(ValueError, match="Only the adaptive engine fills stats."):
+            simulate_orbits.integrate_nbody("nbody", positions, velocities, masses, np.linspace(0, 0.1, 10),
+                                            {"force_solver": force_solver, "stats": {}})
@@ -1,6 +1,7 @@
 from orbital_system_sim import SpaceObject, Planet, Satellite, Star, OrbitalSystem, PlanetaryOrbitalSystem, StellarOrbitalSystem
 import pytest
 from unittest.mock import patch
+import math
 
 def test_orb_sys_oneplanet_oneplanet():
     """
@@ -332,4 +333,48 @@ def test_add_same_object():
             result = system.add_orbiting_object(orbiting_object_2)
             mocked_print.assert_called_with("Original replaced")
             mock_input.assert_called_with("You already have an object with the same name in this system. Enter 1 to replace and 2 to cancel.")
-    assert system.orbiting_objects[orbiting_object_2.name] == orbiting_object_2
\ No newline at end of file
+    assert system.orbiting_objects[orbiting_object_2.name] == orbiting_object_2
+
+def test_orbital_elements_cache_hits():
+    """
+    Check that repeated period lookups are served from the element cache and give the same value
+    """
+    central_object = Star("Sun", 695700, 1.989e30, 0, 0, 0, 3.828e26, "O-type")
+    orbiting_object = Planet("Earth", 6371, 5.972e24, 0, 0, 0, 1.0, "rocky")
+    system = OrbitalSystem("Test system", central_object)
+    system.add_orbiting_object(orbiting_object)
+    assert system.get_orbital_period("Earth") == 1.0005703560107866
+    assert system.get_orbital_period("Earth") == 1.0005703560107866
+    assert system.element_cache_info() == {"hits": 1, "misses": 1, "size": 1}
+    elements = system.get_orbital_elements("Earth")
+    assert elements["radius"] == 1.0
+    assert elements["angular_velocity"] == 2*math.pi/1.0005703560107866
+
+def test_orbital_elements_cache_invalidated():
+    """
+    Check that changing a body's distance or mass, or replacing it, recomputes its elements
+    """
+    central_object = Star("Sun", 695700, 1.989e30, 0, 0, 0, 3.828e26, "O-type")
+    orbiting_object = Planet("Earth", 6371, 5.972e24, 0, 0, 0, 1.0, "rocky")
+    system = OrbitalSystem("Test system", central_object)
+    system.add_orbiting_object(orbiting_object)
+    period = system.get_orbital_period("Earth")
+    orbiting_object.distance_from_center = 4.0
+    assert math.isclose(system.get_orbital_period("Earth"), 8*period, rel_tol=1e-12)
+    orbiting_object.mass = 0
+    assert system.get_orbital_period("Earth") != 8*period
+    system.add_orbiting_objects([Planet("Earth", 6371, 5.972e24, 0, 0, 0, 1.0, "rocky")], on_conflict="replace")
+    assert system.get_orbital_period("Earth") == period
+    assert system.element_cache_info()["hits"] == 0
+
+def test_orbital_elements_orbital_system():
+    """
+    Check that an orbital system's elements come from its central object
+    """
+    central_object = Star("Sun", 695700, 1.989e30, 0, 0, 0, 3.828e26, "O-type")
+    mars_system = PlanetaryOrbitalSystem("Mars system", Planet("Mars", 3390, 6.4191*10**23, 0, 0, 0, 1.5, "rocky"))
+    system = OrbitalSystem("Test system", central_object)
+    system.add_orbiting_object(mars_system)
+    assert system.get_orbital_elements("Mars system")["radius"] == 1.5
+    with pytest.raises(ValueError, match="Object Mars not found in system."):
+        system.get_orbital_elements("Mars")
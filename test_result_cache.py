@@ -0,0 +1,79 @@
+# Unit tests for functions in result_cache.py
+import numpy as np
+
+from orbital_system_sim import Star, StellarOrbitalSystem
+from body_registry import BodyRegistry
+import result_cache
+import simulate_orbits
+from test_simulate_orbits import make_solar_system
+
+def test_fingerprint_follows_contents():
+    """
+    Check that equal systems share a fingerprint, and any attribute or hierarchy change alters it
+    """
+    fingerprint = result_cache.system_fingerprint(make_solar_system())
+    assert result_cache.system_fingerprint(make_solar_system()) == fingerprint
+    changed = make_solar_system()
+    changed.orbiting_objects["Mercury"].planet_type = "gas"
+    assert result_cache.system_fingerprint(changed) != fingerprint
+    moved = make_solar_system()
+    del moved.orbiting_objects["Mars system"].orbiting_objects["Deimos"]
+    assert result_cache.system_fingerprint(moved) != fingerprint
+    registry = BodyRegistry.from_system(make_solar_system())
+    assert result_cache.system_fingerprint(registry) == result_cache.system_fingerprint(BodyRegistry.from_system(make_solar_system()))
+
+def test_cached_run_matches(tmp_path):
+    """
+    Check that a second run is a hit with the same results, and parameter changes miss
+    """
+    cache = result_cache.ResultCache(str(tmp_path))
+    positions, time = simulate_orbits.run_simulation(make_solar_system(), cache=cache)
+    cached_positions, cached_time = simulate_orbits.run_simulation(make_solar_system(), cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert np.array_equal(cached_time, time)
+    assert list(cached_positions) == list(positions)
+    for name in positions:
+        assert np.array_equal(cached_positions[name], positions[name])
+    simulate_orbits.run_simulation(make_solar_system(), sim_duration=1, cache=cache)
+    simulate_orbits.run_simulation(make_solar_system(), engine="kepler", cache=cache)
+    assert (cache.hits, cache.misses) == (1, 3)
+
+def test_lru_eviction_and_opt_out(tmp_path):
+    """
+    Check that the least recently used entry is evicted past max_bytes, and a disabled cache stores nothing
+    """
+    cache = result_cache.ResultCache(str(tmp_path))
+    time = np.linspace(0, 1, 100)
+    positions = {"A": np.zeros((100, 3))}
+    cache.put("first", positions, time)
+    entry_size = cache.size()
+    cache.put("second", positions, time)
+    assert cache.get("first") is not None # first is now the most recently used
+    cache.max_bytes = 2*entry_size
+    cache.put("third", positions, time)
+    assert cache.get("second") is None
+    assert cache.get("first") is not None and cache.get("third") is not None
+
+    disabled = result_cache.ResultCache(str(tmp_path/"off"), enabled=False)
+    simulate_orbits.run_simulation(make_solar_system(), cache=disabled)
+    assert disabled.get(disabled.key(make_solar_system(), 2, 0.00273973*7, "vectorized", {})) is None
+    assert disabled.size() == 0
+
+def test_empty_system_and_corrupt_entry(tmp_path):
+    """
+    Check that a system with no orbiting objects is a hit like any other, and a damaged entry is a miss that gets deleted
+    """
+    cache = result_cache.ResultCache(str(tmp_path))
+    empty = StellarOrbitalSystem("Empty", Star("Sun", 695700, 1.989e30, 0, 0, 0, 3.828e26, "O-type"))
+    positions, time = simulate_orbits.run_simulation(empty, cache=cache)
+    cached_positions, cached_time = simulate_orbits.run_simulation(empty, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert positions == {} and cached_positions == {}
+    assert np.array_equal(cached_time, time)
+
+    key = cache.key(make_solar_system(), 2, 0.00273973*7, "vectorized", {})
+    simulate_orbits.run_simulation(make_solar_system(), cache=cache)
+    with open(tmp_path/key/"positions.npy", "r+b") as file:
+        file.truncate(100)
+    assert cache.get(key) is None
+    assert not (tmp_path/key).exists()
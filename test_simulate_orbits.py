@@ -0,0 +1,195 @@
+# Unit tests for functions in simulate_orbits.py
+import numpy as np
+import pytest
+
+from orbital_system_sim import Planet, Satellite, Star, OrbitalSystem, PlanetaryOrbitalSystem, StellarOrbitalSystem
+from body_registry import BodyRegistry
+import simulate_orbits
+
+def make_solar_system():
+    """
+    Builds the Sun / Mercury / Mars system (with Phobos and Deimos) used in main.py.
+    """
+    mercury_planet = Planet("Mercury", 100, 100, 0, 0, 0, 0.3, "rocky")
+    mars_planet = Planet("Mars", 3390, 6.4191*10**23, 0, 0, 0, 1.5, "rocky")
+    phobos_moon = Satellite("Phobos", 11, 0, 0, 0, 0, 0.00004011, 100, "asteroid")
+    deimos_moon = Satellite("Deimos", 11, 0, 0, 0, 0, 0.00004011, 100, "asteroid")
+    mars_system = PlanetaryOrbitalSystem("Mars system", mars_planet)
+    mars_system.add_orbiting_object(phobos_moon)
+    mars_system.add_orbiting_object(deimos_moon)
+    sun = Star("Sun", 695700, 1.989e30, 0, 0, 0, 3.828e26, "O-type")
+    solar_system = StellarOrbitalSystem("Solar System", sun)
+    solar_system.add_orbiting_object(mars_system)
+    solar_system.add_orbiting_object(mercury_planet)
+    return solar_system
+
+def test_vectorized_matches_loop():
+    """
+    Check that the vectorized engine returns exactly the same positions and time as the loop engine
+    """
+    system = make_solar_system()
+    loop_positions, loop_time = simulate_orbits.run_simulation(system, engine="loop")
+    vec_positions, vec_time = simulate_orbits.run_simulation(system, engine="vectorized")
+    assert np.array_equal(loop_time, vec_time)
+    assert list(loop_positions.keys()) == list(vec_positions.keys())
+    for name in loop_positions:
+        assert np.array_equal(loop_positions[name], vec_positions[name])
+
+def test_vectorized_keeps_start_position():
+    """
+    Check that the first row of every object is its start position
+    """
+    system = make_solar_system()
+    system.orbiting_objects["Mercury"].start_x = 0.25
+    positions, time = simulate_orbits.run_simulation(system)
+    assert np.array_equal(positions["Mercury"][0], [0.25, 0, 0])
+
+def test_unknown_engine():
+    """
+    Check that an unknown engine name raises a ValueError
+    """
+    system = make_solar_system()
+    with pytest.raises(ValueError, match="Unknown simulation engine warp."):
+        simulate_orbits.run_simulation(system, engine="warp")
+
+def test_unknown_engine_options():
+    """
+    Check that options the engine does not take (ignored before, ex: a typo) raise a TypeError, chunked runs too
+    """
+    system = make_solar_system()
+    with pytest.raises(TypeError, match="The vectorized engine does not take force_solver, rtol."):
+        simulate_orbits.run_simulation(system, engine="vectorized", force_solver="bogus", rtol=1)
+    with pytest.raises(TypeError, match="The nbody engine does not take force_sovler."):
+        simulate_orbits.run_simulation(system, engine="nbody", force_sovler="barnes_hut")
+    with pytest.raises(TypeError):
+        next(simulate_orbits.iter_simulation(system, engine="kepler", softening=0.1))
+
+def make_nested_system():
+    """
+    Builds Sun -> Earth system -> Moon system -> lunar probe, three levels of systems deep.
+    """
+    sun = Star("Sun", 695700, 1.989e30, 0, 0, 0, 3.828e26, "O-type")
+    earth = Planet("Earth", 6371, 5.972e24, 0, 0, 0, 1.0, "rocky")
+    moon = Satellite("Moon", 1737, 7.342e22, 0, 0, 0, 0.00257, 4.5e9, "rock")
+    probe = Satellite("Probe", 0.001, 500, 0, 0, 0, 0.00002, 10, "aluminium")
+    moon_system = OrbitalSystem("Moon system", moon)
+    moon_system.add_orbiting_object(probe)
+    earth_system = OrbitalSystem("Earth system", earth)
+    earth_system.add_orbiting_object(moon_system)
+    solar_system = StellarOrbitalSystem("Solar System", sun)
+    solar_system.add_orbiting_object(earth_system)
+    return solar_system
+
+def test_establish_simulation_nested_systems():
+    """
+    Check that objects in systems inside systems inside systems get positions and the right parent
+    """
+    system = make_nested_system()
+    time = np.linspace(0, 1, 10)
+    positions, velocities, angular_velocities, orbit_radii, parent = simulate_orbits.establish_simulation(system, system.orbiting_objects, time)
+    assert list(positions.keys()) == ["Earth", "Moon", "Probe"]
+    assert parent == {"Earth": None, "Moon": "Earth", "Probe": "Moon"}
+    assert orbit_radii["Probe"] == 0.00002
+
+def test_hierarchy_depth_order():
+    """
+    Check that the compiled hierarchy orders parents before children whatever the dictionary order
+    """
+    hierarchy = simulate_orbits.SimulationHierarchy({"Probe": "Moon", "Moon": "Earth", "Mercury": None, "Earth": None})
+    assert list(hierarchy.parent_index) == [1, 3, -1, -1]
+    assert list(hierarchy.depth) == [2, 1, 0, 0]
+    assert hierarchy.ordered_names() == ["Mercury", "Earth", "Moon", "Probe"]
+
+def test_hierarchy_missing_parent():
+    """
+    Check that a parent missing from the simulation raises a ValueError
+    """
+    with pytest.raises(ValueError, match="Parent Venus of Moon not found in simulation."):
+        simulate_orbits.SimulationHierarchy({"Moon": "Venus"})
+
+def test_nested_system_positions():
+    """
+    Check that a three level deep object is offset by its whole parent chain, with both engines agreeing
+    """
+    system = make_nested_system()
+    loop_positions, time = simulate_orbits.run_simulation(system, engine="loop")
+    vec_positions, time = simulate_orbits.run_simulation(system, engine="vectorized")
+    for name in loop_positions:
+        assert np.array_equal(loop_positions[name], vec_positions[name])
+    moon_period = system.orbiting_objects["Earth system"].get_orbital_period("Moon system")
+    moon_angle = 2*np.pi/moon_period*time[5]
+    moon_offset = 0.00257*np.array([np.cos(moon_angle), np.sin(moon_angle)])
+    assert np.allclose(vec_positions["Moon"][5, :2], vec_positions["Earth"][5, :2] + moon_offset)
+    assert not np.allclose(vec_positions["Probe"][5, :2], vec_positions["Moon"][5, :2], atol=0)
+    assert np.all(np.abs(vec_positions["Probe"][1:, :2] - vec_positions["Moon"][1:, :2]) <= 0.00002 + 1e-12)
+
+def test_simulation_time_matches_linspace():
+    """
+    Check that pieces of the time vector match np.linspace exactly
+    """
+    for num_steps in (0, 1, 2, 104):
+        assert np.array_equal(simulate_orbits.simulation_time(2, num_steps), np.linspace(0, 2, num_steps))
+    assert np.array_equal(simulate_orbits.simulation_time(2, 104, 100, 200), np.linspace(0, 2, 104)[100:])
+
+@pytest.mark.parametrize("engine", ["vectorized", "nbody"])
+def test_iter_simulation_matches_run_simulation(engine):
+    """
+    Check that concatenated chunks give the same positions and time as one run
+    """
+    system = make_solar_system()
+    positions, time = simulate_orbits.run_simulation(system, sim_duration=1, engine=engine)
+    chunks = list(simulate_orbits.iter_simulation(system, sim_duration=1, engine=engine, chunk_steps=10))
+    assert len(chunks) == 6
+    assert all(len(chunk_time) <= 10 for _, chunk_time in chunks)
+    assert np.array_equal(np.concatenate([chunk_time for _, chunk_time in chunks]), time)
+    for name in positions:
+        assert np.array_equal(np.concatenate([chunk[name] for chunk, _ in chunks]), positions[name])
+
+def test_positions_at_matches_run():
+    """
+    Check that querying a few bodies gives the run's positions, for nested bodies too
+    """
+    system = make_solar_system()
+    positions, time = simulate_orbits.run_simulation(system)
+    queried = simulate_orbits.positions_at(system, ["Phobos", "Mercury"], time[1:])
+    assert list(queried.keys()) == ["Phobos", "Mercury"]
+    assert np.array_equal(queried["Phobos"], positions["Phobos"][1:])
+    assert np.array_equal(queried["Mercury"], positions["Mercury"][1:])
+    single = simulate_orbits.positions_at(system, "Mars", time[5])
+    assert np.array_equal(single["Mars"], positions["Mars"][5])
+
+def test_positions_at_cost_does_not_grow_with_system(monkeypatch):
+    """
+    Check that repeated queries only look up the requested body and its parents, whatever the number of other bodies
+    """
+    lookups = []
+    for extra in (0, 1000):
+        system = make_solar_system()
+        system.add_orbiting_objects([Planet(f"Planet {i}", 1, 1e20, 0, 0, 0, 2 + i/100, "rocky") for i in range(extra)])
+        expected = simulate_orbits.positions_at(BodyRegistry.from_system(system), "Phobos", [0.5, 1.0])
+        assert np.array_equal(simulate_orbits.positions_at(system, "Phobos", [0.5, 1.0])["Phobos"], expected["Phobos"])
+        mars_system = system.orbiting_objects["Mars system"]
+        before = sum(sum(info[key] for key in ("hits", "misses")) for info in (system.element_cache_info(), mars_system.element_cache_info()))
+        with monkeypatch.context() as patch:
+            patch.setattr(simulate_orbits, "walk_system", None) # no walk over the system
+            patch.setattr(simulate_orbits, "as_registry", None)
+            simulate_orbits.positions_at(system, "Phobos", [0.5, 1.0])
+        after = sum(sum(info[key] for key in ("hits", "misses")) for info in (system.element_cache_info(), mars_system.element_cache_info()))
+        lookups.append(after - before)
+    assert lookups == [2, 2] # Mars and Phobos
+    mars_system.add_orbiting_object(Satellite("Probe", 0.001, 500, 0, 0, 0, 0.0001, 10, "aluminium"))
+    assert "Probe" in simulate_orbits.positions_at(system, "Probe", 1.0) # new bodies are found
+
+def test_positions_at_kepler_and_errors():
+    """
+    Check kepler queries against the kepler engine, and unknown bodies or engines
+    """
+    system = make_nested_system()
+    positions, time = simulate_orbits.run_simulation(system, engine="kepler")
+    name = list(positions)[-1]
+    queried = simulate_orbits.positions_at(system, name, time, engine="kepler")
+    assert np.allclose(queried[name], positions[name], rtol=0, atol=1e-12)
+    with pytest.raises(ValueError):
+        simulate_orbits.positions_at(system, "Pluto", time)
+    with pytest.raises(ValueError):
+        simulate_orbits.positions_at(system, name, time, engine="loop")
@@ -0,0 +1,103 @@
+# Unit tests for functions in trajectory_store.py
+import numpy as np
+import pytest
+
+import simulate_orbits
+import trajectory_store
+from test_simulate_orbits import make_solar_system
+
+def test_save_and_open_trajectories(tmp_path):
+    """
+    Check that a saved run reads back unchanged through memory-mapped arrays
+    """
+    positions, time = simulate_orbits.run_simulation(make_solar_system())
+    store = trajectory_store.save_trajectories(str(tmp_path/"store"), positions, time)
+    reopened = trajectory_store.TrajectoryStore(str(tmp_path/"store"))
+    assert reopened.names == list(positions.keys())
+    assert isinstance(reopened.positions, np.memmap)
+    assert np.array_equal(reopened.time, time)
+    for name in positions:
+        assert np.array_equal(reopened.object_positions(name), positions[name])
+    assert "Phobos" in store and "Venus" not in store
+
+def test_window_is_zero_copy(tmp_path):
+    """
+    Check that a time window of one object is a view of the file holding only the requested times
+    """
+    system = make_solar_system()
+    positions, time = simulate_orbits.run_simulation(system, sim_duration=20)
+    store = trajectory_store.save_trajectories(str(tmp_path/"store"), positions, time)
+    window_positions, window_time = store.window("Mars", 10, 12)
+    inside = (time >= 10) & (time <= 12)
+    assert np.array_equal(window_time, time[inside])
+    assert np.array_equal(window_positions, positions["Mars"][inside])
+    assert np.shares_memory(window_positions, store.positions)
+
+def test_save_trajectory_chunks(tmp_path):
+    """
+    Check that a store written chunk by chunk matches one run, and a wrong step count is refused
+    """
+    system = make_solar_system()
+    positions, time = simulate_orbits.run_simulation(system)
+    chunks = simulate_orbits.iter_simulation(system, chunk_steps=25)
+    store = trajectory_store.save_trajectory_chunks(str(tmp_path/"store"), chunks, len(time))
+    assert np.array_equal(store.object_positions("Deimos"), positions["Deimos"])
+    with pytest.raises(ValueError, match="Chunks hold 104 timesteps, expected 200."):
+        trajectory_store.save_trajectory_chunks(str(tmp_path/"other"), simulate_orbits.iter_simulation(system), 200)
+
+def test_unknown_object(tmp_path):
+    """
+    Check that asking for an object missing from the store raises a ValueError
+    """
+    positions, time = simulate_orbits.run_simulation(make_solar_system())
+    store = trajectory_store.save_trajectories(str(tmp_path/"store"), positions, time)
+    with pytest.raises(ValueError, match="Object Venus not found in trajectory store."):
+        store.window("Venus", 0, 1)
+
+def test_compact_store_round_trip(tmp_path):
+    """
+    Check that float32, dropped z and parent-relative storage shrink the file and rebuild positions on read
+    """
+    system = make_solar_system()
+    positions, time = simulate_orbits.run_simulation(system, sim_duration=20)
+    full = trajectory_store.save_trajectories(str(tmp_path/"full"), positions, time)
+    registry = simulate_orbits.as_registry(system)
+    store = trajectory_store.save_trajectories(str(tmp_path/"compact"), positions, time, dtype=np.float32,
+                                               drop_constant=True, parents=registry.parent_names())
+    assert store.axes == [0, 1] and store.positions.dtype == np.float32
+    assert store.positions.nbytes*3 == full.positions.nbytes
+    reopened = trajectory_store.TrajectoryStore(str(tmp_path/"compact"))
+    for name in positions:
+        rebuilt = reopened.object_positions(name)
+        assert rebuilt.shape == positions[name].shape and np.all(rebuilt[:, 2] == 0)
+        assert np.allclose(rebuilt, positions[name], rtol=0, atol=1e-6)
+    # moons keep their orbit around Mars to float32 relative precision
+    phobos_orbit = reopened.object_positions("Phobos") - reopened.object_positions("Mars")
+    exact_orbit = positions["Phobos"] - positions["Mars"]
+    assert np.allclose(phobos_orbit[1:], exact_orbit[1:], rtol=0, atol=1e-11)
+    window_positions, window_time = reopened.window("Phobos", 10, 12)
+    assert np.allclose(window_positions, positions["Phobos"][(time >= 10) & (time <= 12)], rtol=0, atol=1e-6)
+
+def test_compact_chunks_and_dtype(tmp_path):
+    """
+    Check float32 chunks from iter_simulation, and that a dropped axis changing in a later chunk is refused without
+    touching the disk
+    """
+    system = make_solar_system()
+    chunks = simulate_orbits.iter_simulation(system, chunk_steps=20, dtype=np.float32)
+    first_positions, _ = next(iter(simulate_orbits.iter_simulation(system, chunk_steps=20, dtype=np.float32)))
+    assert first_positions["Mars"].dtype == np.float32
+    store = trajectory_store.save_trajectory_chunks(str(tmp_path/"store"), chunks, round(2/(0.00273973*7)), np.float32, True)
+    positions, time = simulate_orbits.run_simulation(system, dtype=np.float32)
+    assert positions["Mars"].dtype == np.float32
+    assert np.array_equal(store.object_positions("Mars"), positions["Mars"])
+    time = np.arange(4.0)
+    moving = {"A": np.c_[time, time, np.r_[0, 0, 1, 1]]}
+    chunks = [({"A": moving["A"][:2]}, time[:2]), ({"A": moving["A"][2:]}, time[2:])]
+    with pytest.raises(ValueError):
+        trajectory_store.save_trajectory_chunks(str(tmp_path/"moving"), chunks, 4, drop_constant=True)
+    assert not (tmp_path/"moving").exists() # nothing partial is left
+    with pytest.raises(ValueError):
+        trajectory_store.save_trajectory_chunks(str(tmp_path/"store"), chunks, 4, drop_constant=True)
+    assert np.array_equal(trajectory_store.TrajectoryStore(str(tmp_path/"store")).object_positions("Mars"), positions["Mars"])
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["store"] # no staging directory either
@@ -0,0 +1,78 @@
+# Unit tests for functions in visualization.py
+import numpy as np
+
+import data_wrangling
+import simulate_orbits
+import trajectory_store
+import visualization
+from test_simulate_orbits import make_solar_system
+
+def test_downsample_keeps_extremes():
+    """
+    Check that a long series is cut to a few points per bucket, keeping its ends and every bucket's min and max
+    """
+    x = np.linspace(0, 10, 1000001)
+    y = np.sin(x*50) + np.random.default_rng(0).normal(0, 0.1, len(x))
+    small_x, small_y = visualization.downsample(x, y, pixels=500)
+    assert len(small_x) <= 4*500
+    assert small_x[0] == x[0] and small_x[-1] == x[-1]
+    assert np.all(np.diff(small_x) > 0)
+    assert small_y.max() == y.max() and small_y.min() == y.min()
+    for bucket_x, bucket_y in zip(np.array_split(x, 500)[:5], np.array_split(y, 500)[:5]):
+        inside = (small_x >= bucket_x[0]) & (small_x <= bucket_x[-1])
+        assert small_y[inside].max() == bucket_y.max() and small_y[inside].min() == bucket_y.min()
+
+def test_downsample_short_and_unsorted():
+    """
+    Check that short lines are untouched, and orbits (unsorted x) keep their x extremes in drawing order
+    """
+    x = np.arange(10.0)
+    assert visualization.downsample(x, x, pixels=100)[0] is x
+    angle = np.linspace(0, 4*np.pi, 200000)
+    small_x, small_y = visualization.downsample(np.cos(angle), np.sin(angle), pixels=100)
+    assert len(small_x) <= 6*100
+    assert small_x.max() == 1.0 and small_x.min() == np.cos(angle).min()
+    assert np.allclose(small_x**2 + small_y**2, 1)
+
+def test_group_trajectories_matches_masks(tmp_path):
+    """
+    Check that grouping once gives each object's rows, as views, for dataframes and trajectory stores
+    """
+    positions, time = simulate_orbits.run_simulation(make_solar_system())
+    df = data_wrangling.convert_simulation_to_dataframe(positions, time)
+    grouped = visualization.group_trajectories(df)
+    assert list(grouped) == list(positions)
+    for name in positions:
+        assert np.array_equal(grouped[name]["Time"], df[df["Object"] == name]["Time"].to_numpy())
+        assert np.array_equal(grouped[name]["Y_pos"], positions[name][:, 1])
+    assert visualization.group_trajectories(grouped) is grouped
+    store = trajectory_store.save_trajectories(str(tmp_path/"store"), positions, time)
+    assert np.array_equal(visualization.group_trajectories(store)["Phobos"]["X_pos"], positions["Phobos"][:, 0])
+
+def test_plot_on_given_axes():
+    """
+    Check that plots draw on the given axes without showing, one line per object
+    """
+    from matplotlib.figure import Figure
+    positions, time = simulate_orbits.run_simulation(make_solar_system())
+    grouped = visualization.group_trajectories(data_wrangling.convert_simulation_to_dataframe(positions, time))
+    ax = Figure().add_subplot()
+    assert visualization.plot_system(make_solar_system(), grouped, ax=ax, show=False) is ax
+    assert len(ax.lines) == len(positions)
+    assert ax.get_xlabel() == "Time (years)" and ax.get_ylabel() == "X_pos Position (km)"
+
+def test_render_figures_in_parallel(tmp_path):
+    """
+    Check that plot jobs are written to files by one process and by a pool, in job order, keeping no figures here
+    """
+    positions, time = simulate_orbits.run_simulation(make_solar_system())
+    grouped = visualization.group_trajectories(data_wrangling.convert_simulation_to_dataframe(positions, time))
+    jobs = [{"path": str(tmp_path/f"{name}.png"), "plot": "object", "df": grouped, "object_name": name} for name in positions]
+    jobs.append({"path": str(tmp_path/"system.pdf"), "plot": "system", "system": make_solar_system(), "df": grouped, "y_axis": "Y_pos"})
+    for processes in (1, 2):
+        for path in tmp_path.iterdir():
+            path.unlink()
+        paths = visualization.render_figures(jobs, processes=processes)
+        assert paths == [job["path"] for job in jobs]
+        assert all((tmp_path/path).stat().st_size > 0 for path in paths)
+        assert visualization._worker_figures == {} # no figure is left behind in this process
@@ -0,0 +1,215 @@
+# On-disk trajectory store: one contiguous array per object, opened with memory mapping for zero-copy queries
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+STORE_VERSION = 2 # version 2 adds dtype, dropped constant axes and parent-relative positions
+READABLE_VERSIONS = (1, 2)
+STORE_FILES = ("time.npy", "positions.npy", "constants.npy", "metadata.json") # metadata last, it marks a complete store
+
+
+class TrajectoryStore:
+    """
+    Read-only view of a trajectory store written by save_trajectories or save_trajectory_chunks.
+    Nothing is read from disk until a slice of it is used.
+
+    Attributes:
+        path: String representing the store directory.
+        names: List of object names, in simulation order.
+        time: Memory-mapped numpy array (vector) holding the time of every step in years.
+        positions: Memory-mapped numpy array (objects x steps x stored axes) holding the stored positions in AU,
+            x, y, z unless axes were dropped or positions are relative (then use object_positions).
+        axes: List of the stored axes (0 for x, 1 for y, 2 for z).
+        constants: Numpy array (objects x 3) holding the value of each dropped axis.
+        parents: List holding the index of the object each object's positions are relative to (-1 for absolute).
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "metadata.json")) as file:
+            metadata = json.load(file)
+        if metadata.get("version") not in READABLE_VERSIONS:
+            raise ValueError(f"Unsupported trajectory store version {metadata.get('version')}.")
+        self.names = metadata["names"]
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self.time = np.load(os.path.join(path, "time.npy"), mmap_mode="r")
+        self.positions = np.load(os.path.join(path, "positions.npy"), mmap_mode="r")
+        self.axes = metadata.get("axes", [0, 1, 2])
+        self.parents = metadata.get("parents", [-1]*len(self.names))
+        constants_path = os.path.join(path, "constants.npy")
+        self.constants = np.load(constants_path) if os.path.exists(constants_path) else np.zeros((len(self.names), 3))
+        # full absolute x, y, z are stored, so reads are views of the file
+        self._plain = self.axes == [0, 1, 2] and all(parent == -1 for parent in self.parents)
+
+    def __repr__(self):
+        return f"Trajectory store: {len(self.names)} objects, {len(self.time)} steps, at {self.path}"
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def _read(self, index, rows):
+        """Rebuilds absolute x, y, z positions of one object over a slice of steps (float64)."""
+        stored = self.positions[index, rows]
+        positions = np.empty((len(stored), 3))
+        positions[:] = self.constants[index]
+        positions[:, self.axes] = stored
+        if self.parents[index] != -1:
+            positions += self._read(self.parents[index], rows)
+        return positions
+
+    def object_positions(self, name):
+        """
+        Returns the (steps x 3) positions of one object: a view of the file for plain stores, rebuilt (float64)
+        from the stored axes and parents otherwise.
+        """
+        if name not in self._index:
+            raise ValueError(f"Object {name} not found in trajectory store.")
+        if self._plain:
+            return self.positions[self._index[name]]
+        return self._read(self._index[name], slice(None))
+
+    def window(self, name, start_time, end_time):
+        """
+        Returns one object's positions between two times (inclusive), as views of the file for plain stores.
+
+        Args:
+            name: String representing the object name.
+            start_time: Float representing the start of the window in years.
+            end_time: Float representing the end of the window in years.
+
+        Returns:
+            positions: Numpy array (steps x 3) holding the object's positions in the window.
+            time: Numpy array (vector) holding the times of the window in years.
+        """
+        first = np.searchsorted(self.time, start_time, side="left")
+        last = np.searchsorted(self.time, end_time, side="right")
+        if name not in self._index:
+            raise ValueError(f"Object {name} not found in trajectory store.")
+        if self._plain:
+            return self.positions[self._index[name], first:last], self.time[first:last]
+        return self._read(self._index[name], slice(first, last)), self.time[first:last]
+
+    def positions_dictionary(self):
+        """Returns a dictionary of (steps x 3) positions keyed by name, like run_simulation (memory-mapped for plain stores)."""
+        return {name: self.object_positions(name) for name in self.names}
+
+
+def _write_metadata(path, names, num_steps, axes = (0, 1, 2), parents = None):
+    metadata = {"version": STORE_VERSION, "names": names, "num_steps": num_steps, "axes": list(axes),
+                "parents": parents if parents is not None else [-1]*len(names)}
+    with open(os.path.join(path, "metadata.json"), "w") as file:
+        json.dump(metadata, file)
+
+
+def save_trajectories(path, positions, time, dtype = float, drop_constant = False, parents = None):
+    """
+    Writes run_simulation output to a trajectory store.
+
+    Args:
+        path: String representing the store directory (created if needed).
+        positions: Dictionary holding x, y, z positions for each object.
+        time: Numpy array (vector) holding a timestep-ed time vector in years.
+        dtype, drop_constant, parents: Storage options, see save_trajectory_chunks.
+
+    Returns:
+        store: TrajectoryStore opened on the new store.
+    """
+    return save_trajectory_chunks(path, [(positions, time)], len(time), dtype, drop_constant, parents)
+
+
+def save_trajectory_chunks(path, chunks, num_steps, dtype = float, drop_constant = False, parents = None):
+    """
+    Writes chunks from simulate_orbits.iter_simulation to a trajectory store, one chunk in memory at a time.
+    The options trade precision for space: float32 halves the files, dropping constant axes (ex: z of circular
+    orbits) removes a third, and parent-relative positions keep moons precise in float32.
+
+    Args:
+        path: String representing the store directory (created if needed).
+        chunks: Iterable of (positions, time) pairs covering num_steps timesteps in total.
+        num_steps: Int representing the total number of timesteps, used to size the files.
+        dtype: Numpy dtype of the stored positions (ex: np.float32). Times are always float64.
+        drop_constant: Boolean, True does not store axes that hold a single value for every object over the
+            first chunk (later chunks must keep them constant).
+        parents: Optional dictionary holding the name of the object each object orbits (None or missing for the
+            system center), ex: BodyRegistry.parent_names(). Positions are then stored relative to the parent and
+            rebuilt on read.
+
+    Returns:
+        store: TrajectoryStore opened on the new store.
+    """
+    # write next to path and move the files in at the end, so a failure (ex: a dropped axis changing in a later
+    # chunk) leaves nothing behind, and any earlier store in path as it was
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        _write_chunks(staging, chunks, num_steps, dtype, drop_constant, parents)
+        os.makedirs(path, exist_ok=True)
+        for file in STORE_FILES:
+            if os.path.exists(os.path.join(staging, file)):
+                os.replace(os.path.join(staging, file), os.path.join(path, file))
+            elif os.path.exists(os.path.join(path, file)):
+                os.remove(os.path.join(path, file)) # left by an earlier store in the same directory
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return TrajectoryStore(path)
+
+
+def _write_chunks(path, chunks, num_steps, dtype, drop_constant, parents):
+    """Writes the files of a store to path (an empty directory), see save_trajectory_chunks."""
+    time_file = np.lib.format.open_memmap(os.path.join(path, "time.npy"), mode="w+", dtype=float, shape=(num_steps,))
+    positions_file = None
+    names = []
+    axes = [0, 1, 2]
+    constants = None
+    parent_index = None
+    written = 0
+    for positions, time in chunks:
+        if positions_file is None:
+            names = list(positions.keys())
+            index = {name: i for i, name in enumerate(names)}
+            parent_index = [-1]*len(names)
+            for name, parent in (parents or {}).items():
+                if name in index and parent is not None:
+                    if parent not in index:
+                        raise ValueError(f"Parent {parent} of {name} not found in simulation.")
+                    parent_index[index[name]] = index[parent]
+            constants = np.zeros((len(names), 3))
+            if drop_constant and len(time):
+                local = [_local_positions(positions, names, parent_index, i) for i in range(len(names))]
+                constant = [axis for axis in range(3) if all(np.all(values[:, axis] == values[0, axis]) for values in local)]
+                axes = [axis for axis in range(3) if axis not in constant]
+                for i, values in enumerate(local):
+                    constants[i, constant] = values[0, constant]
+            positions_file = np.lib.format.open_memmap(os.path.join(path, "positions.npy"), mode="w+", dtype=dtype,
+                                                       shape=(len(names), num_steps, len(axes)))
+        if written + len(time) > num_steps:
+            raise ValueError(f"Chunks hold more than {num_steps} timesteps.")
+        time_file[written:written + len(time)] = time
+        dropped = [axis for axis in range(3) if axis not in axes]
+        for i in range(len(names)):
+            local = _local_positions(positions, names, parent_index, i)
+            if dropped and not np.all(local[:, dropped] == constants[i, dropped]):
+                raise ValueError(f"Dropped axes of {names[i]} are not constant, save without drop_constant.")
+            positions_file[i, written:written + len(time)] = local[:, axes]
+        written += len(time)
+    if written != num_steps:
+        raise ValueError(f"Chunks hold {written} timesteps, expected {num_steps}.")
+    if positions_file is None:
+        np.save(os.path.join(path, "positions.npy"), np.zeros((0, num_steps, 3), dtype=dtype))
+    else:
+        positions_file.flush()
+    time_file.flush()
+    del time_file, positions_file
+    if constants is not None and len(axes) < 3:
+        np.save(os.path.join(path, "constants.npy"), constants)
+    _write_metadata(path, names, num_steps, axes, parent_index)
+
+
+def _local_positions(positions, names, parent_index, i):
+    """Returns the positions of object i of a chunk, relative to its parent when it has one."""
+    values = np.asarray(positions[names[i]], dtype=float)
+    if parent_index[i] != -1:
+        values = values - np.asarray(positions[names[parent_index[i]]], dtype=float)
+    return values
@@ -1,71 +1,227 @@
 # Creates visualizations from processed orbital simulation 
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 import simulate_orbits
+import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import instrumentation
 
-def plot_object(df, object_name, x_axis = "Time", y_axis = "X_pos"):
+DEFAULT_PIXELS = 2000 # points per object are cut down to about 4 per pixel column of this width
+
+
+def downsample(x, y, pixels = DEFAULT_PIXELS):
     """
-    Plots the given x axis value of an orbiting object over chosen y axis value. 
+    Reduces a line to the points that can be told apart at the given width, keeping its visual shape.
+    The samples are cut into pixels buckets and each bucket keeps its first, last, lowest and highest point
+    (min/max per pixel column); when x is not sorted (ex: an orbit plotted X over Y) the extremes of x are kept too.
 
     Args:
-        df: a pandas DataFrame containing the simulation data.
-        object_name: A string representing the name of the object being plotted.
-        x_axis: A string representing the column name of values to plot on the x-axis.
-        y_axis: A string representing the column name of values to plot on the y-axis.
+        x: Numpy array holding the x values of the line, in drawing order.
+        y: Numpy array holding the y values of the line.
+        pixels: Int representing the number of buckets, about the plot width in pixels. None keeps every point.
+
+    Returns:
+        x, y: Numpy arrays holding the kept points, in drawing order.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    num_points = len(x)
+    if pixels is None or num_points <= 4*pixels:
+        return x, y
+    bucket_size = -(-num_points//pixels) # ceiling division
+    num_buckets = -(-num_points//bucket_size)
+    # pad the last bucket by repeating the final point, so every bucket has bucket_size samples
+    padding = num_buckets*bucket_size - num_points
+    index = np.r_[np.arange(num_points), np.full(padding, num_points - 1)].reshape(num_buckets, bucket_size)
+    starts = index[:, 0]
+    keep = [starts, index[:, -1],
+            starts + np.argmin(y[index], axis=1), starts + np.argmax(y[index], axis=1)]
+    if np.any(np.diff(x) < 0):
+        keep += [starts + np.argmin(x[index], axis=1), starts + np.argmax(x[index], axis=1)]
+    keep = np.unique(np.concatenate(keep))
+    return x[keep], y[keep]
+
+
+def group_trajectories(data):
+    """
+    Splits simulation data by object once, so plots of many objects (or many plots) do not rescan it.
+
+    Args:
+        data: A pandas DataFrame from data_wrangling.convert_simulation_to_dataframe, a TrajectoryStore,
+            a batch.BatchResult, or an already grouped dictionary (returned as is).
+
+    Returns:
+        grouped: Dictionary keyed by object name, holding a dictionary of column arrays ("Time", "X_pos", ...)
+            for each object, in the data's object order.
     """
-    object_data = df[df["Object"] == object_name]
-    plt.plot(object_data[x_axis], object_data[y_axis], label=f"{object_name} {y_axis}")
+    if isinstance(data, dict):
+        return data
+    if hasattr(data, "positions_dictionary"): # TrajectoryStore (views of the memory-mapped file) or batch.BatchResult
+        return {name: {"Time": data.time, "X_pos": positions[:, 0], "Y_pos": positions[:, 1], "Z_pos": positions[:, 2]}
+                for name, positions in data.positions_dictionary().items()}
+    columns = {column: data[column].to_numpy() for column in data.columns if column != "Object"}
+    rows = data.groupby("Object", observed=True, sort=False).indices # one pass over the Object column
+    grouped = {}
+    for name, index in rows.items():
+        if len(index) and index[-1] - index[0] == len(index) - 1:
+            index = slice(index[0], index[-1] + 1) # contiguous rows (as written by convert_simulation_to_dataframe) give views
+        grouped[name] = {column: values[index] for column, values in columns.items()}
+    return grouped
+
+
+def _label_axes(ax, x_axis, y_axis):
+    """Labels the axes of a plot of y_axis over x_axis and returns the (x, y) units for its title."""
     if x_axis == "Time":
-        plt.xlabel("Time (years)")
+        ax.set_xlabel("Time (years)")
         x_unit = "years"
     elif "pos" in x_axis:
-        plt.ylabel(f"{x_axis} Position (km)")
+        ax.set_xlabel(f"{x_axis} Position (km)")
         x_unit = "km"
 
     if y_axis == "Time":
-        plt.ylabel("Time (years)")
+        ax.set_ylabel("Time (years)")
         y_unit = "years"
     elif "pos" in y_axis:
-        plt.ylabel(f"{y_axis} Position (km)")
+        ax.set_ylabel(f"{y_axis} Position (km)")
         y_unit = "km"
-    plt.title(f"{object_name}'s {x_axis} ({x_unit}) over {y_axis} ({y_unit})")
-    plt.legend()
-    plt.grid()
+    return x_unit, y_unit
+
+
+@instrumentation.timed("plot")
+def plot_object(df, object_name, x_axis = "Time", y_axis = "X_pos", pixels = DEFAULT_PIXELS, ax = None, show = True):
+    """
+    Plots the given x axis value of an orbiting object over chosen y axis value. 
+
+    Args:
+        df: a pandas DataFrame containing the simulation data, a TrajectoryStore, or their group_trajectories (reused between plots).
+        object_name: A string representing the name of the object being plotted.
+        x_axis: A string representing the column name of values to plot on the x-axis.
+        y_axis: A string representing the column name of values to plot on the y-axis.
+        pixels: Int representing the plot width the line is downsampled for (see downsample), None plots every point.
+        ax: A matplotlib Axes to draw on (defaults to the current pyplot axes).
+        show: A boolean, True opens the plot window with plt.show().
+
+    Returns:
+        ax: The matplotlib Axes drawn on.
+    """
+    if ax is None:
+        ax = plt.gca()
+    if isinstance(df, pd.DataFrame):
+        object_data = df[df["Object"] == object_name] # a single object needs a single scan
+    else:
+        object_data = group_trajectories(df)[object_name]
+    ax.plot(*downsample(np.asarray(object_data[x_axis]), np.asarray(object_data[y_axis]), pixels), label=f"{object_name} {y_axis}")
+    x_unit, y_unit = _label_axes(ax, x_axis, y_axis)
+    ax.set_title(f"{object_name}'s {x_axis} ({x_unit}) over {y_axis} ({y_unit})")
+    ax.legend()
+    ax.grid()
     
     # Show plot
-    plt.show()
+    if show:
+        plt.show()
+    return ax
 
 
-def plot_system(system, df, x_axis = "Time", y_axis ="X_pos"):
+@instrumentation.timed("plot")
+def plot_system(system, df, x_axis = "Time", y_axis ="X_pos", pixels = DEFAULT_PIXELS, ax = None, show = True):
     """
     Plots the given x axis value of all orbiting objects in a system over chosen y axis value. 
 
     Args:
         system: An OrbitalSystem representing the orbital system that df holds simulation data for.
-        df: a pandas DataFrame containing the simulation data.
+        df: a pandas DataFrame containing the simulation data, a TrajectoryStore, or their group_trajectories.
         x_axis: A string representing the column name of values to plot on the x-axis.
         y_axis: A string representing the column name of values to plot on the y-axis.
+        pixels: Int representing the plot width each object's line is downsampled for (see downsample),
+            None plots every point.
+        ax: A matplotlib Axes to draw on (defaults to the axes of a new pyplot figure).
+        show: A boolean, True opens the plot window with plt.show().
 
+    Returns:
+        ax: The matplotlib Axes drawn on.
     """
-    plt.figure(figsize=(8, 5))
+    if ax is None:
+        plt.figure(figsize=(8, 5))
+        ax = plt.gca()
 
-    # Loop through each unique object in the system
-    for object in df["Object"].unique():
-        object_data = df[df["Object"] == object]
-        plt.plot(object_data[x_axis], object_data[y_axis], label=f"{object} {y_axis}")
-    if x_axis == "Time":
-        plt.xlabel("Time (years)")
-        x_unit = "years"
-    elif "pos" in x_axis:
-        plt.ylabel(f"{x_axis} Position (km)")
-        x_unit = "km"
+    # Loop through each object in the system, the data is split by object once
+    for object, object_data in group_trajectories(df).items():
+        ax.plot(*downsample(object_data[x_axis], object_data[y_axis], pixels), label=f"{object} {y_axis}")
+    x_unit, y_unit = _label_axes(ax, x_axis, y_axis)
+    ax.set_title(f"{system.name} {x_axis} ({x_unit}) over {y_axis} ({y_unit})")
+    ax.legend()
+    ax.grid()
+    if show:
+        plt.show()
+    return ax
 
-    if y_axis == "Time":
-        plt.ylabel("Time (years)")
-        y_unit = "years"
-    elif "pos" in y_axis:
-        plt.ylabel(f"{y_axis} Position (km)")
-        y_unit = "km"
-    plt.title(f"{system.name} {x_axis} ({x_unit}) over {y_axis} ({y_unit})")
-    plt.legend()
-    plt.grid()
-    plt.show()
+
+PLOTS = {"object": plot_object, "system": plot_system}
+_worker_figures = {} # figures kept by each worker process, keyed by size, reused between jobs (unused in-process)
+
+
+def _render_chunk(jobs, figsize, dpi, figures = None):
+    """
+    Draws a list of (path, plot, arguments) jobs on one reused Agg figure and writes each to its file.
+    Figures are kept in figures (keyed by size), or for the life of the worker process when it is None.
+    """
+    figures = _worker_figures if figures is None else figures
+    if figsize not in figures:
+        figure = Figure(figsize=figsize) # not registered with pyplot, so it renders with Agg and never opens a window
+        figures[figsize] = (figure, figure.add_subplot())
+    figure, ax = figures[figsize]
+    for path, plot, arguments in jobs:
+        ax.clear()
+        PLOTS[plot](**arguments, ax=ax, show=False)
+        figure.savefig(path, dpi=dpi)
+    return [path for path, _, _ in jobs]
+
+
+@instrumentation.timed("render")
+def render_figures(jobs, processes = None, chunksize = None, figsize = (8, 5), dpi = 100):
+    """
+    Writes many plots to image files without displaying them, spreading chunks of plots over a pool of processes.
+    Each process draws every plot on the same figure and axes, cleared between plots.
+
+    Args:
+        jobs: List of dictionaries, each with the "path" to write (the extension sets the format, ex: .png, .pdf),
+            the "plot" to draw ("object" for plot_object, "system" for plot_system) and that function's arguments
+            (ex: {"path": "mars.png", "plot": "object", "df": grouped, "object_name": "Mars"}).
+        processes: Int representing the number of worker processes (defaults to the CPU count, 1 renders in this process).
+        chunksize: Int representing how many plots are sent to a worker at once (defaults to about four chunks per worker).
+        figsize: Tuple representing the figure size in inches.
+        dpi: Int representing the resolution of the images.
+
+    Returns:
+        paths: List of the written files, in job order.
+    """
+    tasks = []
+    for job in jobs:
+        arguments = dict(job)
+        path, plot = arguments.pop("path"), arguments.pop("plot")
+        if plot not in PLOTS:
+            raise ValueError(f"Unknown plot {plot}.")
+        tasks.append((path, plot, arguments))
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(tasks)))
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(tasks)/(processes*4)))
+    chunks = [tasks[i:i + chunksize] for i in range(0, len(tasks), chunksize)]
+    figsize = tuple(figsize)
+
+    paths = []
+    if processes == 1:
+        figures = {} # dropped once rendered, so the caller's process keeps no figure
+        for chunk in chunks:
+            paths += _render_chunk(chunk, figsize, dpi, figures)
+        figures.clear()
+    else:
+        # spawned, not forked: a fork copies thread pools already running here (ex: Numba's) and can hang
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for future in [pool.submit(_render_chunk, chunk, figsize, dpi) for chunk in chunks]:
+                paths += future.result()
+    return paths